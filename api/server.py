@@ -0,0 +1,449 @@
+# api/server.py
+"""
+Headless HTTP/JSON API over the db layer, for channel managers and kiosks.
+
+Plain asyncio streams, no third-party server. Connections are HTTP/1.1
+keep-alive; db-layer calls are blocking, so they run on a thread pool no
+larger than the connection pool (never more jobs than connections) while
+the event loop keeps serving other sockets.
+
+    python -m api.server                          # API_CONFIG host/port, configured database
+    python -m api.server --port 8081 --sqlite hotel.db
+
+Endpoints (JSON in and out; dates as YYYY-MM-DD):
+
+    GET   /health
+    GET   /rooms/available?check_in=...&check_out=...
+    GET   /guests?q=smith[&limit=20]
+    GET   /guests/<id>
+    POST  /guests                        {first_name, last_name, email, phone, ...}
+    POST  /reservations                  {guest_id, room_id, check_in, check_out, adults, children, requests}
+    POST  /reservations/bulk             {bookings: [...]}, all or nothing
+    POST  /reservations/<id>/status      {status: 'checked-in' | 'checked-out' | 'cancelled'}
+    GET   /front-desk?q=...              check-in and check-out candidates
+
+Availability and guest-by-id reads are batched: requests arriving within
+API_CONFIG['batch_window_ms'] of each other are answered by one bulk call
+(get_available_rooms_for_ranges, get_guests_by_ids_db), and identical
+requests share a single result. Bookings are not batched, so one
+channel's conflict never fails another's booking.
+
+There is no authentication: bind to localhost or put it behind a proxy
+that does it.
+"""
+import argparse
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from db.connection import get_pool, get_pool_stats, use_backend
+from db.availability import _to_date
+from db.records import Record
+from db.room_queries import get_available_rooms_for_ranges
+from db.guest_queries import find_guest_by_name_db, get_guests_by_ids_db, add_guest_db
+from db.reservation_queries import book_room_db, add_reservations_bulk_db, update_reservation_status_db
+from db.front_desk import lookup_front_desk
+from config import API_CONFIG
+
+# Status changes a client may make; bookings are created 'confirmed' by POST /reservations
+STATUS_CHANGES = ('checked-in', 'checked-out', 'cancelled')
+
+
+class HTTPError(Exception):
+    """ Ends a request with `status` and a JSON {'error': message} body. """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = HTTPStatus(status)
+        self.message = message
+
+
+def _json_default(value):
+    if isinstance(value, Record):
+        return value.asdict()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _date_param(value, name):
+    if not value:
+        raise HTTPError(400, f"{name} is required")
+    try:
+        return _to_date(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a YYYY-MM-DD date")
+
+def _int_param(value, name, default=None):
+    if value is None or value == '':
+        if default is None:
+            raise HTTPError(400, f"{name} is required")
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be a whole number")
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path.rstrip('/') or '/'
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+        self.params = {} # Filled from the route pattern
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        return data
+
+
+class DBExecutor:
+    """ Runs blocking db-layer calls off the event loop, at most `size` at a time. """
+    def __init__(self, size):
+        self._threads = ThreadPoolExecutor(max_workers=size, thread_name_prefix="api-db")
+        self._slots = asyncio.Semaphore(size)
+
+    async def run(self, func, *args):
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._threads, func, *args)
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+class Batcher:
+    """ Answers single-key lookups arriving close together with one bulk call.
+
+    bulk(keys) must return {key: result}; keys missing from it resolve to
+    None, and a None return (DB error) fails the whole batch.
+    """
+    def __init__(self, db, bulk, window, max_batch):
+        self.db = db
+        self.bulk = bulk
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {} # key -> Future shared by every request for that key
+        self._timer = None
+        self.stats = {'calls': 0, 'batches': 0, 'keys': 0}
+
+    async def get(self, key):
+        self.stats['calls'] += 1
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        self.stats['batches'] += 1
+        self.stats['keys'] += len(batch)
+        try:
+            results = await self.db.run(self.bulk, list(batch))
+            if results is None:
+                raise HTTPError(503, "database unavailable")
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+class ApiServer:
+    """ The HTTP server: routing, keep-alive connections and the shared DB executor. """
+    def __init__(self, host=None, port=None):
+        self.host = host or API_CONFIG.get('host', '127.0.0.1')
+        self.port = API_CONFIG.get('port', 8080) if port is None else port
+        self.keep_alive_timeout = API_CONFIG.get('keep_alive_timeout', 15)
+        self.max_body = API_CONFIG.get('max_body', 1024 * 1024)
+        self.stats = {'connections': 0, 'requests': 0, 'errors': 0}
+        self._server = None
+        self.db = None
+        self.routes = [
+            ('GET', r'/health', self.health),
+            ('GET', r'/rooms/available', self.available_rooms),
+            ('GET', r'/guests', self.search_guests),
+            ('GET', r'/guests/(?P<guest_id>\d+)', self.get_guest),
+            ('POST', r'/guests', self.add_guest),
+            ('POST', r'/reservations', self.book),
+            ('POST', r'/reservations/bulk', self.book_bulk),
+            ('POST', r'/reservations/(?P<reservation_id>\d+)/status', self.set_status),
+            ('GET', r'/front-desk', self.front_desk),
+        ]
+        self.routes = [(method, re.compile(pattern + '$'), handler) for method, pattern, handler in self.routes]
+
+    async def start(self):
+        """ Opens the listening socket (port 0 picks a free one; see self.port afterwards). """
+        self.db = DBExecutor(get_pool().max_size)
+        window = API_CONFIG.get('batch_window_ms', 2) / 1000
+        max_batch = API_CONFIG.get('max_batch', 64)
+        self.availability = Batcher(self.db, get_available_rooms_for_ranges, window, max_batch)
+        self.guests = Batcher(self.db, get_guests_by_ids_db, window, max_batch)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        if self.db is not None:
+            self.db.shutdown()
+
+    # --- HTTP ---
+
+    async def _read_request(self, reader):
+        """ Next Request on the connection, or None when the client is done. """
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.keep_alive_timeout)
+        except asyncio.TimeoutError:
+            return None # Idle keep-alive connection
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {'_version': version}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411, "chunked bodies are not supported; send Content-Length")
+        length = _int_param(headers.get('content-length'), 'Content-Length', default=0)
+        if length < 0:
+            raise HTTPError(400, "invalid Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return Request(method.upper(), target, headers, body)
+
+    @staticmethod
+    def _keep_alive(request):
+        connection = request.headers.get('connection', '').lower()
+        if request.headers['_version'] == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def _response(self, status, payload, keep_alive):
+        body = json.dumps(payload, default=_json_default).encode()
+        status = HTTPStatus(status)
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode('latin-1') + body
+
+    async def _handle_connection(self, reader, writer):
+        self.stats['connections'] += 1
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    keep_alive = self._keep_alive(request)
+                    status, payload = await self.dispatch(request)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': e.message}
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        """ (status, payload) for a request. """
+        self.stats['requests'] += 1
+        allowed = []
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            request.params = match.groupdict()
+            try:
+                return await handler(request)
+            except HTTPError as e:
+                self.stats['errors'] += 1
+                return e.status, {'error': e.message}
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"API error on {request.method} {request.path}: {e}")
+                return 500, {'error': "internal error"}
+        self.stats['errors'] += 1
+        if allowed:
+            return 405, {'error': f"use {', '.join(allowed)}"}
+        return 404, {'error': "no such endpoint"}
+
+    # --- Handlers ---
+
+    async def health(self, request):
+        return 200, {
+            'status': 'ok',
+            'server': dict(self.stats),
+            'batching': {'availability': self.availability.stats, 'guests': self.guests.stats},
+            'pool': await self.db.run(get_pool_stats),
+        }
+
+    async def available_rooms(self, request):
+        check_in = _date_param(request.query.get('check_in'), 'check_in')
+        check_out = _date_param(request.query.get('check_out'), 'check_out')
+        if check_out <= check_in:
+            raise HTTPError(400, "check_out must be after check_in")
+        rooms = await self.availability.get((check_in, check_out))
+        return 200, {'check_in': check_in, 'check_out': check_out, 'rooms': rooms or []}
+
+    async def search_guests(self, request):
+        term = (request.query.get('q') or '').strip()
+        if not term:
+            raise HTTPError(400, "q is required")
+        limit = min(_int_param(request.query.get('limit'), 'limit', default=20), 200)
+        guests = await self.db.run(find_guest_by_name_db, term, limit)
+        if guests is None:
+            raise HTTPError(503, "database unavailable")
+        return 200, {'guests': guests}
+
+    async def get_guest(self, request):
+        guest = await self.guests.get(int(request.params['guest_id']))
+        if guest is None:
+            raise HTTPError(404, "guest not found")
+        return 200, guest
+
+    async def add_guest(self, request):
+        data = request.json()
+        if not (data.get('first_name') and data.get('last_name')):
+            raise HTTPError(400, "first_name and last_name are required")
+        dob = _date_param(data['date_of_birth'], 'date_of_birth') if data.get('date_of_birth') else None
+        guest_id = await self.db.run(lambda: add_guest_db(
+            data['first_name'], data['last_name'], data.get('email'), data.get('phone'),
+            address=data.get('address'), city=data.get('city'), country=data.get('country'),
+            passport=data.get('passport_number'), dob=dob))
+        if guest_id is None:
+            raise HTTPError(503, "could not add guest")
+        return 201, {'guest_id': guest_id}
+
+    @staticmethod
+    def _booking(data):
+        booking = {
+            'guest_id': _int_param(data.get('guest_id'), 'guest_id'),
+            'room_id': _int_param(data.get('room_id'), 'room_id'),
+            'check_in': _date_param(data.get('check_in'), 'check_in'),
+            'check_out': _date_param(data.get('check_out'), 'check_out'),
+            'adults': _int_param(data.get('adults'), 'adults', default=1),
+            'children': _int_param(data.get('children'), 'children', default=0),
+            'requests': data.get('requests'),
+        }
+        if booking['check_out'] <= booking['check_in']:
+            raise HTTPError(400, "check_out must be after check_in")
+        return booking
+
+    async def book(self, request):
+        booking = self._booking(request.json())
+        reservation_id, reason = await self.db.run(lambda: book_room_db(**booking))
+        if reservation_id:
+            return 201, {'reservation_id': reservation_id}
+        if reason:
+            return 409, {'error': reason}
+        raise HTTPError(503, "could not create reservation")
+
+    async def book_bulk(self, request):
+        bookings = request.json().get('bookings')
+        if not isinstance(bookings, list) or not bookings:
+            raise HTTPError(400, "bookings must be a non-empty list")
+        bookings = [self._booking(b if isinstance(b, dict) else {}) for b in bookings]
+        reservation_ids, conflicts = await self.db.run(add_reservations_bulk_db, bookings)
+        if reservation_ids:
+            return 201, {'reservation_ids': reservation_ids}
+        if conflicts:
+            return 409, {'error': "some rooms are not available",
+                         'conflicts': [{'index': i, 'reason': reason} for i, reason in conflicts]}
+        raise HTTPError(503, "could not create reservations")
+
+    async def set_status(self, request):
+        status = request.json().get('status')
+        if status not in STATUS_CHANGES:
+            raise HTTPError(400, f"status must be one of {', '.join(STATUS_CHANGES)}")
+        reservation_id = int(request.params['reservation_id'])
+        if not await self.db.run(update_reservation_status_db, reservation_id, status):
+            raise HTTPError(404, "reservation not found or not updated")
+        return 200, {'reservation_id': reservation_id, 'status': status}
+
+    async def front_desk(self, request):
+        term = (request.query.get('q') or '').strip()
+        if not term:
+            raise HTTPError(400, "q is required")
+        found = await self.db.run(lookup_front_desk, term)
+        if found is None:
+            raise HTTPError(503, "database unavailable")
+        return 200, found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the hotel db layer over HTTP/JSON.")
+    parser.add_argument('--host', help="Interface to listen on (default from API_CONFIG)")
+    parser.add_argument('--port', type=int, help="Port (default from API_CONFIG)")
+    parser.add_argument('--sqlite', help="Serve this SQLite file instead of the configured database")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        import config
+        use_backend('sqlite', dict(config.SQLITE_CONFIG, database=args.sqlite))
+
+    async def serve():
+        server = await ApiServer(args.host, args.port).start()
+        print(f"Hotel API listening on http://{server.host}:{server.port}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
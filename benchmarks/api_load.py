@@ -0,0 +1,183 @@
+# benchmarks/api_load.py
+"""
+Load test for the HTTP/JSON API (api/server.py) against a local SQLite hotel.
+
+Run from the project root:
+
+    python -m benchmarks.api_load                              # 32 keep-alive clients, small hotel
+    python -m benchmarks.api_load --clients 64 --requests 500 --size medium
+    python -m benchmarks.api_load --no-keep-alive              # new connection per request, for comparison
+
+Fills a SQLite file with the benchmark generator, starts the server on it
+in a subprocess, then runs asyncio clients that each send a mix of
+channel-manager calls (mostly availability, some guest reads, searches and
+bookings). Reports latency per endpoint and overall throughput, plus the
+server's own batching counters from /health.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import config
+from db.connection import use_backend, close_pool
+
+from benchmarks import generator
+from benchmarks.run import summarize
+
+# endpoint -> share of requests
+MIX = [('availability', 0.60), ('guest', 0.20), ('search', 0.10), ('book', 0.05), ('front_desk', 0.05)]
+
+
+class Client:
+    """ A minimal HTTP/1.1 JSON client over one (optionally kept-alive) connection. """
+    def __init__(self, host, port, keep_alive=True):
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self._reader = self._writer = None
+
+    async def request(self, method, path, payload=None):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if self.keep_alive else 'close'}\r\n\r\n")
+        self._writer.write(head.encode('latin-1') + body)
+        await self._writer.drain()
+
+        status = int((await self._reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        data = await self._reader.readexactly(int(headers.get('content-length', 0)))
+        if not self.keep_alive or headers.get('connection') == 'close':
+            await self.close()
+        return status, json.loads(data) if data else None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+def make_call(rng, data, today):
+    """ (endpoint, method, path, payload) for one random request. """
+    endpoint = rng.choices([name for name, _ in MIX], [share for _, share in MIX])[0]
+    check_in = today + timedelta(days=rng.randrange(1, 120))
+    check_out = check_in + timedelta(days=rng.choice(generator.STAY_NIGHTS))
+    if endpoint == 'availability':
+        return endpoint, 'GET', f"/rooms/available?check_in={check_in}&check_out={check_out}", None
+    if endpoint == 'guest':
+        return endpoint, 'GET', f"/guests/{rng.choice(data['guests'])[0]}", None
+    if endpoint == 'search':
+        return endpoint, 'GET', f"/guests?q={rng.choice(generator.LAST_NAMES)[:4]}&limit=20", None
+    if endpoint == 'front_desk':
+        return endpoint, 'GET', f"/front-desk?q={rng.choice(generator.LAST_NAMES)}", None
+    return endpoint, 'POST', "/reservations", {
+        'guest_id': rng.choice(data['guests'])[0], 'room_id': rng.choice(data['rooms'])[0],
+        'check_in': check_in.isoformat(), 'check_out': check_out.isoformat(), 'adults': 2}
+
+async def run_client(host, port, calls, keep_alive, samples, statuses):
+    client = Client(host, port, keep_alive)
+    try:
+        for endpoint, method, path, payload in calls:
+            t0 = time.perf_counter()
+            status, _ = await client.request(method, path, payload)
+            samples.setdefault(endpoint, []).append(time.perf_counter() - t0)
+            statuses[status] += 1
+    finally:
+        await client.close()
+
+async def run_load(args, host, port, data):
+    rng = random.Random(args.seed)
+    today = date.today()
+    workloads = [[make_call(rng, data, today) for _ in range(args.requests)] for _ in range(args.clients)]
+    samples, statuses = {}, Counter()
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, calls, not args.no_keep_alive, samples, statuses)
+                           for calls in workloads))
+    wall_time = time.perf_counter() - started
+    _, health = await Client(host, port, keep_alive=False).request('GET', '/health')
+    return samples, statuses, wall_time, health
+
+
+def start_server(path, port):
+    """ Starts `python -m api.server` on the SQLite file; returns (process, host, port). """
+    process = subprocess.Popen([sys.executable, '-m', 'api.server', '--sqlite', path, '--port', str(port)],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline() # "Hotel API listening on http://host:port"
+    if 'listening on' not in line:
+        process.kill()
+        raise SystemExit(f"API server did not start: {line.strip() or 'no output'}")
+    host, port = line.rsplit('//', 1)[1].strip().rsplit(':', 1)
+    return process, host, int(port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the hotel HTTP/JSON API.")
+    parser.add_argument('--size', choices=list(generator.SIZES), default='small')
+    parser.add_argument('--clients', type=int, default=32, help="Concurrent client connections")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per client")
+    parser.add_argument('--no-keep-alive', action='store_true', help="Open a new connection for every request")
+    parser.add_argument('--port', type=int, default=0, help="Server port (0 = any free port)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=tempfile.gettempdir(), help="Where the SQLite file goes")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(args.workdir, f"api_load_{args.size}.db")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    use_backend('sqlite', dict(config.SQLITE_CONFIG, database=path))
+    data = generator.generate(seed=args.seed, **generator.SIZES[args.size])
+    if not generator.load(data):
+        raise SystemExit("Could not load benchmark data.")
+    close_pool() # The server opens its own connections
+
+    process, host, port = start_server(path, args.port)
+    try:
+        samples, statuses, wall_time, health = asyncio.run(run_load(args, host, port, data))
+    finally:
+        process.terminate()
+        process.wait()
+
+    total = sum(len(s) for s in samples.values())
+    report = {
+        'clients': args.clients,
+        'keep_alive': not args.no_keep_alive,
+        'requests': total,
+        'throughput_per_s': round(total / wall_time, 1),
+        'statuses': dict(statuses),
+        'endpoints': {name: summarize(s, wall_time) for name, s in sorted(samples.items())},
+        'all': summarize([t for s in samples.values() for t in s], wall_time),
+        'server': health,
+    }
+    print(f"{total} requests from {args.clients} clients in {wall_time:.2f}s: "
+          f"{report['throughput_per_s']}/s, statuses {dict(statuses)}")
+    for name, result in report['endpoints'].items():
+        print(f"  {name:<14} n {result['iterations']:>6}  p50 {result['p50_ms']:>8.2f} ms  "
+              f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms")
+    batching = health['batching']['availability']
+    print(f"  availability: {batching['calls']} requests answered by {batching['batches']} bulk calls")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/compare.py
+"""
+Compares two benchmarks/run.py JSON reports, e.g. before and after a change:
+
+    python -m benchmarks.compare baseline.json current.json --threshold 1.2
+
+Exits with status 1 if any case's p95 got slower than the threshold ratio.
+"""
+import argparse
+import json
+
+
+def load_results(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report.get('meta', {}), {(r['size'], r['case']): r for r in report.get('results', [])}
+
+def compare(baseline, current, metric='p95_ms', threshold=1.2):
+    """ Yields (size, case, old, new, ratio, regressed) for cases present in both reports. """
+    for key in sorted(set(baseline) & set(current)):
+        old, new = baseline[key].get(metric), current[key].get(metric)
+        if not old or new is None:
+            continue
+        ratio = new / old
+        yield key[0], key[1], old, new, ratio, ratio > threshold
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--metric', default='p95_ms', choices=('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'))
+    parser.add_argument('--threshold', type=float, default=1.2, help="Slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    old_meta, baseline = load_results(args.baseline)
+    new_meta, current = load_results(args.current)
+    print(f"{old_meta.get('revision')} -> {new_meta.get('revision')} ({args.metric})")
+
+    regressions = 0
+    for size, case, old, new, ratio, regressed in compare(baseline, current, args.metric, args.threshold):
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{size:<7} {case:<40} {old:>10.3f} -> {new:>10.3f} ms  x{ratio:5.2f}{flag}")
+    for key in sorted(set(baseline) ^ set(current)):
+        print(f"{key[0]:<7} {key[1]:<40} only in {'baseline' if key in baseline else 'current'}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,189 @@
+# benchmarks/contention.py
+"""
+Booking under contention: many terminals booking the same few rooms at once.
+
+Run from the project root:
+
+    python -m benchmarks.contention                       # embedded SQLite, 16 threads
+    python -m benchmarks.contention --threads 32 --rooms 3 --attempts 100
+    python -m benchmarks.contention --naive               # check-then-insert without locking, for comparison
+    python -m benchmarks.contention --backend mysql --database hotel_bench
+
+Every thread repeatedly books a random stay in one of a handful of rooms,
+so most attempts collide. Reports throughput, conflict rate, deadlock
+retries and latency, then checks the Reservations table for double
+bookings (overlapping active stays of one room). Exits 1 if any are found.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import config
+from db.connection import use_backend, close_pool, pooled_connection, get_pool_stats, Error
+from db.availability import ACTIVE_STATUSES
+from db.reservation_queries import book_room_db, get_booking_retry_stats
+
+from benchmarks import generator
+from benchmarks.run import summarize
+
+
+def naive_book(guest_id, room_id, check_in, check_out):
+    """ The pre-locking approach: check for overlaps, then insert, with nothing held in between. """
+    with pooled_connection() as conn:
+        if conn is None: return None, None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"""
+                SELECT COUNT(*) AS n FROM Reservations
+                WHERE room_id = %s AND status IN ({', '.join(['%s'] * len(ACTIVE_STATUSES))})
+                  AND check_in_date < %s AND check_out_date > %s
+            """, (room_id,) + ACTIVE_STATUSES + (check_out, check_in))
+            if cursor.fetchone()['n']:
+                return None, "room is not available for these dates"
+            cursor.execute("""
+                INSERT INTO Reservations (guest_id, room_id, check_in_date, check_out_date, status)
+                VALUES (%s, %s, %s, %s, 'confirmed')
+            """, (guest_id, room_id, check_in, check_out))
+            conn.commit()
+            return cursor.lastrowid, None
+        except Error:
+            conn.rollback()
+            return None, None
+        finally:
+            cursor.close()
+
+def count_double_bookings(room_ids):
+    """ Pairs of active reservations of the same room whose stays overlap. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            statuses = ', '.join(['%s'] * len(ACTIVE_STATUSES))
+            cursor.execute(f"""
+                SELECT COUNT(*) AS n
+                FROM Reservations a
+                JOIN Reservations b ON a.room_id = b.room_id AND a.reservation_id < b.reservation_id
+                WHERE a.room_id IN ({', '.join(['%s'] * len(room_ids))})
+                  AND a.status IN ({statuses}) AND b.status IN ({statuses})
+                  AND a.check_in_date < b.check_out_date AND b.check_in_date < a.check_out_date
+            """, tuple(room_ids) + ACTIVE_STATUSES + ACTIVE_STATUSES)
+            return cursor.fetchone()['n']
+        except Error as e:
+            print(f"Error checking for double bookings: {e}")
+            return None
+        finally:
+            cursor.close()
+
+
+def run(args, data):
+    rng = random.Random(args.seed)
+    room_ids = [room[0] for room in rng.sample(data['rooms'], args.rooms)]
+    guest_ids = [guest[0] for guest in data['guests']]
+    # A window after every generated stay, so only the benchmark's own bookings collide
+    first_night = data['anchor'] + timedelta(days=120)
+    book = naive_book if args.naive else book_room_db
+
+    results = {'booked': 0, 'conflicts': 0, 'errors': 0}
+    latencies = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(args.threads)
+
+    def terminal(index):
+        local_rng = random.Random(f"{args.seed}:{index}")
+        start_gate.wait() # All terminals start hammering at once
+        for _ in range(args.attempts):
+            check_in = first_night + timedelta(days=local_rng.randrange(args.days))
+            check_out = check_in + timedelta(days=local_rng.choice((1, 2, 3)))
+            started = time.perf_counter()
+            reservation_id, reason = book(local_rng.choice(guest_ids), local_rng.choice(room_ids), check_in, check_out)
+            elapsed = time.perf_counter() - started
+            outcome = 'booked' if reservation_id else ('conflicts' if reason else 'errors')
+            with lock:
+                results[outcome] += 1
+                latencies.append(elapsed)
+
+    retries_before = get_booking_retry_stats()
+    threads = [threading.Thread(target=terminal, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_time = time.perf_counter() - started
+    retries_after = get_booking_retry_stats()
+
+    attempts = sum(results.values())
+    report = {
+        'mode': 'naive' if args.naive else 'locking',
+        'backend': args.backend,
+        'threads': args.threads,
+        'rooms': args.rooms,
+        'days': args.days,
+        'attempts': attempts,
+        'booked': results['booked'],
+        'conflicts': results['conflicts'],
+        'errors': results['errors'],
+        'conflict_rate': round(results['conflicts'] / attempts, 4) if attempts else 0.0,
+        'retries': retries_after['retries'] - retries_before['retries'],
+        'gave_up': retries_after['gave_up'] - retries_before['gave_up'],
+        'bookings_per_s': round(results['booked'] / wall_time, 2) if wall_time > 0 else None,
+        'latency': summarize(latencies, wall_time),
+        'pool': get_pool_stats(),
+        'double_bookings': count_double_bookings(room_ids),
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent booking of a few contended rooms.")
+    parser.add_argument('--backend', choices=('sqlite', 'mysql'), default='sqlite')
+    parser.add_argument('--database', default='hotel_bench',
+                        help="MySQL database to fill (its contents are replaced!)")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--attempts', type=int, default=50, help="Booking attempts per thread")
+    parser.add_argument('--rooms', type=int, default=5, help="How many rooms the threads compete for")
+    parser.add_argument('--days', type=int, default=30, help="Length of the contended date window")
+    parser.add_argument('--naive', action='store_true', help="Check-then-insert without locking")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=date.fromisoformat, default=date(2024, 6, 1))
+    parser.add_argument('--workdir', default=tempfile.gettempdir(), help="Where the SQLite benchmark file goes")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.backend == 'sqlite':
+        path = os.path.join(args.workdir, "bench_contention.db")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        use_backend('sqlite', dict(config.SQLITE_CONFIG, database=path, pool_size=args.threads))
+    else:
+        use_backend('mysql', dict(config.DB_CONFIG, database=args.database, pool_size=args.threads))
+
+    data = generator.generate(seed=args.seed, anchor=args.anchor, **generator.SIZES['small'])
+    if not generator.load(data):
+        raise SystemExit("Could not load benchmark data.")
+    try:
+        report = run(args, data)
+    finally:
+        close_pool()
+
+    print(f"{report['mode']}: {report['threads']} threads, {report['rooms']} rooms, {report['attempts']} attempts")
+    print(f"  booked {report['booked']} ({report['bookings_per_s']}/s), conflicts {report['conflicts']} "
+          f"({report['conflict_rate']:.1%}), errors {report['errors']}, retries {report['retries']}")
+    print(f"  latency p50 {report['latency']['p50_ms']:.2f} ms, p95 {report['latency']['p95_ms']:.2f} ms, "
+          f"p99 {report['latency']['p99_ms']:.2f} ms")
+    print(f"  double bookings: {report['double_bookings']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+    return 1 if report['double_bookings'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# benchmarks/generator.py
+"""
+Deterministic synthetic hotel data for benchmarks.
+
+The same seed, sizes and anchor date always produce the same rows, so
+results from different versions of the code are comparable.
+"""
+import math
+import random
+from datetime import date, timedelta
+
+from db.connection import pooled_connection, Error
+from db.inventory import fill_room_nights
+
+# name -> (base_price, capacity, share of rooms)
+ROOM_TYPES = [
+    ('Single', '79.00', 1, 0.25),
+    ('Double', '119.00', 2, 0.45),
+    ('Family', '159.00', 4, 0.20),
+    ('Suite', '289.00', 3, 0.10),
+]
+ROOMS_PER_FLOOR = 20
+
+FIRST_NAMES = [
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+    'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen',
+    'Daniel', 'Nancy', 'Matthew', 'Lisa', 'Anthony', 'Betty', 'Mark', 'Sandra', 'Paul', 'Ashley',
+    'Luca', 'Sofia', 'Mateo', 'Emma', 'Noah', 'Mia', 'Hugo', 'Ines', 'Lars', 'Freya',
+    'Kenji', 'Yuki', 'Arjun', 'Priya', 'Omar', 'Layla', 'Ivan', 'Olga', 'Pierre', 'Chloe',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+    'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson',
+    'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores',
+    'Rossi', 'Muller', 'Schmidt', 'Dubois', 'Lefevre', 'Novak', 'Kowalski', 'Ivanova', 'Tanaka', 'Sato',
+    'Kim', 'Park', 'Chen', 'Wang', 'Singh', 'Patel', 'Haddad', 'Silva', 'Santos', 'Jensen',
+]
+CITIES = [
+    ('London', 'UK'), ('Paris', 'France'), ('Berlin', 'Germany'), ('Madrid', 'Spain'), ('Rome', 'Italy'),
+    ('New York', 'USA'), ('Chicago', 'USA'), ('Toronto', 'Canada'), ('Tokyo', 'Japan'), ('Seoul', 'South Korea'),
+    ('Mumbai', 'India'), ('Sydney', 'Australia'), ('Warsaw', 'Poland'), ('Lisbon', 'Portugal'), ('Oslo', 'Norway'),
+]
+# Length-of-stay distribution (nights -> weight); most stays are short
+STAY_NIGHTS = [1, 2, 3, 4, 5, 6, 7, 10, 14]
+STAY_WEIGHTS = [22, 24, 18, 11, 8, 5, 7, 3, 2]
+MEAN_NIGHTS = sum(n * w for n, w in zip(STAY_NIGHTS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+
+SIZES = {
+    'small': {'rooms': 50, 'guests': 2000, 'years': 1},
+    'medium': {'rooms': 200, 'guests': 20000, 'years': 3},
+    'large': {'rooms': 500, 'guests': 100000, 'years': 5},
+}
+
+BATCH_SIZE = 1000
+
+
+def occupancy_target(day):
+    """ Expected share of rooms occupied on `day`: summer and December peaks, busier weekends. """
+    day_of_year = day.timetuple().tm_yday
+    summer = 0.22 * math.exp(-((day_of_year - 200) / 35.0) ** 2)
+    holidays = 0.15 * math.exp(-((day_of_year - 358) / 10.0) ** 2)
+    weekend = 0.08 if day.weekday() in (4, 5) else 0.0
+    return min(0.97, 0.48 + summer + holidays + weekend)
+
+
+def generate_room_types():
+    return [(i + 1, name, f"{name} room", price, capacity)
+            for i, (name, price, capacity, _) in enumerate(ROOM_TYPES)]
+
+def generate_rooms(rng, n_rooms):
+    """ (room_id, room_number, room_type_id, floor_number) with the ROOM_TYPES mix. """
+    weights = [share for *_, share in ROOM_TYPES]
+    rooms = []
+    for i in range(n_rooms):
+        floor = i // ROOMS_PER_FLOOR + 1
+        room_number = f"{floor}{i % ROOMS_PER_FLOOR + 1:02d}"
+        room_type_id = rng.choices(range(1, len(ROOM_TYPES) + 1), weights)[0]
+        rooms.append((i + 1, room_number, room_type_id, floor))
+    return rooms
+
+def generate_guests(rng, n_guests):
+    """ Guest rows; names repeat like they do in a real guest list, emails stay unique. """
+    guests = []
+    for guest_id in range(1, n_guests + 1):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        city, country = rng.choice(CITIES)
+        birth = date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 65))
+        guests.append((
+            guest_id, first, last,
+            f"{first.lower()}.{last.lower()}{guest_id}@example.com",
+            f"+1{rng.randrange(10 ** 9, 10 ** 10)}",
+            f"{rng.randrange(1, 400)} {rng.choice(LAST_NAMES)} Street",
+            city, country,
+            f"P{rng.randrange(10 ** 7, 10 ** 8)}",
+            birth,
+        ))
+    return guests
+
+def generate_reservations(rng, rooms, n_guests, years, anchor):
+    """ Back-to-back stays per room from `years` before `anchor` to 90 days after it.
+
+    Each free day a stay starts with probability derived from
+    occupancy_target(), so busy seasons come out fuller.
+    """
+    start = anchor - timedelta(days=365 * years)
+    end = anchor + timedelta(days=90)
+    reservations = []
+    reservation_id = 0
+    for room_id, *_ in rooms:
+        day = start
+        while day < end:
+            target = occupancy_target(day)
+            # P(start a stay today) chosen so the long-run occupied share is ~target
+            p_start = target / (MEAN_NIGHTS * (1 - target) + target)
+            if rng.random() >= p_start:
+                day += timedelta(days=1)
+                continue
+            nights = rng.choices(STAY_NIGHTS, STAY_WEIGHTS)[0]
+            check_in, check_out = day, day + timedelta(days=nights)
+            if check_out <= anchor:
+                status = 'cancelled' if rng.random() < 0.06 else 'checked-out'
+            elif check_in <= anchor:
+                status = 'checked-in'
+            else:
+                status = 'cancelled' if rng.random() < 0.04 else 'confirmed'
+            reservation_id += 1
+            adults = rng.choice((1, 2, 2, 2, 3))
+            children = rng.choice((0, 0, 0, 1, 2))
+            reservations.append((reservation_id, rng.randrange(1, n_guests + 1), room_id,
+                                 check_in, check_out, adults, children, None, status))
+            day = check_out
+    return reservations
+
+
+def generate(rooms=50, guests=2000, years=1, seed=42, anchor=None):
+    """ Builds the whole data set in memory: {'room_types': [...], 'rooms': [...], ...}. """
+    rng = random.Random(seed)
+    anchor = anchor or date.today()
+    room_rows = generate_rooms(rng, rooms)
+    return {
+        'room_types': generate_room_types(),
+        'rooms': room_rows,
+        'guests': generate_guests(rng, guests),
+        'reservations': generate_reservations(rng, room_rows, guests, years, anchor),
+        'anchor': anchor,
+    }
+
+
+def _insert(cursor, query, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany(query, rows[i:i + BATCH_SIZE])
+
+def load(data):
+    """ Replaces the hotel tables' contents with `data` from generate(). Returns True on success. """
+    in_house = {row[2] for row in data['reservations'] if row[8] == 'checked-in'}
+    with pooled_connection() as conn:
+        if conn is None: return False
+        cursor = conn.cursor()
+        try:
+            for table in ('ChangeLog', 'RoomNights', 'Reservations', 'Guests', 'Rooms', 'RoomTypes'):
+                cursor.execute(f"DELETE FROM {table}")
+            _insert(cursor, """
+                INSERT INTO RoomTypes (room_type_id, type_name, description, base_price, capacity)
+                VALUES (%s, %s, %s, %s, %s)
+            """, data['room_types'])
+            _insert(cursor, """
+                INSERT INTO Rooms (room_id, room_number, room_type_id, floor_number, availability, maintenance_status)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, [room + (room[0] not in in_house, False) for room in data['rooms']])
+            _insert(cursor, """
+                INSERT INTO Guests (guest_id, first_name, last_name, email, phone, address, city, country,
+                                    passport_number, date_of_birth)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, data['guests'])
+            _insert(cursor, """
+                INSERT INTO Reservations (reservation_id, guest_id, room_id, check_in_date, check_out_date,
+                                          adults, children, special_requests, status)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, data['reservations'])
+            fill_room_nights(cursor) # Loaded behind the booking engine's back, so derive the inventory
+            conn.commit()
+            return True
+        except Error as e:
+            print(f"Error loading benchmark data: {e}")
+            conn.rollback()
+            return False
+        finally:
+            cursor.close()
@@ -0,0 +1,130 @@
+# benchmarks/memory.py
+"""
+Memory footprint of large guest result sets: dict rows versus records.
+
+Run from the project root:
+
+    python -m benchmarks.memory                       # 500,000 guests in embedded SQLite
+    python -m benchmarks.memory --guests 100000 --output memory.json
+
+Loads a synthetic Guests table, then reads it whole in several ways and
+reports, per row, the memory still held by the result (tracemalloc, so
+the strings are included), the size of the row container alone and the
+read time:
+
+    dict       cursor(dictionary=True).fetchall(), what get_all_guests used to return
+    tuple      plain cursor fetchall(), the lower bound
+    record     get_all_guests(): GuestSummary records (db/records.py)
+    stream     iter_all_guests() consumed row by row; only the peak matters
+    index      the in-memory guest search index built over the same table
+               (opt-in with --variants: building it under tracemalloc takes minutes)
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import config
+from db.connection import use_backend, close_pool, pooled_connection
+from db.guest_queries import get_all_guests, iter_all_guests
+from db.guest_search import get_guest_search_index, invalidate_guest_search_index
+
+from benchmarks import generator
+
+GUEST_COLUMNS_SQL = "SELECT guest_id, first_name, last_name, email, phone FROM Guests ORDER BY last_name, first_name"
+
+
+def _fetch(dictionary):
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            cursor.execute(GUEST_COLUMNS_SQL)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+def _stream():
+    """ Walks every guest without keeping them, like an export or a progressive view. """
+    return sum(1 for _ in iter_all_guests())
+
+def _build_index():
+    invalidate_guest_search_index()
+    return get_guest_search_index()
+
+VARIANTS = [
+    ('dict', lambda: _fetch(dictionary=True)),
+    ('tuple', lambda: _fetch(dictionary=False)),
+    ('record', get_all_guests),
+    ('stream', _stream),
+    ('index', _build_index),
+]
+
+
+def measure(read, rows):
+    """ Retained and peak bytes per row, container bytes per row and seconds for one read. """
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = read()
+    seconds = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    first = result[0] if isinstance(result, list) and result else None
+    measured = {
+        'rows': result if isinstance(result, int) else len(result),
+        'retained_bytes_per_row': round(current / rows, 1),
+        'peak_bytes_per_row': round(peak / rows, 1),
+        'container_bytes_per_row': sys.getsizeof(first) if first is not None else None,
+        'seconds': round(seconds, 3),
+    }
+    del result, first
+    invalidate_guest_search_index()
+    gc.collect()
+    return measured
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory held by large guest result sets.")
+    parser.add_argument('--guests', type=int, default=500000)
+    parser.add_argument('--variants', nargs='+', choices=[name for name, _ in VARIANTS],
+                        default=['dict', 'tuple', 'record', 'stream'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=tempfile.gettempdir(), help="Where the SQLite file goes")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(args.workdir, f"memory_{args.guests}.db")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    use_backend('sqlite', dict(config.SQLITE_CONFIG, database=path))
+    started = time.perf_counter()
+    data = generator.generate(rooms=50, guests=args.guests, years=1, seed=args.seed)
+    if not generator.load(data):
+        raise SystemExit("Could not load benchmark data.")
+    del data
+    print(f"{args.guests} guests loaded in {time.perf_counter() - started:.1f}s")
+
+    report = {'guests': args.guests, 'python': sys.version.split()[0], 'results': {}}
+    for name, read in VARIANTS:
+        if name not in args.variants:
+            continue
+        result = measure(read, args.guests)
+        report['results'][name] = result
+        container = result['container_bytes_per_row']
+        print(f"  {name:<8} retained {result['retained_bytes_per_row']:>7.1f} B/row  "
+              f"peak {result['peak_bytes_per_row']:>7.1f} B/row  "
+              f"container {container if container is not None else '-':>4} B  {result['seconds']:>6.2f}s")
+    close_pool()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# benchmarks/run.py
+"""
+Benchmarks the db query layer against synthetic hotels of several sizes.
+
+Run from the project root:
+
+    python -m benchmarks.run                                  # embedded SQLite, small + medium
+    python -m benchmarks.run --sizes small medium large --output results.json
+    python -m benchmarks.run --backend mysql --database hotel_bench
+
+Every case reports p50/p95/p99 latency and throughput; --output saves the
+results as JSON for benchmarks/compare.py.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import config
+from db.connection import use_backend, close_pool, get_pool_stats
+from db.availability import get_availability_index, invalidate_availability_index
+from db.guest_search import get_guest_search_index, invalidate_guest_search_index
+from db.room_queries import (get_available_rooms_for_booking, _get_available_rooms_sql, get_all_rooms_with_details,
+                             get_rooms_page, get_dashboard_stats, invalidate_dashboard_stats)
+from db.guest_queries import find_guest_by_name_db, get_guest_by_id_db, get_all_guests, iter_all_guests
+from db.reservation_queries import find_reservation_for_checkin_db, find_reservation_for_checkout_db
+from db.inventory import get_rooms_free_for_nights, get_occupancy_calendar
+from db.front_desk import lookup_front_desk, invalidate_front_desk_index
+from db.billing import bill_reservations, revenue_report, STAY_COLUMNS_SQL, REVENUE_STATUSES
+from db.connection import pooled_connection
+from db.cache import invalidate_caches
+
+from benchmarks import generator
+
+
+class Case:
+    """ One benchmarked call: `make_args(rng)` returns the (args, kwargs) for each iteration. """
+    def __init__(self, name, func, make_args=None, iterations=None, setup=None, teardown=None):
+        self.name = name
+        self.func = func
+        self.make_args = make_args or (lambda rng: ((), {}))
+        self.iterations = iterations # None = use the runner's --iterations
+        self.setup = setup
+        self.teardown = teardown
+
+
+def _set_search_mode(mode):
+    previous = config.GUEST_SEARCH_CONFIG.get('mode')
+    config.GUEST_SEARCH_CONFIG['mode'] = mode
+    return previous
+
+def _rebuild_availability_index():
+    invalidate_availability_index()
+    return get_availability_index()
+
+def _rebuild_guest_search_index():
+    invalidate_guest_search_index()
+    return get_guest_search_index()
+
+
+def _revenue_report_loop(start, end):
+    """ Per-row Python version of revenue_report(start, end, 'month') room revenue, for comparison. """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(STAY_COLUMNS_SQL + f"""
+                WHERE res.status IN ({', '.join(['%s'] * len(REVENUE_STATUSES))})
+                  AND res.check_in_date < %s AND res.check_out_date > %s
+            """, REVENUE_STATUSES + (end, start))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    revenue, sold = {}, {}
+    for _, _, check_in, check_out, rate in rows:
+        night = max(check_in, start)
+        while night < min(check_out, end):
+            month = night.replace(day=1)
+            revenue[month] = revenue.get(month, 0) + rate
+            sold[month] = sold.get(month, 0) + 1
+            night += timedelta(days=1)
+    return revenue, sold
+
+def _uncached(func):
+    """ `func` with the reference-data caches emptied before every call, for comparison. """
+    def call(*args, **kwargs):
+        invalidate_caches()
+        return func(*args, **kwargs)
+    return call
+
+def _first_guests(n):
+    """ Time to the first screenful from the guest stream (the rest is never fetched). """
+    stream = iter_all_guests(batch_size=n)
+    try:
+        return [guest for guest, _ in zip(stream, range(n))]
+    finally:
+        stream.close()
+
+def _find_checkin_then_checkout(search_key):
+    """ The check-in/out frame's former lookup: two queries when the first one misses. """
+    return find_reservation_for_checkin_db(search_key) or find_reservation_for_checkout_db(search_key)
+
+def build_cases(data):
+    """ The benchmark cases, with arguments drawn from the generated data. """
+    anchor = data['anchor']
+    room_numbers = [room[1] for room in data['rooms']]
+    last_names = sorted({guest[2] for guest in data['guests']})
+    arrivals = [res for res in data['reservations'] if res[3] == anchor and res[8] == 'confirmed']
+    guests_by_id = {guest[0]: guest for guest in data['guests']}
+    guest_ids = list(guests_by_id)
+    arrival_names = [guests_by_id[res[1]][2] for res in arrivals] or last_names
+    year_ago = anchor - timedelta(days=365)
+    recent_stays = [res[0] for res in data['reservations'] if res[8] == 'checked-out'][-5000:] or [1]
+    in_house_rooms = [room_numbers[res[2] - 1] for res in data['reservations'] if res[8] == 'checked-in'] or room_numbers
+
+    def stay_window(rng):
+        check_in = anchor + timedelta(days=rng.randrange(0, 60))
+        return (check_in, check_in + timedelta(days=rng.choice(generator.STAY_NIGHTS))), {}
+
+    def name_term(rng):
+        name = rng.choice(last_names)
+        return (name[:rng.choice((2, 3, 4, len(name)))],), {} # Type-ahead style prefixes
+
+    previous_mode = {}
+    def use_mode(mode):
+        def setup():
+            previous_mode[mode] = _set_search_mode(mode)
+        def teardown():
+            _set_search_mode(previous_mode.pop(mode))
+        return setup, teardown
+
+    like_setup, like_teardown = use_mode('like')
+    memory_setup, memory_teardown = use_mode('memory')
+    return [
+        Case('availability_index_build', _rebuild_availability_index, iterations=5),
+        Case('get_available_rooms_for_booking', get_available_rooms_for_booking, stay_window),
+        Case('get_available_rooms_for_booking[sql]', _get_available_rooms_sql, stay_window),
+        Case('get_rooms_free_for_nights', get_rooms_free_for_nights,
+             lambda rng: ((anchor + timedelta(days=rng.randrange(0, 60)), rng.choice(generator.STAY_NIGHTS)), {})),
+        Case('get_occupancy_calendar[365d]', get_occupancy_calendar, lambda rng: ((anchor, 365), {})),
+        Case('revenue_report[365d]', revenue_report, lambda rng: ((year_ago, anchor), {}), iterations=10),
+        Case('revenue_report[365d,python-loop]', _revenue_report_loop, lambda rng: ((year_ago, anchor), {}),
+             iterations=3),
+        Case('bill_reservations[checkout]', bill_reservations, lambda rng: (([rng.choice(recent_stays)],), {})),
+        Case('bill_reservations[500]', bill_reservations, lambda rng: ((rng.sample(recent_stays, min(500, len(recent_stays))),), {}),
+             iterations=20),
+        Case('guest_search_index_build', _rebuild_guest_search_index, iterations=3),
+        Case('find_guest_by_name_db[memory]', find_guest_by_name_db, name_term,
+             setup=memory_setup, teardown=memory_teardown),
+        Case('find_guest_by_name_db[like]', find_guest_by_name_db, name_term,
+             setup=like_setup, teardown=like_teardown),
+        Case('get_all_guests', get_all_guests, iterations=20),
+        Case('iter_all_guests[first 50]', _first_guests, lambda rng: ((50,), {})),
+        Case('get_all_rooms_with_details', get_all_rooms_with_details),
+        Case('get_all_rooms_with_details[uncached]', _uncached(get_all_rooms_with_details)),
+        Case('get_guest_by_id_db', get_guest_by_id_db, lambda rng: ((rng.choice(guest_ids[:200]),), {})),
+        Case('get_guest_by_id_db[uncached]', _uncached(get_guest_by_id_db), lambda rng: ((rng.choice(guest_ids),), {})),
+        Case('get_rooms_page', get_rooms_page,
+             lambda rng: ((rng.choice([None] + room_numbers),), {'limit': 100})),
+        Case('get_dashboard_stats[uncached]', get_dashboard_stats, lambda rng: ((), {'max_age': 0})),
+        Case('find_reservation_for_checkin_db', find_reservation_for_checkin_db,
+             lambda rng: ((rng.choice(arrival_names),), {})),
+        Case('find_reservation_for_checkout_db', find_reservation_for_checkout_db,
+             lambda rng: ((rng.choice(in_house_rooms),), {})),
+        Case('find_checkin_then_checkout[room]', _find_checkin_then_checkout,
+             lambda rng: ((rng.choice(in_house_rooms),), {})),
+        Case('lookup_front_desk[room]', lookup_front_desk, lambda rng: ((rng.choice(in_house_rooms),), {})),
+        Case('lookup_front_desk[name]', lookup_front_desk, lambda rng: ((rng.choice(arrival_names),), {})),
+        Case('lookup_front_desk[miss]', lookup_front_desk, lambda rng: ((f"Nobody{rng.randrange(10 ** 6)}",), {})),
+    ]
+
+
+def summarize(samples, wall_time):
+    """ Latency percentiles (ms) and throughput (calls/s) from per-call timings in seconds. """
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) > 1:
+        cuts = statistics.quantiles(ms, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ms[0] if ms else 0.0
+    return {
+        'iterations': len(ms),
+        'p50_ms': round(p50, 4),
+        'p95_ms': round(p95, 4),
+        'p99_ms': round(p99, 4),
+        'mean_ms': round(statistics.fmean(ms), 4) if ms else 0.0,
+        'min_ms': round(ms[0], 4) if ms else 0.0,
+        'max_ms': round(ms[-1], 4) if ms else 0.0,
+        'throughput_per_s': round(len(ms) / wall_time, 2) if wall_time > 0 else None,
+    }
+
+def run_case(case, iterations, warmup, seed):
+    rng = random.Random(f"{seed}:{case.name}") # Same arguments for every run of this case
+    if case.setup:
+        case.setup()
+    try:
+        n = case.iterations or iterations
+        calls = [case.make_args(rng) for _ in range(warmup + n)]
+        for args, kwargs in calls[:warmup]:
+            case.func(*args, **kwargs)
+        samples = []
+        started = time.perf_counter()
+        for args, kwargs in calls[warmup:]:
+            t0 = time.perf_counter()
+            case.func(*args, **kwargs)
+            samples.append(time.perf_counter() - t0)
+        return summarize(samples, time.perf_counter() - started)
+    finally:
+        if case.teardown:
+            case.teardown()
+
+
+def prepare_database(args, size_name, workdir):
+    """ Points the pool at a fresh database for `size_name` and fills it. Returns the data set. """
+    if args.backend == 'sqlite':
+        path = os.path.join(workdir, f"bench_{size_name}.db")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        use_backend('sqlite', dict(config.SQLITE_CONFIG, database=path))
+    else:
+        use_backend('mysql', dict(config.DB_CONFIG, database=args.database))
+
+    # Cached state from the previous size must not leak into this one
+    invalidate_availability_index()
+    invalidate_guest_search_index()
+    invalidate_front_desk_index()
+    invalidate_dashboard_stats()
+    invalidate_caches()
+
+    size = generator.SIZES[size_name]
+    started = time.perf_counter()
+    data = generator.generate(seed=args.seed, anchor=args.anchor, **size)
+    if not generator.load(data):
+        raise SystemExit(f"Could not load benchmark data for size '{size_name}'.")
+    print(f"[{size_name}] {len(data['rooms'])} rooms, {len(data['guests'])} guests, "
+          f"{len(data['reservations'])} reservations loaded in {time.perf_counter() - started:.1f}s")
+    return data
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hotel db query layer.")
+    parser.add_argument('--backend', choices=('sqlite', 'mysql'), default='sqlite')
+    parser.add_argument('--database', default='hotel_bench',
+                        help="MySQL database to fill (its contents are replaced!)")
+    parser.add_argument('--sizes', nargs='+', choices=list(generator.SIZES), default=['small', 'medium'])
+    parser.add_argument('--cases', nargs='+', help="Only run cases whose name contains one of these strings")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=date.fromisoformat, default=date.today(),
+                        help="'Today' of the generated hotel (YYYY-MM-DD); queries use the real today")
+    parser.add_argument('--workdir', default=tempfile.gettempdir(), help="Where SQLite benchmark files go")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.backend == 'mysql' and args.database == config.DB_CONFIG.get('database'):
+        parser.error("refusing to overwrite the application database; pass a separate --database")
+
+    report = {
+        'meta': {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'seed': args.seed,
+            'anchor': args.anchor.isoformat(),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'sizes': {name: generator.SIZES[name] for name in args.sizes},
+        },
+        'results': [],
+    }
+
+    for size_name in args.sizes:
+        data = prepare_database(args, size_name, args.workdir)
+        for case in build_cases(data):
+            if args.cases and not any(part in case.name for part in args.cases):
+                continue
+            result = run_case(case, args.iterations, args.warmup, args.seed)
+            result.update(size=size_name, case=case.name)
+            report['results'].append(result)
+            print(f"  {case.name:<40} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+                  f"p99 {result['p99_ms']:>9.3f} ms  {result['throughput_per_s'] or 0:>10.1f}/s")
+        report.setdefault('pool', {})[size_name] = get_pool_stats()
+        close_pool()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
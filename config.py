@@ -1,8 +1,110 @@
 # config.py
 # IMPORTANT: Add this file to your .gitignore!
+
+# Storage backend: 'mysql' (server, settings in DB_CONFIG) or 'sqlite' (local file, SQLITE_CONFIG)
+DB_BACKEND = 'mysql'
+
 DB_CONFIG = {
     'host': 'localhost',      # Or your MySQL server IP/hostname
     'user': 'your_db_user',   # Replace with your MySQL username
     'password': 'your_db_password', # Replace with your MySQL password
-    'database': 'hotelmanagment' # The database name you created
-}
\ No newline at end of file
+    'database': 'hotelmanagment', # The database name you created
+
+    # --- Connection pool settings (not passed to mysql.connector.connect) ---
+    'pool_size': 5,           # Max connections kept open and handed out at once
+    'pool_timeout': 10,       # Seconds to wait for a free connection before giving up
+    'pool_recycle': 1800,     # Reconnect connections older than this many seconds
+    'pool_ping_interval': 30  # Ping idle connections unused for this long before reuse
+}
+
+SQLITE_CONFIG = {
+    'database': 'hotel.db',   # Path of the database file (created if missing)
+    'busy_timeout': 5.0,      # Seconds to wait on a locked database before failing
+    'create_schema': True,    # Create the tables on first connect if they don't exist
+    'pragmas': {},            # Overrides for SQLiteBackend.DEFAULT_PRAGMAS (WAL, synchronous=NORMAL, ...)
+    'pool_size': 8,
+    'pool_timeout': 10,
+    'pool_recycle': 86400,
+    'pool_ping_interval': 300
+}
+
+# Guest search (db/guest_search.py)
+GUEST_SEARCH_CONFIG = {
+    'mode': 'memory', # 'memory' (in-process trigram index), 'fulltext' (MySQL FULLTEXT, migration 4) or 'like'
+    'limit': 50       # Max results returned per search (ranked best first)
+}
+
+# Change feed (db/changes.py): how often each terminal polls for other terminals' writes
+CHANGE_FEED_CONFIG = {
+    'poll_interval_ms': 5000 # Set to 0 to disable polling
+}
+
+# Start-up instrumentation (gui/startup.py)
+STARTUP_CONFIG = {
+    'report': True,    # Print a startup timeline (and lazily built frames) to the console
+    'budget_ms': 300   # Warn when the first paint takes longer than this
+}
+
+# Query timing (db/instrumentation.py), shown under View > Diagnostics
+INSTRUMENTATION_CONFIG = {
+    'enabled': True,
+    'slow_query_ms': 200,  # Calls slower than this go to the slow-query log
+    'slow_log_size': 200   # Slow-query log entries kept in memory
+}
+
+# Booking engine (db/reservation_queries.py)
+RESERVATION_CONFIG = {
+    'deadlock_retries': 5,  # Retries after a deadlock / lock wait timeout before giving up
+    'retry_backoff': 0.02   # Seconds before the first retry; doubles each attempt (with jitter)
+}
+
+# Billing engine (db/billing.py): taxes applied on top of the pre-tax folio amounts
+BILLING_CONFIG = {
+    'room_tax_rate': 0.10,    # Accommodation tax on room charges
+    'service_tax_rate': 0.20  # VAT on services (minibar, restaurant...)
+}
+
+# Occupancy/revenue reports (reports/occupancy.py)
+REPORTS_CONFIG = {
+    'directory': 'report_output', # Where report files are written
+    'format': 'csv',              # 'csv' or 'parquet' (needs pyarrow)
+    'workers': 0,                 # Processes computing months in parallel (0 = one per CPU)
+    'batch_size': 5000            # Reservations fetched per round trip while streaming
+}
+
+# Bulk import/export (db/transfer.py)
+TRANSFER_CONFIG = {
+    'batch_size': 1000,        # Rows per import transaction (and per checkpoint)
+    'export_batch_size': 5000  # Rows fetched per round trip while exporting
+}
+
+# Type-ahead guest search in the booking and guest screens (gui/type_ahead.py)
+TYPE_AHEAD_CONFIG = {
+    'delay_ms': 250,     # Quiet time after the last keystroke before searching
+    'min_chars': 2,      # Shorter terms clear the results instead of searching
+    'fetch_limit': 200,  # Rows fetched per query; a complete result set is refined locally as the term grows
+    'show': 20           # Top matches shown in the booking screen's drop-down
+}
+
+# Front-desk lookup (db/front_desk.py): today's arrivals and in-house stays held in memory
+FRONT_DESK_CONFIG = {
+    'reload_after': 900 # Seconds before the index is rebuilt from scratch (it also follows the change feed)
+}
+
+# Headless HTTP/JSON API for channel managers (api/server.py)
+API_CONFIG = {
+    'host': '127.0.0.1',        # Interface to listen on; there is no authentication, keep it local or proxied
+    'port': 8080,
+    'batch_window_ms': 2,       # Availability / guest-by-id reads arriving this close together share one bulk call
+    'max_batch': 64,            # A batch is sent early once it has this many distinct keys
+    'keep_alive_timeout': 15,   # Seconds an idle keep-alive connection is held open
+    'max_body': 1024 * 1024     # Largest accepted request body, in bytes
+}
+
+# Read-through caches for reference data (db/cache.py); writes and the change feed invalidate them
+CACHE_CONFIG = {
+    'enabled': True,
+    'room_types': {'ttl': 3600, 'max_entries': 1},  # All room types as one entry; no write path in the app
+    'rooms': {'ttl': 600, 'max_entries': 1},        # The Rooms/RoomTypes join as one entry
+    'guests': {'ttl': 300, 'max_entries': 5000}     # Guest records by id
+}
@@ -0,0 +1,291 @@
+# db/availability.py
+import threading
+from bisect import bisect_left
+from datetime import date, datetime
+
+from .connection import pooled_connection, Error
+from .changes import subscribe
+from .records import AvailableRoom
+
+# Reservation statuses that block a room
+ACTIVE_STATUSES = ('confirmed', 'checked-in')
+
+
+def _to_date(value):
+    """ Accepts a date, datetime or 'YYYY-MM-DD' string and returns a date. """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class RoomStays:
+    """ Active stays of one room, sorted by check-in date.
+
+    `max_end[i]` is the latest check-out among the first i+1 stays, so an
+    overlap test is one bisect plus one comparison even if stays overlap.
+    """
+    __slots__ = ('starts', 'stays', 'max_end')
+
+    def __init__(self):
+        self.starts = []  # check-in dates, sorted
+        self.stays = []   # (check_in, check_out, reservation_id), same order
+        self.max_end = [] # running max of check_out
+
+    def add(self, check_in, check_out, reservation_id):
+        pos = bisect_left(self.starts, check_in)
+        self.starts.insert(pos, check_in)
+        self.stays.insert(pos, (check_in, check_out, reservation_id))
+        self.max_end.insert(pos, check_out)
+        self._fix_max_from(pos)
+
+    def remove(self, reservation_id):
+        for pos, stay in enumerate(self.stays):
+            if stay[2] == reservation_id:
+                del self.starts[pos]
+                del self.stays[pos]
+                del self.max_end[pos]
+                self._fix_max_from(pos)
+                return True
+        return False
+
+    def _fix_max_from(self, pos):
+        running = self.max_end[pos - 1] if pos > 0 else None
+        for i in range(pos, len(self.stays)):
+            end = self.stays[i][1]
+            running = end if running is None or end > running else running
+            self.max_end[i] = running
+
+    def is_free(self, check_in, check_out):
+        """ True if no stay overlaps the half-open range [check_in, check_out). """
+        idx = bisect_left(self.starts, check_out) # stays[:idx] start before check_out
+        return idx == 0 or self.max_end[idx - 1] <= check_in
+
+
+class AvailabilityIndex:
+    """ In-process index of active stays per room for fast availability lookups.
+
+    Loaded once from the database, then kept current by the reservation and
+    room write functions (see note_* helpers below).
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.rooms = {}       # room_id -> AvailableRoom
+        self.maintenance = {} # room_id -> bool
+        self._room_order = [] # room_ids ordered by room_number
+        self._stays = {}      # room_id -> RoomStays
+        self._reservations = {} # reservation_id -> room_id
+
+    def load(self, cursor):
+        """ Builds the index from the database using an open dictionary cursor. """
+        cursor.execute("""
+            SELECT r.room_id, r.room_number, rt.type_name, rt.base_price, r.maintenance_status
+            FROM Rooms r
+            JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
+            ORDER BY r.room_number
+        """)
+        room_rows = cursor.fetchall()
+        cursor.execute("""
+            SELECT reservation_id, room_id, check_in_date, check_out_date
+            FROM Reservations
+            WHERE status IN ('confirmed', 'checked-in')
+        """)
+        stay_rows = cursor.fetchall()
+
+        with self._lock:
+            self.rooms.clear()
+            self.maintenance.clear()
+            self._stays.clear()
+            self._reservations.clear()
+            for row in room_rows:
+                room_id = row['room_id']
+                self.maintenance[room_id] = bool(row.pop('maintenance_status'))
+                self.rooms[room_id] = AvailableRoom.from_dict(row)
+                self._stays[room_id] = RoomStays()
+            self._room_order = [row['room_id'] for row in room_rows]
+            for row in stay_rows:
+                self.add_stay(row['reservation_id'], row['room_id'], row['check_in_date'], row['check_out_date'])
+
+    # --- Incremental updates ---
+
+    def add_stay(self, reservation_id, room_id, check_in, check_out):
+        with self._lock:
+            stays = self._stays.get(room_id)
+            if stays is None:
+                return False # Unknown room (added after load); caller should invalidate
+            self.remove_stay(reservation_id) # Re-adding replaces the old dates
+            stays.add(_to_date(check_in), _to_date(check_out), reservation_id)
+            self._reservations[reservation_id] = room_id
+            return True
+
+    def remove_stay(self, reservation_id):
+        with self._lock:
+            room_id = self._reservations.pop(reservation_id, None)
+            if room_id is not None:
+                self._stays[room_id].remove(reservation_id)
+
+    def set_maintenance(self, room_id, in_maintenance):
+        with self._lock:
+            if room_id in self.maintenance:
+                self.maintenance[room_id] = bool(in_maintenance)
+
+    # --- Queries ---
+
+    def free_room_ids(self, check_in, check_out):
+        """ Room ids (ordered by room number) free for [check_in, check_out). """
+        check_in, check_out = _to_date(check_in), _to_date(check_out)
+        with self._lock:
+            return [room_id for room_id in self._room_order
+                    if not self.maintenance[room_id] and self._stays[room_id].is_free(check_in, check_out)]
+
+    def free_rooms(self, check_in, check_out):
+        """ Same rows as get_available_rooms_for_booking, answered from memory (shared records). """
+        with self._lock:
+            return [self.rooms[room_id] for room_id in self.free_room_ids(check_in, check_out)]
+
+    def free_rooms_multi(self, date_ranges):
+        """ Answers several candidate windows at once: {(check_in, check_out): [rooms]}. """
+        with self._lock:
+            return {(check_in, check_out): self.free_rooms(check_in, check_out)
+                    for check_in, check_out in date_ranges}
+
+
+_index = None
+_index_lock = threading.Lock()
+# While the index is being loaded: updates committed meanwhile, replayed onto it before it is published
+_pending = None
+_pending_lock = threading.Lock()
+
+def get_availability_index():
+    """ Returns the loaded availability index, building it on first use.
+
+    Returns None if it cannot be loaded, so callers fall back to SQL.
+    Writes noted while the load runs are queued and replayed onto the new
+    index, so a reservation committed between the load's SELECT and its
+    publication is not lost.
+    """
+    global _index, _pending
+    if _index is not None:
+        return _index
+    with _index_lock:
+        if _index is None:
+            with _pending_lock:
+                _pending = []
+            index = None
+            with pooled_connection() as conn:
+                if conn is not None:
+                    cursor = conn.cursor(dictionary=True)
+                    try:
+                        index = AvailabilityIndex()
+                        index.load(cursor)
+                    except Error as e:
+                        print(f"Error loading availability index: {e}")
+                        index = None
+                    finally:
+                        cursor.close()
+            # Replay outside the lock (a remote change re-reads the database); updates are
+            # idempotent, so replaying one the load already saw is harmless
+            usable = index is not None
+            while True:
+                with _pending_lock:
+                    updates = _pending
+                    if not updates:
+                        _pending = None
+                        if usable:
+                            _index = index
+                        break
+                    _pending = []
+                usable = usable and all(apply(index) for apply in updates)
+    return _index
+
+def invalidate_availability_index():
+    """ Drops the index; the next query reloads it from the database. """
+    global _index
+    with _pending_lock:
+        if _pending is not None:
+            _pending.append(lambda index: False) # Also discard a load in progress
+    with _index_lock:
+        _index = None
+
+def _update_index(apply):
+    """ Runs apply(index) on the loaded index, or queues it for one being loaded.
+
+    apply returns False when the index cannot be patched and must be rebuilt.
+    """
+    with _pending_lock:
+        if _pending is not None:
+            _pending.append(apply)
+            return
+        index = _index
+    if index is not None and not apply(index):
+        invalidate_availability_index()
+
+# --- Hooks called by the write functions in room_queries / reservation_queries ---
+# They only touch an index that is loaded or loading; an unloaded index will
+# pick the change up from the database when it is built.
+
+def note_reservation_added(reservation_id, room_id, check_in, check_out):
+    _update_index(lambda index: index.add_stay(reservation_id, room_id, check_in, check_out))
+
+def note_reservation_status(reservation_id, new_status, room_id=None, check_in=None, check_out=None):
+    """ A stay moving into ACTIVE_STATUSES is (re-)added with its room and dates; otherwise it is removed. """
+    def apply(index):
+        if new_status in ACTIVE_STATUSES:
+            return room_id is not None and index.add_stay(reservation_id, room_id, check_in, check_out)
+        index.remove_stay(reservation_id)
+        return True
+    _update_index(apply)
+
+def note_room_maintenance(room_id, in_maintenance):
+    if in_maintenance is not None:
+        _update_index(lambda index: index.set_maintenance(room_id, in_maintenance) or True)
+
+# --- Changes made by other terminals (see db/changes.poll_changes) ---
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+def _apply_remote_change(index, table, row_ids):
+    """ Re-reads the changed rows and patches `index`. False if it must be rebuilt instead. """
+    if not row_ids:
+        return False
+    with pooled_connection() as conn:
+        if conn is None:
+            return False
+        cursor = conn.cursor(dictionary=True)
+        try:
+            if table == 'Reservations':
+                cursor.execute(f"""
+                    SELECT reservation_id, room_id, check_in_date, check_out_date, status
+                    FROM Reservations WHERE reservation_id IN ({_placeholders(row_ids)})
+                """, tuple(row_ids))
+                for row in cursor.fetchall():
+                    if row['status'] in ACTIVE_STATUSES:
+                        if not index.add_stay(row['reservation_id'], row['room_id'], row['check_in_date'], row['check_out_date']):
+                            return False
+                    else:
+                        index.remove_stay(row['reservation_id'])
+            elif table == 'Rooms':
+                cursor.execute(f"SELECT room_id, maintenance_status FROM Rooms WHERE room_id IN ({_placeholders(row_ids)})",
+                               tuple(row_ids))
+                rows = cursor.fetchall()
+                if any(row['room_id'] not in index.rooms for row in rows):
+                    return False # New room: rebuild rather than patch
+                for row in rows:
+                    index.set_maintenance(row['room_id'], row['maintenance_status'])
+            return True
+        except Error as e:
+            print(f"Error applying remote change to availability index: {e}")
+            return False
+        finally:
+            cursor.close()
+
+def _on_remote_change(table, action, row_ids, origin):
+    """ Applies reservation/room changes logged by other terminals to a loaded (or loading) index. """
+    if origin != 'remote':
+        return
+    _update_index(lambda index: _apply_remote_change(index, table, row_ids))
+
+subscribe('Reservations', _on_remote_change)
+subscribe('Rooms', _on_remote_change)
@@ -0,0 +1,279 @@
+# db/backends.py
+"""
+Storage backends for the db package.
+
+Query modules are written against the mysql.connector API (`%s`
+placeholders, `cursor(dictionary=True)`, commit/rollback). Each backend
+hands out connections that speak that API: MySQL natively (wrapped only to
+turn driver errors into DatabaseError), SQLite through a thin adapter that
+translates the few MySQL-isms the queries use.
+"""
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class DatabaseError(Exception):
+    """ Backend-neutral error raised by the db package itself (e.g. the pool). """
+    def __init__(self, msg=None, errno=None):
+        super().__init__(msg)
+        self.msg = msg
+        self.errno = errno
+
+
+# Catch-all for `except Error` in query modules, whichever backend is active.
+# mysql.connector errors are re-raised as DatabaseError by the MySQL adapter
+# below, so the driver is only imported when a MySQL connection is opened
+# (on the DB worker thread), never when the db package is imported.
+Error = (DatabaseError, sqlite3.Error)
+
+
+# --- MySQL ---
+
+class _MySQLProxy:
+    """ Delegates to a mysql.connector object, re-raising driver errors as DatabaseError (errno kept). """
+    def __init__(self, raw, driver_error):
+        self._raw = raw
+        self._driver_error = driver_error
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except self._driver_error as e:
+            raise DatabaseError(msg=str(e), errno=getattr(e, 'errno', None)) from e
+
+    def __getattr__(self, name):
+        value = getattr(self._raw, name)
+        if not callable(value):
+            return value # lastrowid, rowcount, description, in_transaction...
+        return lambda *args, **kwargs: self._call(value, *args, **kwargs)
+
+
+class MySQLCursor(_MySQLProxy):
+    """ mysql.connector cursor with backend-neutral errors. """
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+
+class MySQLConnection(_MySQLProxy):
+    """ mysql.connector connection with backend-neutral errors. """
+    def cursor(self, *args, **kwargs):
+        return MySQLCursor(self._call(self._raw.cursor, *args, **kwargs), self._driver_error)
+
+
+class MySQLBackend:
+    """ MySQL / MariaDB through mysql.connector (the original backend). """
+    name = 'mysql'
+    supports_fulltext = True
+
+    def connect(self, params):
+        try:
+            import mysql.connector # Imported lazily so SQLite-only setups never load it
+        except ImportError:
+            raise DatabaseError(msg="mysql-connector-python is not installed (pip install -r requirements.txt)")
+        try:
+            raw = mysql.connector.connect(**params)
+        except mysql.connector.Error as e:
+            raise DatabaseError(msg=str(e), errno=getattr(e, 'errno', None)) from e
+        return MySQLConnection(raw, mysql.connector.Error)
+
+    # ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT: the transaction was rolled back and can simply be retried
+    RETRYABLE_ERRNOS = (1213, 1205)
+
+    def is_retryable(self, error):
+        return getattr(error, 'errno', None) in self.RETRYABLE_ERRNOS
+
+
+# --- SQLite ---
+
+def _adapt_date(value):
+    return value.isoformat()
+
+def _adapt_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def _convert_date(raw):
+    return date.fromisoformat(raw.decode()[:10])
+
+def _convert_timestamp(raw):
+    return datetime.fromisoformat(raw.decode())
+
+def _convert_decimal(raw):
+    return Decimal(raw.decode())
+
+sqlite3.register_adapter(date, _adapt_date)
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+sqlite3.register_converter('DATETIME', _convert_timestamp)
+sqlite3.register_converter('DECIMAL', _convert_decimal)
+
+# MySQL-isms used by the query modules, and their SQLite spelling
+_SQLITE_REWRITES = [
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bCURDATE\(\)', re.I), "date('now', 'localtime')"),
+    (re.compile(r'\bNOW\(\)', re.I), "datetime('now', 'localtime')"),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'\s+FOR\s+UPDATE\b', re.I), ''), # SQLite locks the whole DB on write instead
+]
+
+_translated = {}
+_translated_lock = threading.Lock()
+
+def translate_sql(sql):
+    """ Rewrites a MySQL-dialect statement for SQLite (results are memoized). """
+    cached = _translated.get(sql)
+    if cached is None:
+        cached = sql
+        for pattern, replacement in _SQLITE_REWRITES:
+            cached = pattern.sub(replacement, cached)
+        with _translated_lock:
+            _translated[sql] = cached
+    return cached
+
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """ mysql.connector-style cursor over sqlite3. """
+    def __init__(self, raw_cursor, dictionary=False):
+        self._cursor = raw_cursor
+        if dictionary:
+            self._cursor.row_factory = _dict_row
+
+    def execute(self, operation, params=()):
+        self._cursor.execute(translate_sql(operation), tuple(params or ()))
+        return None
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(translate_sql(operation), [tuple(p) for p in seq_params])
+        return None
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """ mysql.connector-style connection over sqlite3. """
+    def __init__(self, raw):
+        self._raw = raw
+        self._closed = False
+
+    def cursor(self, dictionary=False, buffered=None, **kwargs):
+        return SQLiteCursor(self._raw.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def start_transaction(self):
+        # IMMEDIATE takes the write lock up front, like SELECT ... FOR UPDATE would
+        self._raw.execute('BEGIN IMMEDIATE')
+
+    def is_connected(self):
+        return not self._closed
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self._raw.execute('SELECT 1').fetchone()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._raw.close()
+
+
+class SQLiteBackend:
+    """ Embedded SQLite database file: no server needed, WAL mode for concurrent readers. """
+    name = 'sqlite'
+    supports_fulltext = False
+
+    DEFAULT_PRAGMAS = {
+        'journal_mode': 'WAL',     # Readers never block the writer
+        'synchronous': 'NORMAL',   # Safe with WAL, far fewer fsyncs than FULL
+        'foreign_keys': 'ON',
+        'temp_store': 'MEMORY',
+        'cache_size': -64000,      # ~64 MB page cache (negative = KiB)
+        'mmap_size': 268435456,    # 256 MB memory-mapped I/O
+    }
+
+    def is_retryable(self, error):
+        # Another connection held the write lock for longer than busy_timeout
+        return isinstance(error, sqlite3.OperationalError) and ('locked' in str(error) or 'busy' in str(error))
+
+    def __init__(self):
+        self._schema_lock = threading.Lock()
+        self._schema_ready = set() # database paths already bootstrapped in this process
+
+    def connect(self, params):
+        path = params.get('database', 'hotel.db')
+        raw = sqlite3.connect(
+            path,
+            timeout=params.get('busy_timeout', 5.0),
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False, # Pooled connections move between threads (one at a time)
+        )
+        pragmas = dict(self.DEFAULT_PRAGMAS)
+        pragmas.update(params.get('pragmas') or {})
+        for pragma, value in pragmas.items():
+            raw.execute(f"PRAGMA {pragma} = {value}")
+        conn = SQLiteConnection(raw)
+        if params.get('create_schema', True):
+            self._ensure_schema(path, conn)
+        return conn
+
+    def _ensure_schema(self, path, conn):
+        """ Brings a database file up to the latest schema version (see db/migrations.py). """
+        from .migrations import migrate_connection # Imported here: migrations depends on the pool
+        with self._schema_lock:
+            if path in self._schema_ready:
+                return
+            migrate_connection(conn, self.name)
+            self._schema_ready.add(path)
+
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+def make_backend(name):
+    """ Returns a backend instance by name ('mysql' or 'sqlite'). """
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise DatabaseError(msg=f"Unknown database backend '{name}' (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,278 @@
+# db/billing.py
+"""
+Columnar billing and revenue engine.
+
+Stays are pulled with one query each into NumPy arrays (check-in and
+check-out as datetime64[D], the nightly rate from RoomTypes.base_price
+in cents), and every total is computed with array operations instead of a
+per-reservation Python loop:
+
+    bill_reservations([ids])        # invoices from the folios' running totals
+    revenue_report(start, end)      # per-day/-month room revenue, ADR, RevPAR, occupancy
+
+Money is carried as integer cents in float64 arrays (exact up to 2**53)
+and turned back into 2-place Decimals at the edge. Invoices show the tax
+posted to the folio (db/payment_queries.py); reports apply BILLING_CONFIG's
+rates to the revenue.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from .connection import pooled_connection, Error
+from .instrumentation import instrumented
+from .availability import _to_date
+from .payment_queries import post_stay_room_charges
+from config import BILLING_CONFIG
+
+# Stays that earn revenue: in house, gone, or on the books
+REVENUE_STATUSES = ('confirmed', 'checked-in', 'checked-out')
+CENTS = Decimal('0.01')
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal() # datetime64[D] counts days from here
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+def _to_cents(values):
+    """ Column of DECIMAL values (Decimal, float or str) as float64 cents. """
+    return np.rint(np.fromiter((float(v or 0) for v in values), dtype=np.float64) * 100)
+
+def _decimal(cents):
+    return (Decimal(int(cents)) / 100).quantize(CENTS)
+
+def _dates(values):
+    # Via day ordinals: much faster than letting NumPy parse date objects one by one
+    ordinals = np.fromiter((_to_date(v).toordinal() for v in values), dtype=np.int64)
+    return (ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+
+def _tax(cents, rate):
+    return np.rint(cents * rate)
+
+
+class StayColumns:
+    """ Reservations as parallel arrays, one element per stay. """
+    __slots__ = ('reservation_id', 'room_id', 'check_in', 'check_out', 'rate')
+
+    def __init__(self, rows):
+        columns = list(zip(*rows)) or [()] * 5
+        self.reservation_id = np.array(columns[0], dtype=np.int64)
+        self.room_id = np.array(columns[1], dtype=np.int64)
+        self.check_in = _dates(columns[2])
+        self.check_out = _dates(columns[3])
+        self.rate = _to_cents(columns[4]) # Nightly rate, cents
+
+    def __len__(self):
+        return len(self.reservation_id)
+
+    def nights(self):
+        return (self.check_out - self.check_in).astype(np.int64)
+
+STAY_COLUMNS_SQL = """
+    SELECT res.reservation_id, res.room_id, res.check_in_date, res.check_out_date, rt.base_price
+    FROM Reservations res
+    JOIN Rooms r ON res.room_id = r.room_id
+    JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
+"""
+
+
+# --- Invoices ---
+
+@instrumented
+def bill_reservations(reservation_ids):
+    """ Invoices for the given reservations: {reservation_id: dict} with Decimal amounts.
+
+    Each dict has nights and rate (from the stay), then room, services,
+    tax, total, paid and due straight from the folio's running totals in
+    FolioBalances: room is what the night audit has posted, tax what was
+    posted with the charges, and due is the ledger balance, so paying it
+    settles the folio. At check-out use checkout_bill(), which posts any
+    nights the audit missed first. Two queries regardless of how many
+    reservations there are, the second by primary key.
+    Returns None on DB error.
+    """
+    ids = tuple(dict.fromkeys(reservation_ids))
+    if not ids:
+        return {}
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(STAY_COLUMNS_SQL + f" WHERE res.reservation_id IN ({_placeholders(ids)})", ids)
+            stays = StayColumns(cursor.fetchall())
+            cursor.execute(f"""
+                SELECT reservation_id, charges, room_charges, tax_charges, payments, balance
+                FROM FolioBalances WHERE reservation_id IN ({_placeholders(ids)})
+            """, ids)
+            balance_rows = cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching billing data: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    # Position of each folio's reservation in the stay arrays (a stay with nothing posted has no row)
+    order = np.argsort(stays.reservation_id)
+    sorted_ids = stays.reservation_id[order]
+    targets = known = None
+    if balance_rows and len(stays):
+        row_ids = np.array([row[0] for row in balance_rows], dtype=np.int64)
+        pos = np.clip(np.searchsorted(sorted_ids, row_ids), 0, len(stays) - 1)
+        known = sorted_ids[pos] == row_ids
+        targets = order[pos[known]]
+
+    def per_stay(column):
+        totals = np.zeros(len(stays))
+        if targets is not None:
+            totals[targets] = _to_cents(row[column] for row in balance_rows)[known]
+        return totals
+
+    charges, room, tax, paid, due = (per_stay(column) for column in range(1, 6))
+    services = charges - room - tax
+    nights = stays.nights()
+
+    return {int(stays.reservation_id[i]): {
+        'nights': int(nights[i]),
+        'rate': _decimal(stays.rate[i]),
+        'room': _decimal(room[i]),
+        'services': _decimal(services[i]),
+        'tax': _decimal(tax[i]),
+        'total': _decimal(charges[i]),
+        'paid': _decimal(paid[i]),
+        'due': _decimal(due[i]),
+    } for i in range(len(stays))}
+
+def bill_reservation(reservation_id):
+    """ Invoice dict for one reservation (see bill_reservations), or None if not found / on error. """
+    bills = bill_reservations([reservation_id])
+    return bills.get(reservation_id) if bills else None
+
+def checkout_bill(reservation_id):
+    """ Posts the room nights the night audit missed for a departing stay, then bills it (None on error). """
+    if post_stay_room_charges(reservation_id) is None:
+        return None
+    return bill_reservation(reservation_id)
+
+
+# --- Revenue ---
+
+def _fetch_revenue_columns(start, end, statuses):
+    """ (StayColumns overlapping [start, end), room count, service charge rows) or None on error. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(STAY_COLUMNS_SQL + f"""
+                WHERE res.status IN ({_placeholders(statuses)})
+                  AND res.check_in_date < %s AND res.check_out_date > %s
+            """, tuple(statuses) + (end, start))
+            stays = StayColumns(cursor.fetchall())
+            cursor.execute("SELECT COUNT(*) FROM Rooms")
+            total_rooms = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT charge_date, amount FROM FolioCharges
+                WHERE kind NOT IN ('room', 'tax') AND charge_date >= %s AND charge_date < %s
+            """, (start, end))
+            service_rows = cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching revenue data: {e}")
+            return None
+        finally:
+            cursor.close()
+    return stays, int(total_rooms), service_rows
+
+def daily_room_revenue(stays, start, days):
+    """ Room revenue (cents) and rooms sold for each of `days` nights from `start`.
+
+    Each stay adds its rate from its first night in range and removes it
+    after its last one; a cumulative sum over those steps gives every
+    night's total in O(stays + days).
+    """
+    origin = np.datetime64(start, 'D')
+    first = np.clip((stays.check_in - origin).astype(np.int64), 0, days)
+    last = np.clip((stays.check_out - origin).astype(np.int64), 0, days)
+    revenue_steps = (np.bincount(first, weights=stays.rate, minlength=days + 1)
+                     - np.bincount(last, weights=stays.rate, minlength=days + 1))
+    sold_steps = np.bincount(first, minlength=days + 1) - np.bincount(last, minlength=days + 1)
+    return np.cumsum(revenue_steps)[:days], np.cumsum(sold_steps)[:days]
+
+@instrumented
+def revenue_report(start, end, period='month', statuses=REVENUE_STATUSES):
+    """ Revenue KPIs for [start, end), one row per 'day' or 'month' (partial months are clipped).
+
+    Each row: period_start, rooms_sold, available (room-nights),
+    occupancy, room_revenue, service_revenue, tax, adr, revpar. ADR is
+    room revenue per room sold, RevPAR room revenue per available room.
+    Returns None on DB error.
+    """
+    start, end = _to_date(start), _to_date(end)
+    days = (end - start).days
+    if days <= 0:
+        return []
+    fetched = _fetch_revenue_columns(start, end, statuses)
+    if fetched is None:
+        return None
+    stays, total_rooms, service_rows = fetched
+
+    revenue, sold = daily_room_revenue(stays, start, days)
+    origin = np.datetime64(start, 'D')
+    services = np.zeros(days)
+    if service_rows:
+        day_index = (_dates(row[0] for row in service_rows) - origin).astype(np.int64)
+        services = np.bincount(day_index, weights=_to_cents(row[1] for row in service_rows), minlength=days)[:days]
+
+    # Period boundaries as day offsets, then one reduceat per measure
+    day_dates = origin + np.arange(days)
+    if period == 'day':
+        starts = np.arange(days)
+    elif period == 'month':
+        months = day_dates.astype('datetime64[M]')
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    else:
+        raise ValueError(f"Unknown period {period!r}")
+    lengths = np.diff(np.r_[starts, days])
+
+    period_revenue = np.add.reduceat(revenue, starts)
+    period_sold = np.add.reduceat(sold, starts)
+    period_services = np.add.reduceat(services, starts)
+    available = lengths * total_rooms
+    tax = (_tax(period_revenue, BILLING_CONFIG.get('room_tax_rate', 0))
+           + _tax(period_services, BILLING_CONFIG.get('service_tax_rate', 0)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adr = np.where(period_sold > 0, np.rint(period_revenue / period_sold), 0)
+        revpar = np.where(available > 0, np.rint(period_revenue / available), 0)
+        occupancy = np.where(available > 0, period_sold / available, 0.0)
+
+    return [{
+        'period_start': (start + timedelta(days=int(offset))),
+        'rooms_sold': int(period_sold[i]),
+        'available': int(available[i]),
+        'occupancy': round(float(occupancy[i]), 4),
+        'room_revenue': _decimal(period_revenue[i]),
+        'service_revenue': _decimal(period_services[i]),
+        'tax': _decimal(tax[i]),
+        'adr': _decimal(adr[i]),
+        'revpar': _decimal(revpar[i]),
+    } for i, offset in enumerate(starts)]
+
+def revenue_totals(start, end, statuses=REVENUE_STATUSES):
+    """ revenue_report() collapsed to a single row for the whole range (None on DB error). """
+    rows = revenue_report(start, end, period='day', statuses=statuses)
+    if rows is None:
+        return None
+    sold = sum(row['rooms_sold'] for row in rows)
+    available = sum(row['available'] for row in rows)
+    room_revenue = sum((row['room_revenue'] for row in rows), Decimal(0))
+    return {
+        'start': _to_date(start),
+        'end': _to_date(end),
+        'rooms_sold': sold,
+        'available': available,
+        'occupancy': round(sold / available, 4) if available else 0.0,
+        'room_revenue': room_revenue,
+        'service_revenue': sum((row['service_revenue'] for row in rows), Decimal(0)),
+        'tax': sum((row['tax'] for row in rows), Decimal(0)),
+        'adr': (room_revenue / sold).quantize(CENTS) if sold else Decimal('0.00'),
+        'revpar': (room_revenue / available).quantize(CENTS) if available else Decimal('0.00'),
+    }
@@ -0,0 +1,135 @@
+# db/cache.py
+"""
+Read-through caches for reference data that is read far more often than
+it is written: room types, the room list and guest records by id.
+
+Each named cache has its own TTL and LRU size bound (CACHE_CONFIG):
+
+    guest = get_cache('guests').get(guest_id, lambda: _load_guest(guest_id))
+
+A loader returning None (not found, DB error) is not cached. Write
+functions invalidate what they change, and changes from other terminals
+arrive through the change feed: a Rooms change drops the room list, a
+Guests change drops just those guest ids. RoomTypes has no write path in
+the application, so it relies on its TTL (or invalidate_caches() after
+editing types by hand).
+
+Cached values are shared; callers that hand rows to code which mutates
+them must copy first.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from .changes import subscribe
+from config import CACHE_CONFIG
+
+
+class TTLCache:
+    """ A thread-safe LRU mapping whose entries expire `ttl` seconds after being loaded. """
+    def __init__(self, name, ttl, max_entries):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # key -> (value, expires_at), least recently used first
+        self._generation = 0 # Bumped by invalidation so a load that raced with it is not stored
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def peek(self, key):
+        """ The cached value for key, or None; counts a hit or a miss. """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry[1]:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[0]
+                del self._entries[key]
+                self._stats['expired'] += 1
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key, value, generation=None):
+        """ Stores value unless it is None or the cache was invalidated since `generation`. """
+        if value is None or not CACHE_CONFIG.get('enabled', True):
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return # Loaded before an invalidation; may be stale
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key, loader):
+        """ The cached value for key, calling loader() on a miss and caching its result. """
+        value = self.peek(key)
+        if value is not None:
+            return value
+        generation = self.generation
+        value = loader()
+        self.put(key, value, generation)
+        return value
+
+    def invalidate(self, *keys):
+        """ Drops `keys`, or everything if none are given. """
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+            if not keys:
+                self._entries.clear()
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats, name=self.name, entries=len(self._entries), max_entries=self.max_entries,
+                        ttl=self.ttl, hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else None)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(name):
+    """ The cache called `name`, created from CACHE_CONFIG[name] on first use. """
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                settings = CACHE_CONFIG.get(name, {})
+                cache = TTLCache(name, settings.get('ttl', 300), settings.get('max_entries', 1000))
+                _caches[name] = cache
+    return cache
+
+def invalidate_caches(*names):
+    """ Empties the named caches, or all of them. """
+    with _caches_lock:
+        caches = [_caches[name] for name in names if name in _caches] if names else list(_caches.values())
+    for cache in caches:
+        cache.invalidate()
+
+def get_cache_stats():
+    """ Per-cache counters: hits, misses, expired, evictions, invalidations, entries, hit_rate. """
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in sorted(caches, key=lambda c: c.name)]
+
+
+def _on_rooms_change(table, action, row_ids, origin):
+    get_cache('rooms').invalidate() # One entry holds the whole list
+
+def _on_guests_change(table, action, row_ids, origin):
+    get_cache('guests').invalidate(*row_ids) # No ids (bulk import): drop everything
+
+subscribe('Rooms', _on_rooms_change)
+subscribe('Guests', _on_guests_change)
@@ -0,0 +1,148 @@
+# db/changes.py
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from .connection import pooled_connection, Error
+from .instrumentation import instrumented
+
+TABLES = ('Rooms', 'Guests', 'Reservations')
+
+# Identifies this process in ChangeLog so a terminal skips its own changes when polling
+TERMINAL_ID = uuid.uuid4().hex[:16]
+
+CHANGE_LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS ChangeLog (
+        change_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        table_name VARCHAR(64) NOT NULL,
+        row_id INT NULL,
+        action VARCHAR(16) NOT NULL,
+        origin VARCHAR(32) NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_lock = threading.RLock()
+_subscribers = defaultdict(list) # table -> [callback(table, action, row_ids, origin)]
+_versions = {table: 0 for table in TABLES} # In-process version per table
+_watermark = None # Highest ChangeLog.change_id seen by poll_changes()
+_log_warned = False
+
+
+# --- In-process event bus ---
+
+def subscribe(table, callback):
+    """ Registers callback(table, action, row_ids, origin) for changes to `table`.
+
+    origin is 'local' for writes made by this process and 'remote' for
+    changes picked up from other terminals by poll_changes(). Callbacks run
+    on the thread that published the change (often a DB worker thread).
+    """
+    with _lock:
+        _subscribers[table].append(callback)
+
+def unsubscribe(table, callback):
+    with _lock:
+        if callback in _subscribers[table]:
+            _subscribers[table].remove(callback)
+
+def publish(table, action, row_ids=(), origin='local'):
+    """ Bumps the table's version and notifies subscribers. """
+    with _lock:
+        _versions[table] = _versions.get(table, 0) + 1
+        callbacks = list(_subscribers[table])
+    for callback in callbacks:
+        try:
+            callback(table, action, tuple(row_ids), origin)
+        except Exception as e:
+            print(f"Error in change subscriber for {table}: {e}")
+
+def table_versions(tables=TABLES):
+    """ Current in-process versions of `tables`, as a tuple (cheap, no DB access).
+
+    Compare with a previously saved tuple to tell whether anything changed.
+    """
+    with _lock:
+        return tuple(_versions.get(table, 0) for table in tables)
+
+
+# --- Persistent change log (shared between terminals) ---
+
+def record_change(conn, table, action, row_ids=()):
+    """ Logs a committed write to ChangeLog and publishes it in-process.
+
+    Call after the write has been committed. Logging is best effort: if the
+    ChangeLog table is missing the write itself is unaffected and other
+    terminals simply will not see it until their next full refresh.
+    """
+    global _log_warned
+    row_ids = [row_id for row_id in row_ids if row_id is not None]
+    cursor = conn.cursor()
+    try:
+        query = "INSERT INTO ChangeLog (table_name, row_id, action, origin) VALUES (%s, %s, %s, %s)"
+        cursor.executemany(query, [(table, row_id, action, TERMINAL_ID) for row_id in (row_ids or [None])])
+        conn.commit()
+    except Error as e:
+        conn.rollback()
+        if not _log_warned:
+            _log_warned = True
+            print(f"Warning: could not write to ChangeLog, other terminals won't see changes: {e}")
+    finally:
+        cursor.close()
+    publish(table, action, row_ids, 'local')
+
+@instrumented
+def poll_changes():
+    """ Publishes changes other terminals logged since the last poll.
+
+    Returns the set of table names that changed remotely (empty if none).
+    The first call only records the current watermark.
+    """
+    global _watermark
+    changed = defaultdict(lambda: defaultdict(list)) # table -> action -> [row_ids]
+    with pooled_connection() as conn:
+        if conn is None: return set()
+        cursor = conn.cursor()
+        try:
+            if _watermark is None:
+                cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM ChangeLog")
+                _watermark = cursor.fetchone()[0]
+                return set()
+            cursor.execute("""
+                SELECT change_id, table_name, row_id, action, origin
+                FROM ChangeLog
+                WHERE change_id > %s
+                ORDER BY change_id
+            """, (_watermark,))
+            for change_id, table, row_id, action, origin in cursor.fetchall():
+                _watermark = max(_watermark, change_id)
+                if origin != TERMINAL_ID:
+                    changed[table][action].append(row_id)
+        except Error as e:
+            print(f"Error polling change log: {e}")
+        finally:
+            cursor.close()
+
+    for table, actions in changed.items():
+        for action, row_ids in actions.items():
+            publish(table, action, [row_id for row_id in row_ids if row_id is not None], 'remote')
+    return set(changed)
+
+def prune_change_log(keep_days=7):
+    """ Deletes ChangeLog entries older than `keep_days`. Returns rows deleted, or None on error. """
+    deleted = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cutoff = datetime.now() - timedelta(days=keep_days) # Computed here so every backend agrees
+            cursor.execute("DELETE FROM ChangeLog WHERE changed_at < %s", (cutoff,))
+            conn.commit()
+            deleted = cursor.rowcount
+        except Error as e:
+            print(f"Error pruning change log: {e}")
+            conn.rollback()
+        finally:
+            cursor.close()
+    return deleted
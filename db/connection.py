@@ -1,43 +1,332 @@
 # db/connection.py
-import mysql.connector
-from mysql.connector import Error
-from config import DB_CONFIG # Import config from the root level
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .backends import make_backend, DatabaseError, Error
+import config # Import config from the root level
+
+# Keys in a backend config that configure the pool rather than the driver's connect()
+POOL_OPTION_KEYS = ('pool_size', 'pool_timeout', 'pool_recycle', 'pool_ping_interval')
+
+
+class PooledConnection:
+    """ Thin wrapper around a pooled database connection.
+
+    Behaves like the underlying connection, except close() hands the
+    connection back to the pool instead of tearing it down.
+    """
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise DatabaseError(msg="Connection has already been returned to the pool.")
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self.__getattr__('cursor')(*args, **kwargs)
+        for wrapper in _cursor_wrappers:
+            cursor = wrapper(cursor)
+        return cursor
+
+    def is_connected(self):
+        return self._raw is not None and self._raw.is_connected()
+
+    def close(self):
+        """ Returns the connection to the pool (safe to call more than once). """
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Never leak a pool slot if a caller forgets to close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """ Bounded pool of reusable database connections with health checks. """
+    def __init__(self, backend, config):
+        self.backend = backend
+        self.connect_args = {k: v for k, v in config.items() if k not in POOL_OPTION_KEYS}
+        self.max_size = max(1, int(config.get('pool_size', 5)))
+        self.timeout = float(config.get('pool_timeout', 10))
+        self.recycle = float(config.get('pool_recycle', 1800))
+        self.ping_interval = float(config.get('pool_ping_interval', 30))
+
+        self._cond = threading.Condition()
+        self._idle = deque() # (raw_conn, created_at, last_used)
+        self._open = 0       # Connections currently open (idle + checked out)
+        self._stats = {
+            'connects': 0, 'connect_failures': 0,
+            'checkouts': 0, 'checkins': 0,
+            'waits': 0, 'wait_time': 0.0, 'timeouts': 0,
+            'health_check_failures': 0, 'recycled': 0, 'discarded': 0,
+        }
+
+    def _connect(self):
+        raw = self.backend.connect(self.connect_args)
+        with self._cond:
+            self._stats['connects'] += 1
+        return raw, time.monotonic()
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Error:
+            pass
+
+    def _healthy(self, raw, created_at, last_used):
+        """ Checks an idle connection before handing it out again. """
+        now = time.monotonic()
+        if now - created_at > self.recycle:
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if now - last_used > self.ping_interval:
+            try:
+                raw.ping(reconnect=False)
+            except Error:
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                return False
+        return True
+
+    def acquire(self, timeout=None):
+        """ Checks out a connection, waiting up to `timeout` seconds for a free slot.
+
+        Returns a PooledConnection, or None if the pool is exhausted or the
+        database cannot be reached.
+        """
+        started = time.monotonic()
+        conn = self._acquire(timeout)
+        if _acquire_hooks:
+            elapsed = time.monotonic() - started
+            for hook in list(_acquire_hooks):
+                hook(elapsed, conn is not None)
+        return conn
+
+    def _acquire(self, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                waited_since = None
+                while not self._idle and self._open >= self.max_size:
+                    if waited_since is None:
+                        waited_since = time.monotonic()
+                        self._stats['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        self._stats['wait_time'] += time.monotonic() - waited_since
+                        print(f"Error: no free database connection after {timeout:.1f}s (pool size {self.max_size}).")
+                        return None
+                    self._cond.wait(remaining)
+                if waited_since is not None:
+                    self._stats['wait_time'] += time.monotonic() - waited_since
+
+                if self._idle:
+                    raw, created_at, last_used = self._idle.pop() # LIFO keeps hot connections hot
+                else:
+                    raw = None
+                    self._open += 1 # Reserve the slot before connecting outside the lock
+
+            if raw is not None:
+                if self._healthy(raw, created_at, last_used):
+                    break
+                # Stale or broken: drop it and reuse its slot for a fresh connection
+                self._discard(raw)
+            try:
+                raw, created_at = self._connect()
+                break
+            except Error as e:
+                print(f"Error connecting to {self.backend.name} database: {e}")
+                with self._cond:
+                    self._open -= 1
+                    self._stats['connect_failures'] += 1
+                    self._cond.notify()
+                return None
+
+        with self._cond:
+            self._stats['checkouts'] += 1
+        return PooledConnection(self, raw, created_at)
+
+    def release(self, raw, created_at):
+        """ Returns a connection to the pool, rolling back any unfinished transaction. """
+        reusable = False
+        try:
+            if raw.is_connected():
+                if raw.in_transaction:
+                    raw.rollback()
+                reusable = True
+        except Error:
+            reusable = False
+
+        with self._cond:
+            self._stats['checkins'] += 1
+            if reusable:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+                self._stats['discarded'] += 1
+            self._cond.notify()
+        if not reusable:
+            self._discard(raw)
+
+    def close_all(self):
+        """ Closes every idle connection (checked-out ones close when returned). """
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        """ Snapshot of pool counters plus current occupancy. """
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update(
+                size=self.max_size,
+                open=self._open,
+                idle=len(self._idle),
+                in_use=self._open - len(self._idle),
+            )
+        return snapshot
+
+
+_cursor_wrappers = [] # cursor -> cursor callables applied to every pooled cursor (query capture, timing)
+_acquire_hooks = []   # hook(seconds, connected) called after every pool checkout attempt
+
+def add_cursor_wrapper(wrapper):
+    """ Registers wrapper(cursor) -> cursor for cursors handed out from now on. """
+    _cursor_wrappers.append(wrapper)
+
+def remove_cursor_wrapper(wrapper):
+    if wrapper in _cursor_wrappers:
+        _cursor_wrappers.remove(wrapper)
+
+def add_acquire_hook(hook):
+    """ Registers hook(seconds, connected), called after each checkout with the time it took. """
+    _acquire_hooks.append(hook)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_backend_override = None # (name, config) set by use_backend()
+
+def _backend_settings():
+    """ (backend name, config dict) from use_backend() or config.py. """
+    if _backend_override is not None:
+        return _backend_override
+    name = getattr(config, 'DB_BACKEND', 'mysql')
+    if name == 'sqlite':
+        return name, config.SQLITE_CONFIG
+    return name, config.DB_CONFIG
+
+def get_pool():
+    """ Returns the process-wide connection pool, creating it on first use. """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                name, settings = _backend_settings()
+                _pool = ConnectionPool(make_backend(name), settings)
+    return _pool
+
+def get_backend_settings():
+    """ (backend name, copy of its settings) in effect, e.g. to configure worker processes the same way. """
+    name, settings = _backend_settings()
+    return name, dict(settings)
+
+def get_backend():
+    """ The active storage backend (MySQLBackend or SQLiteBackend). """
+    return get_pool().backend
+
+def use_backend(name, settings=None):
+    """ Switches the storage backend, e.g. use_backend('sqlite', {'database': 'bench.db'}).
+
+    Meant for start-up, tests and benchmarks: call it before the first
+    query. Idle pooled connections to the previous backend are closed.
+    """
+    global _pool, _backend_override
+    if settings is None:
+        settings = config.SQLITE_CONFIG if name == 'sqlite' else config.DB_CONFIG
+    with _pool_lock:
+        old_pool, _pool = _pool, None
+        _backend_override = (name, dict(settings))
+    if old_pool is not None:
+        old_pool.close_all()
+
+_inherited_pools = [] # Pools dropped by reset_after_fork(), kept alive so their sockets are never closed here
+
+def reset_after_fork():
+    """ Forgets the pool inherited from the parent process, without closing its connections.
+
+    A forked child shares the parent's sockets; closing them (MySQL sends
+    COM_QUIT) would end the parent's sessions. Call this first thing in a
+    worker process initializer, before use_backend() or any query.
+    """
+    global _pool, _pool_lock
+    _pool_lock = threading.Lock() # May have been held by another parent thread at fork time
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
 
 def get_db_connection():
-    """ Establishes a connection to the MySQL database. """
-    connection = None
+    """ Checks out a pooled connection to the configured database.
+
+    Calling close() on the result returns it to the pool. Returns None
+    if no connection could be obtained.
+    """
+    return get_pool().acquire()
+
+@contextmanager
+def pooled_connection(timeout=None):
+    """ Context manager that checks a connection out and always checks it back in.
+
+    Yields None when no connection is available, so callers keep the
+    existing `if conn is None` handling.
+    """
+    conn = get_pool().acquire(timeout)
     try:
-        connection = mysql.connector.connect(**DB_CONFIG) # Unpack config dict
-        # print("MySQL Database connection successful") # Optional: for debugging
-    except Error as e:
-        print(f"Error connecting to MySQL Database: {e}")
-        # In a real app, you might want to raise the error or handle it differently
-    return connection
-
-# Example of using a connection (can be used within query files)
-# def execute_query(query, params=None, fetch=False):
-#     """ Utility to execute a query - might be useful later """
-#     conn = get_db_connection()
-#     if conn is None:
-#         return None # Or raise an exception
-
-#     cursor = conn.cursor(dictionary=True) # dictionary=True returns results as dicts
-#     result = None
-#     try:
-#         cursor.execute(query, params or ())
-#         if fetch:
-#             result = cursor.fetchall() # Or fetchone() if needed
-#         else:
-#             conn.commit() # Commit changes for INSERT, UPDATE, DELETE
-#             result = cursor.lastrowid # Useful for INSERTs
-#     except Error as e:
-#         print(f"Error executing query: {e}")
-#         conn.rollback() # Rollback on error
-#     finally:
-#         cursor.close()
-#         conn.close()
-#     return result
-
-# Note: Constantly opening/closing connections can be inefficient.
-# For larger apps, consider connection pooling.
-# For this example, we'll mostly get connection/cursor within each query function.
\ No newline at end of file
+        yield conn
+    finally:
+        if conn is not None:
+            conn.close()
+
+def warm_up_pool(connections=1):
+    """ Opens pooled connections ahead of the first query. Returns True if the database is reachable.
+
+    Meant to run on a background thread at start-up, so the driver import and
+    connection handshake don't delay the first window paint.
+    """
+    conns = [get_pool().acquire() for _ in range(max(1, connections))]
+    connected = all(conn is not None and conn.is_connected() for conn in conns)
+    for conn in conns:
+        if conn is not None:
+            conn.close()
+    return connected
+
+def get_pool_stats():
+    """ Returns connection pool statistics (waits, checkouts, connects, ...). """
+    return get_pool().stats()
+
+def close_pool():
+    """ Closes idle pooled connections, e.g. on application exit. """
+    if _pool is not None:
+        _pool.close_all()
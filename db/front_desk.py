@@ -0,0 +1,244 @@
+# db/front_desk.py
+"""
+Front-desk lookup: check-in and check-out candidates from one call.
+
+Today's arrivals ('confirmed', checking in today) and the in-house stays
+('checked-in') are kept in memory, indexed by room number and by name
+token, so a clerk's lookup normally touches no database at all:
+
+    lookup_front_desk("smith")   # {'checkin': [...], 'checkout': [...]}
+
+Every match is returned, not just the first. The index follows the change
+feed: reservations written by this process or picked up from other
+terminals are re-read by id and patched in, and it reloads itself when the
+date rolls over or FRONT_DESK_CONFIG['reload_after'] seconds have passed.
+When it has no answer, one combined SQL query checks the database (a stay
+booked on another terminal since the last poll is still found) and the
+rows it returns are added to the index.
+"""
+import re
+import threading
+import time
+from datetime import date
+
+from .connection import pooled_connection, Error
+from .instrumentation import instrumented
+from .availability import _to_date
+from .changes import subscribe
+from config import FRONT_DESK_CONFIG
+
+ACTIONS = {'confirmed': 'checkin', 'checked-in': 'checkout'}
+
+FRONT_DESK_SQL = """
+    SELECT res.reservation_id, res.room_id, r.room_number, g.guest_id, g.first_name, g.last_name,
+           res.check_in_date, res.check_out_date, res.status
+    FROM Reservations res
+    JOIN Guests g ON res.guest_id = g.guest_id
+    JOIN Rooms r ON res.room_id = r.room_id
+"""
+# Arrivals due today plus everyone in house; filtered further by the callers
+FRONT_DESK_WHERE = "((res.status = 'confirmed' AND res.check_in_date = %s) OR res.status = 'checked-in')"
+
+_stats_lock = threading.Lock()
+_stats = {'lookups': 0, 'index_hits': 0, 'sql_lookups': 0, 'sql_found': 0, 'reloads': 0, 'patched': 0}
+
+def _count(name, n=1):
+    with _stats_lock:
+        _stats[name] += n
+
+def _name_tokens(*names):
+    return {token for name in names for token in re.split(r'[\s\-\']+', (name or '').lower()) if token}
+
+
+class FrontDeskIndex:
+    """ Today's arrivals and in-house reservations, by room number and name token. """
+    def __init__(self, day):
+        self.day = day
+        self.loaded_at = time.monotonic()
+        self._lock = threading.RLock()
+        self._rows = {}     # reservation_id -> row dict (with 'action')
+        self._by_room = {}  # room_number -> set of reservation_ids
+        self._by_token = {} # lower-cased name token -> set of reservation_ids
+
+    def __len__(self):
+        return len(self._rows)
+
+    def load(self, cursor):
+        """ Fills the index from an open dictionary cursor. """
+        cursor.execute(FRONT_DESK_SQL + " WHERE " + FRONT_DESK_WHERE, (self.day,))
+        rows = cursor.fetchall()
+        with self._lock:
+            for row in rows:
+                self.put(row)
+
+    def put(self, row):
+        """ Adds, moves or drops a reservation according to its current status and dates. """
+        with self._lock:
+            self.remove(row['reservation_id'])
+            action = ACTIONS.get(row['status'])
+            if action is None or (action == 'checkin' and _to_date(row['check_in_date']) != self.day):
+                return # Not an arrival today and not in house: nothing for the desk
+            row = dict(row, action=action)
+            reservation_id = row['reservation_id']
+            self._rows[reservation_id] = row
+            self._by_room.setdefault(str(row['room_number']), set()).add(reservation_id)
+            for token in _name_tokens(row['first_name'], row['last_name']):
+                self._by_token.setdefault(token, set()).add(reservation_id)
+
+    def remove(self, reservation_id):
+        with self._lock:
+            row = self._rows.pop(reservation_id, None)
+            if row is None:
+                return
+            self._by_room.get(str(row['room_number']), set()).discard(reservation_id)
+            for token in _name_tokens(row['first_name'], row['last_name']):
+                self._by_token.get(token, set()).discard(reservation_id)
+
+    def lookup(self, search_key):
+        """ {'checkin': [...], 'checkout': [...]} for a room number or (part of) a guest name. """
+        key = search_key.strip().lower()
+        found = {'checkin': [], 'checkout': []}
+        if not key:
+            return found
+        with self._lock:
+            ids = set(self._by_room.get(search_key.strip(), ()))
+            words = key.split()
+            # Each word must be part of a name token; exact tokens are a dict hit, partial ones a scan of the (few) tokens
+            matches = None
+            for word in words:
+                word_ids = set(self._by_token.get(word, ()))
+                for token, token_ids in self._by_token.items():
+                    if word in token:
+                        word_ids |= token_ids
+                matches = word_ids if matches is None else matches & word_ids
+            ids |= matches or set()
+            for reservation_id in sorted(ids):
+                row = self._rows[reservation_id]
+                found[row['action']].append(dict(row))
+        for rows in found.values():
+            rows.sort(key=lambda row: (str(row['room_number']), row['last_name'] or '', row['first_name'] or ''))
+        return found
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_front_desk_index():
+    """ The index for today, (re)loading it on first use, after midnight or when it is too old. None on failure. """
+    global _index
+    index = _index
+    max_age = FRONT_DESK_CONFIG.get('reload_after', 900)
+    if index is not None and index.day == date.today() and time.monotonic() - index.loaded_at < max_age:
+        return index
+    with _index_lock:
+        index = _index
+        if index is None or index.day != date.today() or time.monotonic() - index.loaded_at >= max_age:
+            with pooled_connection() as conn:
+                if conn is None: return None
+                cursor = conn.cursor(dictionary=True)
+                try:
+                    index = FrontDeskIndex(date.today())
+                    index.load(cursor)
+                    _index = index
+                    _count('reloads')
+                except Error as e:
+                    print(f"Error loading front desk index: {e}")
+                    return None
+                finally:
+                    cursor.close()
+    return _index
+
+def invalidate_front_desk_index():
+    """ Drops the index; the next lookup reloads it. """
+    global _index
+    with _index_lock:
+        _index = None
+
+def _on_reservation_change(table, action, row_ids, origin):
+    """ Re-reads changed reservations (from this or another terminal) into a loaded index. """
+    index = _index
+    if index is None:
+        return
+    if not row_ids:
+        invalidate_front_desk_index()
+        return
+    with pooled_connection() as conn:
+        if conn is None:
+            invalidate_front_desk_index()
+            return
+        cursor = conn.cursor(dictionary=True)
+        try:
+            placeholders = ', '.join(['%s'] * len(row_ids))
+            cursor.execute(FRONT_DESK_SQL + f" WHERE res.reservation_id IN ({placeholders})", tuple(row_ids))
+            rows = cursor.fetchall()
+        except Error as e:
+            print(f"Error applying reservation change to front desk index: {e}")
+            invalidate_front_desk_index()
+            return
+        finally:
+            cursor.close()
+    found = {row['reservation_id'] for row in rows}
+    for row in rows:
+        index.put(row)
+    for reservation_id in set(row_ids) - found:
+        index.remove(reservation_id) # Deleted
+    _count('patched', len(row_ids))
+
+subscribe('Reservations', _on_reservation_change)
+
+
+def _lookup_sql(search_key):
+    """ Both kinds of candidates from a single query: {'checkin': [...], 'checkout': [...]}, or None on error. """
+    found = {'checkin': [], 'checkout': []}
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            pattern = f"%{search_key}%"
+            cursor.execute(FRONT_DESK_SQL + " WHERE " + FRONT_DESK_WHERE + """
+                  AND (r.room_number = %s OR g.first_name LIKE %s OR g.last_name LIKE %s)
+                ORDER BY r.room_number, g.last_name, g.first_name
+            """, (date.today(), search_key, pattern, pattern))
+            rows = cursor.fetchall()
+        except Error as e:
+            print(f"Error looking up reservations for the front desk: {e}")
+            return None
+        finally:
+            cursor.close()
+    for row in rows:
+        found[ACTIONS[row['status']]].append(dict(row, action=ACTIONS[row['status']]))
+    return found
+
+@instrumented
+def lookup_front_desk(search_key):
+    """ Reservations to check in today and to check out, matching a room number or guest name.
+
+    Returns {'checkin': [...], 'checkout': [...]}: every match, each a dict
+    with reservation_id, room_id, room_number, guest_id, first_name,
+    last_name, check_in_date, check_out_date, status and action. Answered
+    from the in-memory index; if that has no match (or is unavailable),
+    one SQL query checks the database. None on DB error.
+    """
+    search_key = search_key.strip()
+    _count('lookups')
+    if not search_key:
+        return {'checkin': [], 'checkout': []}
+    index = get_front_desk_index()
+    if index is not None:
+        found = index.lookup(search_key)
+        if found['checkin'] or found['checkout']:
+            _count('index_hits')
+            return found
+
+    _count('sql_lookups')
+    found = _lookup_sql(search_key)
+    if found and index is not None and (found['checkin'] or found['checkout']):
+        _count('sql_found')
+        for row in found['checkin'] + found['checkout']:
+            index.put(row) # Not known to the index yet (e.g. booked elsewhere since the last poll)
+    return found
+
+def get_front_desk_stats():
+    """ Lookup counters: lookups, index_hits, sql_lookups, sql_found, reloads, patched. """
+    with _stats_lock:
+        return dict(_stats)
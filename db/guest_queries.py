@@ -1,90 +1,232 @@
 # db/guest_queries.py
-from .connection import get_db_connection
-from mysql.connector import Error
+from .connection import pooled_connection, get_backend, Error
+from .instrumentation import instrumented
+from .changes import record_change
+from .cache import get_cache
+from .records import GuestSummary, stream_records
+from .guest_search import (get_guest_search_index, note_guest_added, fulltext_search_guests,
+                           search_mode, default_limit)
 
+ALL_GUESTS_SQL = "SELECT guest_id, first_name, last_name, email, phone FROM Guests ORDER BY last_name, first_name"
+
+def iter_all_guests(batch_size=None):
+    """ Streams basic guest information (GuestSummary records) in get_all_guests order.
+
+    Rows are read `batch_size` at a time from an unbuffered cursor, so the
+    first ones are available at once and the table is never held in
+    memory. Holds a pooled connection until exhausted or closed; raises on
+    DB error (see db.records.stream_records).
+    """
+    return stream_records(GuestSummary, ALL_GUESTS_SQL, batch_size=batch_size)
+
+@instrumented
 def get_all_guests():
-    """ Fetches basic guest information. """
-    conn = get_db_connection()
-    if conn is None: return []
-    guests = []
+    """ Fetches basic guest information as GuestSummary records. """
     try:
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT guest_id, first_name, last_name, email, phone FROM Guests ORDER BY last_name, first_name"
-        cursor.execute(query)
-        guests = cursor.fetchall()
-    except Error as e:
-        print(f"Error fetching guests: {e}")
-    finally:
-        if conn.is_connected():
+        return list(iter_all_guests()) # No intermediate fetchall() list of tuples
+    except Error:
+        return []
+
+@instrumented
+def get_guests_page(after_key=None, limit=100):
+    """ Returns up to `limit` guests (GuestSummary records) ordered by (last_name, first_name, guest_id).
+
+    Keyset pagination: pass the (last_name, first_name, guest_id) of the
+    last row of the previous page as after_key, or None for the first page.
+    """
+    guests = []
+    with pooled_connection() as conn:
+        if conn is None: return guests
+        cursor = conn.cursor()
+        try:
+            if after_key is None:
+                query = """
+                    SELECT guest_id, first_name, last_name, email, phone FROM Guests
+                    ORDER BY last_name, first_name, guest_id
+                    LIMIT %s
+                """
+                params = (limit,)
+            else:
+                query = """
+                    SELECT guest_id, first_name, last_name, email, phone FROM Guests
+                    WHERE (last_name, first_name, guest_id) > (%s, %s, %s)
+                    ORDER BY last_name, first_name, guest_id
+                    LIMIT %s
+                """
+                params = (*after_key, limit)
+            cursor.execute(query, params)
+            guests = GuestSummary.from_rows(cursor.fetchall())
+        except Error as e:
+            print(f"Error fetching guest page: {e}")
+        finally:
             cursor.close()
-            conn.close()
     return guests
 
+@instrumented
+def get_guest_key_at(offset):
+    """ Returns the (last_name, first_name, guest_id) sort key of the row at `offset`, or None.
+
+    Lets a paged view jump straight to a scroll position and continue with keyset pages.
+    """
+    key = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            query = """
+                SELECT last_name, first_name, guest_id FROM Guests
+                ORDER BY last_name, first_name, guest_id
+                LIMIT 1 OFFSET %s
+            """
+            cursor.execute(query, (offset,))
+            row = cursor.fetchone()
+            key = tuple(row) if row else None
+        except Error as e:
+            print(f"Error fetching guest key: {e}")
+        finally:
+            cursor.close()
+    return key
+
+@instrumented
+def count_guests():
+    """ Returns the number of guests, or None on error. """
+    total = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM Guests")
+            total = cursor.fetchone()[0]
+        except Error as e:
+            print(f"Error counting guests: {e}")
+        finally:
+            cursor.close()
+    return total
+
+@instrumented
 def add_guest_db(first_name, last_name, email, phone, address=None, city=None, country=None, passport=None, dob=None):
     """ Adds a new guest to the database. Returns guest_id or None on failure. """
-    conn = get_db_connection()
-    if conn is None: return None
     guest_id = None
-    try:
+    with pooled_connection() as conn:
+        if conn is None: return None
         cursor = conn.cursor()
-        query = """
-            INSERT INTO Guests
-            (first_name, last_name, email, phone, address, city, country, passport_number, date_of_birth)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        params = (first_name, last_name, email, phone, address, city, country, passport, dob)
-        cursor.execute(query, params)
-        conn.commit()
-        guest_id = cursor.lastrowid # Get the ID of the inserted row
-    except Error as e:
-        print(f"Error adding guest: {e}")
-        conn.rollback()
-    finally:
-        if conn.is_connected():
+        try:
+            query = """
+                INSERT INTO Guests
+                (first_name, last_name, email, phone, address, city, country, passport_number, date_of_birth)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            params = (first_name, last_name, email, phone, address, city, country, passport, dob)
+            cursor.execute(query, params)
+            conn.commit()
+            guest_id = cursor.lastrowid # Get the ID of the inserted row
+            note_guest_added(GuestSummary(guest_id, first_name, last_name, email, phone)) # Keep the search index current
+            get_cache('guests').invalidate(guest_id)
+            record_change(conn, 'Guests', 'insert', [guest_id])
+        except Error as e:
+            print(f"Error adding guest: {e}")
+            conn.rollback()
+        finally:
             cursor.close()
-            conn.close()
     return guest_id
 
-def find_guest_by_name_db(name_part):
-    """ Finds guests whose first or last name contains the search term. """
-    conn = get_db_connection()
-    if conn is None: return []
-    guests = []
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT guest_id, first_name, last_name, email, phone
-            FROM Guests
-            WHERE first_name LIKE %s OR last_name LIKE %s
-            ORDER BY last_name, first_name
-        """
-        search_pattern = f"%{name_part}%"
-        cursor.execute(query, (search_pattern, search_pattern))
-        guests = cursor.fetchall()
-    except Error as e:
-        print(f"Error finding guest by name: {e}")
-    finally:
-        if conn.is_connected():
+@instrumented
+def find_guest_by_name_db(name_part, limit=None):
+    """ Finds guests matching the search term by name, email or phone, best matches first.
+
+    Uses the search mode from GUEST_SEARCH_CONFIG: the in-memory index
+    ('memory'), MySQL FULLTEXT ('fulltext') or a plain LIKE scan ('like').
+    Returns at most `limit` guests (default from the config) as GuestSummary
+    records; those from the in-memory index are shared, so don't modify them.
+    Returns None on DB error, so callers can tell a failure from no matches.
+    """
+    limit = limit or default_limit()
+    mode = search_mode()
+    if mode == 'memory':
+        index = get_guest_search_index()
+        if index is not None:
+            return index.search(name_part, limit)
+        mode = 'like' # Index could not be loaded; fall back to SQL
+    if mode == 'fulltext' and not get_backend().supports_fulltext:
+        mode = 'like' # e.g. SQLite has no MATCH ... AGAINST
+
+    guests = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            if mode == 'fulltext':
+                guests = fulltext_search_guests(cursor, name_part, limit)
+            else:
+                query = """
+                    SELECT guest_id, first_name, last_name, email, phone
+                    FROM Guests
+                    WHERE first_name LIKE %s OR last_name LIKE %s OR email LIKE %s OR phone LIKE %s
+                    ORDER BY last_name, first_name
+                    LIMIT %s
+                """
+                search_pattern = f"%{name_part}%"
+                cursor.execute(query, (search_pattern,) * 4 + (limit,))
+                guests = GuestSummary.from_rows(cursor.fetchall())
+        except Error as e:
+            print(f"Error finding guest by name: {e}")
+        finally:
             cursor.close()
-            conn.close()
     return guests
 
+def _load_guest(guest_id):
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            query = "SELECT * FROM Guests WHERE guest_id = %s"
+            cursor.execute(query, (guest_id,))
+            return cursor.fetchone()
+        except Error as e:
+            print(f"Error fetching guest by ID: {e}")
+            return None
+        finally:
+            cursor.close()
+
+@instrumented
 def get_guest_by_id_db(guest_id):
-    """ Fetches a single guest by their ID. """
-    conn = get_db_connection()
-    if conn is None: return None
-    guest = None
-    try:
+    """ Fetches a single guest by their ID (read through the guest cache). """
+    guest = get_cache('guests').get(guest_id, lambda: _load_guest(guest_id))
+    return dict(guest) if guest is not None else None
+
+@instrumented
+def get_guests_by_ids_db(guest_ids):
+    """ Fetches several guests in one query: {guest_id: row}. Unknown ids are left out; None on error.
+
+    Guests already in the guest cache are not re-read.
+    """
+    cache = get_cache('guests')
+    guests = {}
+    missing = []
+    for guest_id in dict.fromkeys(guest_ids):
+        guest = cache.peek(guest_id)
+        if guest is None:
+            missing.append(guest_id)
+        else:
+            guests[guest_id] = dict(guest)
+    if not missing:
+        return guests
+    generation = cache.generation
+    with pooled_connection() as conn:
+        if conn is None: return None
         cursor = conn.cursor(dictionary=True)
-        query = "SELECT * FROM Guests WHERE guest_id = %s"
-        cursor.execute(query, (guest_id,))
-        guest = cursor.fetchone()
-    except Error as e:
-        print(f"Error fetching guest by ID: {e}")
-    finally:
-        if conn.is_connected():
+        try:
+            placeholders = ', '.join(['%s'] * len(missing))
+            cursor.execute(f"SELECT * FROM Guests WHERE guest_id IN ({placeholders})", tuple(missing))
+            rows = cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching guests by ID: {e}")
+            return None
+        finally:
             cursor.close()
-            conn.close()
-    return guest
+    for row in rows:
+        cache.put(row['guest_id'], row, generation)
+        guests[row['guest_id']] = dict(row)
+    return guests
 
-# Add update_guest_db, delete_guest_db as needed
\ No newline at end of file
+# Add update_guest_db, delete_guest_db as needed
@@ -0,0 +1,280 @@
+# db/guest_search.py
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+from .connection import pooled_connection, Error
+from .changes import subscribe
+from .records import GuestSummary
+from config import GUEST_SEARCH_CONFIG
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'phone')
+_PHONE_CHARS = re.compile(r'^[\d\s()+\-.]+$')
+_NON_DIGITS = re.compile(r'\D')
+
+
+def _normalize_word(word):
+    """ Lower-cases a search word; phone-like words are reduced to their digits. """
+    word = word.strip().lower()
+    if _PHONE_CHARS.match(word):
+        return _NON_DIGITS.sub('', word)
+    return word
+
+def _normalized_fields(guest):
+    """ (first, last, email, phone) as they are stored in the index. """
+    return (
+        (guest.get('first_name') or '').lower(),
+        (guest.get('last_name') or '').lower(),
+        (guest.get('email') or '').lower(),
+        _NON_DIGITS.sub('', guest.get('phone') or ''),
+    )
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class GuestSearchIndex:
+    """ In-memory trigram + prefix index over guest names, email and phone.
+
+    Words of 3+ characters are looked up by trigram; shorter words match as
+    prefixes of name/email tokens. Candidates are verified against the
+    actual field text, so results are exact substring/prefix matches.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._guests = {}    # guest_id -> GuestSummary
+        self._fields = {}    # guest_id -> normalized (first, last, email, phone)
+        self._grams = {}     # trigram -> array of guest_ids (append order)
+        self._prefixes = {}  # 1-2 char token prefix -> array of guest_ids
+        self._sort_keys = [] # sorted (last_name, first_name, guest_id) for empty-term browsing
+
+    def __len__(self):
+        return len(self._guests)
+
+    def load(self, cursor, batch_size=10000):
+        """ Builds the index from the Guests table using an open (plain) cursor. """
+        cursor.execute("SELECT guest_id, first_name, last_name, email, phone FROM Guests")
+        with self._lock:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    self._add(GuestSummary(*row), keep_sorted=False)
+            self._sort_keys.sort() # One sort instead of an insort per row
+
+    def add(self, guest):
+        """ Adds or replaces a guest (a GuestSummary, or a row dict with guest_id and the SEARCH_FIELDS). """
+        with self._lock:
+            self._add(guest, keep_sorted=True)
+
+    def _add(self, guest, keep_sorted):
+        row = guest if type(guest) is GuestSummary else GuestSummary.from_dict(guest)
+        guest_id = row.guest_id
+        fields = _normalized_fields(row)
+        if guest_id in self._guests:
+            # Postings are append-only; stale entries are filtered out on verify
+            old = self._guests[guest_id]
+            self._sort_keys.remove((old.last_name or '', old.first_name or '', guest_id))
+        self._guests[guest_id] = row
+        self._fields[guest_id] = fields
+        key = (row.last_name or '', row.first_name or '', guest_id)
+        if keep_sorted:
+            self._sort_keys.insert(bisect_left(self._sort_keys, key), key)
+        else:
+            self._sort_keys.append(key)
+
+        grams = set()
+        prefixes = set()
+        for text in fields:
+            grams |= _trigrams(text)
+        for text in fields[:3]:
+            for token in re.split(r'[\s@._\-]+', text):
+                if token:
+                    prefixes.add(token[:1])
+                    prefixes.add(token[:2])
+        if fields[3]:
+            prefixes.add(fields[3][:1])
+            prefixes.add(fields[3][:2])
+        for gram in grams:
+            self._grams.setdefault(gram, array('I')).append(guest_id)
+        for prefix in prefixes:
+            self._prefixes.setdefault(prefix, array('I')).append(guest_id)
+
+    def _candidates(self, word):
+        """ Smallest posting list that every match for `word` must appear in. """
+        if len(word) >= 3:
+            postings = [self._grams.get(gram) for gram in _trigrams(word)]
+            if any(p is None for p in postings):
+                return ()
+            return min(postings, key=len)
+        return self._prefixes.get(word, ())
+
+    @staticmethod
+    def _word_rank(word, fields):
+        """ Rank of how `word` matches one guest (lower is better), or None. """
+        first, last, email, phone = fields
+        if word == last or word == first:
+            return 0
+        if last.startswith(word) or first.startswith(word):
+            return 1
+        if len(word) >= 3 and (word in last or word in first):
+            return 2
+        if email.startswith(word) or (phone and phone.startswith(word)):
+            return 3
+        if len(word) >= 3 and (word in email or word in phone):
+            return 4
+        if len(word) < 3 and any(token.startswith(word) for token in re.split(r'[\s@._\-]+', f"{first} {last} {email}")):
+            return 5
+        return None
+
+    def search(self, term, limit=50):
+        """ Returns up to `limit` guests (shared GuestSummary records) matching every word of `term`, best first. """
+        words = [w for w in (_normalize_word(w) for w in term.split()) if w]
+        with self._lock:
+            if not words:
+                return [self._guests[gid] for _, _, gid in self._sort_keys[:limit]]
+
+            # Drive the scan from the most selective word
+            lists = [(self._candidates(w), w) for w in words]
+            postings, _ = min(lists, key=lambda item: len(item[0]))
+
+            scored = []
+            seen = set()
+            for guest_id in postings:
+                if guest_id in seen:
+                    continue
+                seen.add(guest_id)
+                fields = self._fields.get(guest_id)
+                if fields is None:
+                    continue
+                total = 0
+                for word in words:
+                    rank = self._word_rank(word, fields)
+                    if rank is None:
+                        break
+                    total += rank
+                else:
+                    guest = self._guests[guest_id]
+                    scored.append((total, guest.last_name or '', guest.first_name or '', guest_id))
+
+            best = heapq.nsmallest(limit, scored)
+            return [self._guests[guest_id] for _, _, _, guest_id in best]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_guest_search_index():
+    """ Returns the loaded guest search index, building it on first use (None on failure). """
+    global _index
+    if _index is not None:
+        return _index
+    with _index_lock:
+        if _index is None:
+            with pooled_connection() as conn:
+                if conn is None: return None
+                cursor = conn.cursor()
+                try:
+                    index = GuestSearchIndex()
+                    index.load(cursor)
+                    _index = index
+                except Error as e:
+                    print(f"Error loading guest search index: {e}")
+                finally:
+                    cursor.close()
+    return _index
+
+def invalidate_guest_search_index():
+    """ Drops the index; the next search reloads it from the database. """
+    global _index
+    with _index_lock:
+        _index = None
+
+def note_guest_added(guest):
+    """ Called by add_guest_db so an already-loaded index stays current. """
+    index = _index
+    if index is not None:
+        index.add(guest)
+
+def _on_remote_change(table, action, row_ids, origin):
+    """ Adds guests inserted by other terminals to a loaded index. """
+    index = _index
+    if index is None or origin != 'remote':
+        return
+    if not row_ids:
+        invalidate_guest_search_index()
+        return
+    with pooled_connection() as conn:
+        if conn is None:
+            invalidate_guest_search_index()
+            return
+        cursor = conn.cursor()
+        try:
+            placeholders = ', '.join(['%s'] * len(row_ids))
+            cursor.execute(f"SELECT guest_id, first_name, last_name, email, phone FROM Guests WHERE guest_id IN ({placeholders})",
+                           tuple(row_ids))
+            for row in GuestSummary.from_rows(cursor.fetchall()):
+                index.add(row)
+        except Error as e:
+            print(f"Error applying remote guest change to search index: {e}")
+            invalidate_guest_search_index()
+        finally:
+            cursor.close()
+
+subscribe('Guests', _on_remote_change)
+
+def fulltext_search_guests(cursor, term, limit):
+    """ Server-side search using the FULLTEXT index on Guests (first_name, last_name, email, phone).
+
+    Takes an open plain cursor; returns GuestSummary records.
+    """
+    words = [re.sub(r'[+\-<>()~*"@]', ' ', w).strip() for w in term.split()]
+    boolean_query = ' '.join(f'+{w}*' for w in words if w)
+    query = """
+        SELECT guest_id, first_name, last_name, email, phone,
+               MATCH(first_name, last_name, email, phone) AGAINST (%s IN BOOLEAN MODE) AS score
+        FROM Guests
+        WHERE MATCH(first_name, last_name, email, phone) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY score DESC, last_name, first_name
+        LIMIT %s
+    """
+    cursor.execute(query, (boolean_query, boolean_query, limit))
+    return [GuestSummary(*row[:5]) for row in cursor.fetchall()] # Drop the score
+
+def match_rank(guest, term):
+    """ Rank of `guest` (a GuestSummary or row dict) for `term` as GuestSearchIndex.search scores it, or None if it doesn't match.
+
+    Lets a caller holding the results for a shorter term narrow them down
+    locally (see refines()).
+    """
+    fields = _normalized_fields(guest)
+    total = 0
+    for word in (_normalize_word(w) for w in term.split()):
+        if not word:
+            continue
+        rank = GuestSearchIndex._word_rank(word, fields)
+        if rank is None:
+            return None
+        total += rank
+    return total
+
+def refines(old_term, new_term):
+    """ True if every guest matching `new_term` also matches `old_term`.
+
+    Holds when new_term only extends old_term and each of old_term's words
+    is matched as a substring (3+ characters, not a phone number): 1-2
+    character words match as prefixes, so "jo" -> "joh" can gain guests.
+    """
+    old, new = old_term.strip().lower(), new_term.strip().lower()
+    if not old or not new.startswith(old):
+        return False
+    return all(len(word) >= 3 and _normalize_word(word) == word for word in old.split())
+
+def search_mode():
+    return GUEST_SEARCH_CONFIG.get('mode', 'memory')
+
+def default_limit():
+    return GUEST_SEARCH_CONFIG.get('limit', 50)
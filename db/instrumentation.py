@@ -0,0 +1,290 @@
+# db/instrumentation.py
+"""
+Timing and profiling for the query layer.
+
+Query functions are wrapped with @instrumented. While one runs, every
+pooled connection checkout and cursor call made on that thread is timed,
+so each call is split into connect (pool checkout, including the
+handshake for a fresh connection), execute and fetch time, with the rows
+fetched and any database errors. Results go into per-function histograms
+and calls slower than INSTRUMENTATION_CONFIG['slow_query_ms'] are kept in a
+slow-query log. get_query_stats() / dump_stats() expose them; the
+Diagnostics view in the GUI shows the same data.
+"""
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from .connection import add_cursor_wrapper, add_acquire_hook, get_pool_stats, Error
+from config import INSTRUMENTATION_CONFIG
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PHASES = ('total', 'connect', 'execute', 'fetch')
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+class Histogram:
+    """ Fixed-bucket latency histogram (milliseconds) with exact count/sum/min/max. """
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        self.min = ms if self.min is None or ms < self.min else self.min
+        self.max = ms if self.max is None or ms > self.max else self.max
+
+    def percentile(self, pct):
+        """ Estimated percentile: the upper bound of the bucket holding it (capped at max). """
+        if not self.count:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                bound = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': _round(self.sum / self.count if self.count else None),
+            'min_ms': _round(self.min),
+            'p50_ms': _round(self.percentile(50)),
+            'p95_ms': _round(self.percentile(95)),
+            'p99_ms': _round(self.percentile(99)),
+            'max_ms': _round(self.max),
+            'buckets': dict(zip([str(b) for b in BUCKETS_MS] + ['inf'], self.counts)),
+        }
+
+
+class QueryStats:
+    """ Aggregates for one instrumented function. """
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.statements = 0
+        self.last_error = None
+        self.phases = {phase: Histogram() for phase in PHASES}
+
+    def snapshot(self):
+        return {
+            'function': self.name,
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'rows_per_call': round(self.rows / self.calls, 2) if self.calls else 0,
+            'statements': self.statements,
+            'last_error': self.last_error,
+            'phases': {phase: hist.snapshot() for phase, hist in self.phases.items()},
+        }
+
+
+class _Call:
+    """ Timings of one instrumented call in progress. """
+    __slots__ = ('name', 'connect', 'execute', 'fetch', 'rows', 'statements', 'errors', 'slowest_sql', 'slowest')
+
+    def __init__(self, name):
+        self.name = name
+        self.connect = self.execute = self.fetch = 0.0
+        self.rows = self.statements = 0
+        self.errors = []
+        self.slowest_sql = None
+        self.slowest = 0.0
+
+
+_lock = threading.Lock()
+_stats = {}          # function name -> QueryStats
+_slow_log = deque(maxlen=INSTRUMENTATION_CONFIG.get('slow_log_size', 200))
+_local = threading.local() # .calls: stack of _Call for the running instrumented functions
+
+
+def _active_calls():
+    return getattr(_local, 'calls', None)
+
+def is_enabled():
+    return INSTRUMENTATION_CONFIG.get('enabled', True)
+
+
+class TimedCursor:
+    """ Cursor proxy that charges execute/fetch time and rows to the running instrumented calls. """
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _charge(self, phase, seconds, rows=0, sql=None):
+        for call in _active_calls() or ():
+            setattr(call, phase, getattr(call, phase) + seconds)
+            call.rows += rows
+            if sql is not None:
+                call.statements += 1
+                if seconds >= call.slowest:
+                    call.slowest, call.slowest_sql = seconds, sql
+
+    def _run(self, phase, method, sql, *args):
+        started = time.perf_counter()
+        try:
+            result = method(*args)
+        except Error as e:
+            for call in _active_calls() or ():
+                call.errors.append(str(e))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if phase == 'execute':
+                self._charge(phase, elapsed, sql=sql)
+        if phase == 'fetch':
+            rows = len(result) if isinstance(result, list) else (0 if result is None else 1)
+            self._charge(phase, elapsed, rows=rows)
+        return result
+
+    def execute(self, operation, params=()):
+        return self._run('execute', self._cursor.execute, operation, operation, params)
+
+    def executemany(self, operation, seq_params):
+        return self._run('execute', self._cursor.executemany, operation, operation, seq_params)
+
+    def fetchone(self):
+        return self._run('fetch', self._cursor.fetchone, None)
+
+    def fetchall(self):
+        return self._run('fetch', self._cursor.fetchall, None)
+
+    def fetchmany(self, size=1):
+        return self._run('fetch', self._cursor.fetchmany, None, size)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _wrap_cursor(cursor):
+    return TimedCursor(cursor) if _active_calls() else cursor
+
+def _on_acquire(seconds, connected):
+    for call in _active_calls() or ():
+        call.connect += seconds
+        if not connected:
+            call.errors.append("no database connection")
+
+add_cursor_wrapper(_wrap_cursor)
+add_acquire_hook(_on_acquire)
+
+
+def _record(call, total):
+    ms = {'total': total * 1000, 'connect': call.connect * 1000,
+          'execute': call.execute * 1000, 'fetch': call.fetch * 1000}
+    with _lock:
+        stats = _stats.get(call.name)
+        if stats is None:
+            stats = _stats[call.name] = QueryStats(call.name)
+        stats.calls += 1
+        stats.rows += call.rows
+        stats.statements += call.statements
+        if call.errors:
+            stats.errors += 1
+            stats.last_error = call.errors[-1]
+        for phase, value in ms.items():
+            stats.phases[phase].add(value)
+        if ms['total'] >= INSTRUMENTATION_CONFIG.get('slow_query_ms', 200):
+            _slow_log.append({
+                'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'function': call.name,
+                'total_ms': round(ms['total'], 3),
+                'connect_ms': round(ms['connect'], 3),
+                'execute_ms': round(ms['execute'], 3),
+                'fetch_ms': round(ms['fetch'], 3),
+                'rows': call.rows,
+                'error': call.errors[-1] if call.errors else None,
+                'slowest_sql': ' '.join(call.slowest_sql.split())[:500] if call.slowest_sql else None,
+            })
+
+def instrumented(func=None, *, name=None):
+    """ Decorator that records timings for every call of a query function.
+
+    Usable bare (@instrumented) or with a name (@instrumented(name='...')).
+    Nested instrumented calls are recorded under both functions.
+    """
+    if func is None:
+        return lambda f: instrumented(f, name=name)
+    label = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_enabled():
+            return func(*args, **kwargs)
+        stack = _active_calls()
+        if stack is None:
+            stack = _local.calls = []
+        call = _Call(label)
+        stack.append(call)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            call.errors.append(str(e))
+            raise
+        finally:
+            stack.pop()
+            _record(call, time.perf_counter() - started)
+    return wrapper
+
+
+# --- Reading the registry ---
+
+def get_query_stats():
+    """ Per-function snapshots, slowest p95 first. """
+    with _lock:
+        snapshots = [stats.snapshot() for stats in _stats.values()]
+    return sorted(snapshots, key=lambda s: s['phases']['total']['p95_ms'] or 0, reverse=True)
+
+def get_slow_queries():
+    """ Slow-query log entries, most recent first. """
+    with _lock:
+        return list(reversed(_slow_log))
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+        _slow_log.clear()
+
+def dump_stats(path=None):
+    """ Machine-readable dump of the registry (plus pool counters) as JSON.
+
+    Writes to `path` if given; always returns the JSON text.
+    """
+    try:
+        pool = get_pool_stats()
+    except Error:
+        pool = None
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'slow_query_ms': INSTRUMENTATION_CONFIG.get('slow_query_ms', 200),
+        'functions': get_query_stats(),
+        'slow_queries': get_slow_queries(),
+        'pool': pool,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    if path:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
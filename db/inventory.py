@@ -0,0 +1,281 @@
+# db/inventory.py
+"""
+Room-night inventory: one RoomNights row per room per booked night.
+
+A reservation for [check_in, check_out) owns the nights check_in ..
+check_out - 1 of its room while it is active ('confirmed' or
+'checked-in'). The booking engine in reservation_queries claims the nights
+in the same transaction as the insert, and update_reservation_status_db
+releases them when a stay is cancelled or checked out. The primary key
+(room_id, night) makes a double booking impossible at the storage level.
+
+Availability and occupancy questions become lookups on that key instead
+of date-range overlap tests over Reservations:
+
+    get_rooms_free_for_nights(check_in, nights)
+    get_occupancy_by_date(start, end)
+    get_occupancy_calendar(start, days=365)     # one query for the whole year
+
+If the table ever drifts from Reservations (e.g. rows written by another
+tool), rebuild it:
+
+    python -m db.inventory check
+    python -m db.inventory rebuild
+"""
+import argparse
+from datetime import date, timedelta
+
+from .connection import pooled_connection, Error
+from .instrumentation import instrumented
+from .availability import ACTIVE_STATUSES, _to_date
+from .records import AvailableRoom
+
+BATCH_SIZE = 1000 # Rows per executemany when filling the table
+
+
+def stay_nights(check_in, check_out):
+    """ The nights [check_in, check_out) of a stay, as dates. """
+    check_in, check_out = _to_date(check_in), _to_date(check_out)
+    return [check_in + timedelta(days=i) for i in range((check_out - check_in).days)]
+
+def _night_rows(stays):
+    """ (room_id, night, reservation_id) rows for (reservation_id, room_id, check_in, check_out) stays. """
+    return [(room_id, night, reservation_id)
+            for reservation_id, room_id, check_in, check_out in stays
+            for night in stay_nights(check_in, check_out)]
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+# --- Keeping the table in sync (called inside the writers' transactions) ---
+
+def claim_nights(cursor, stays):
+    """ Inserts the nights of (reservation_id, room_id, check_in, check_out) stays.
+
+    Raises the backend's integrity error if a night is already taken, so the
+    caller's transaction is rolled back.
+    """
+    rows = _night_rows(stays)
+    if rows:
+        cursor.executemany("INSERT INTO RoomNights (room_id, night, reservation_id) VALUES (%s, %s, %s)", rows)
+    return len(rows)
+
+def release_nights(cursor, reservation_ids):
+    """ Frees the nights held by the given reservations. """
+    if not reservation_ids:
+        return 0
+    cursor.execute(f"DELETE FROM RoomNights WHERE reservation_id IN ({_placeholders(reservation_ids)})",
+                   tuple(reservation_ids))
+    return cursor.rowcount
+
+def fill_room_nights(cursor, backend_name=None):
+    """ Adds the nights of every active reservation (existing rows are kept). Returns rows written.
+
+    Also the data step of the migration that creates RoomNights. Needs a
+    plain (non-dictionary) cursor.
+    """
+    cursor.execute(f"""
+        SELECT reservation_id, room_id, check_in_date, check_out_date
+        FROM Reservations
+        WHERE status IN ({_placeholders(ACTIVE_STATUSES)})
+        ORDER BY reservation_id
+    """, ACTIVE_STATUSES)
+    rows = _night_rows(cursor.fetchall())
+    # IGNORE: a night claimed twice by legacy overlapping stays goes to the earlier reservation
+    for i in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany("INSERT IGNORE INTO RoomNights (room_id, night, reservation_id) VALUES (%s, %s, %s)",
+                           rows[i:i + BATCH_SIZE])
+    return len(rows)
+
+
+# --- Maintenance ---
+
+def rebuild_room_nights():
+    """ Recreates RoomNights from Reservations in one transaction. Returns rows written, or None on error. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            cursor.execute("DELETE FROM RoomNights")
+            written = fill_room_nights(cursor)
+            conn.commit()
+            return written
+        except Error as e:
+            print(f"Error rebuilding room nights: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+
+def check_room_nights():
+    """ Compares RoomNights with the active reservations.
+
+    Returns a dict with 'missing' (nights of active stays with no row),
+    'stale' (rows with no active stay behind them) and 'double_booked'
+    (room-nights wanted by more than one active stay), each a list of
+    (room_id, night, reservation_id). None on error.
+    """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT reservation_id, room_id, check_in_date, check_out_date
+                FROM Reservations
+                WHERE status IN ({_placeholders(ACTIVE_STATUSES)})
+                ORDER BY reservation_id
+            """, ACTIVE_STATUSES)
+            wanted = {}
+            double_booked = []
+            for row in _night_rows(cursor.fetchall()):
+                if row[:2] in wanted:
+                    double_booked.append(row)
+                else:
+                    wanted[row[:2]] = row[2]
+            cursor.execute("SELECT room_id, night, reservation_id FROM RoomNights")
+            actual = {(row[0], _to_date(row[1])): row[2] for row in cursor.fetchall()}
+        except Error as e:
+            print(f"Error checking room nights: {e}")
+            return None
+        finally:
+            cursor.close()
+    return {
+        'missing': sorted(key + (res,) for key, res in wanted.items() if actual.get(key) != res),
+        'stale': sorted(key + (res,) for key, res in actual.items() if wanted.get(key) != res),
+        'double_booked': double_booked,
+    }
+
+
+# --- Queries ---
+
+@instrumented
+def get_rooms_free_for_nights(check_in, nights=1):
+    """ Rooms (not in maintenance) with none of the `nights` nights from check_in booked.
+
+    AvailableRoom records, as get_available_rooms_for_booking. Each room is a
+    primary-key range probe on RoomNights.
+    """
+    check_in = _to_date(check_in)
+    rooms = []
+    with pooled_connection() as conn:
+        if conn is None: return rooms
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT r.room_id, r.room_number, rt.type_name, rt.base_price
+                FROM Rooms r
+                JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
+                WHERE r.maintenance_status = FALSE AND NOT EXISTS (
+                    SELECT 1 FROM RoomNights rn
+                    WHERE rn.room_id = r.room_id AND rn.night >= %s AND rn.night < %s
+                )
+                ORDER BY r.room_number
+            """, (check_in, check_in + timedelta(days=nights)))
+            rooms = AvailableRoom.from_rows(cursor.fetchall())
+        except Error as e:
+            print(f"Error fetching free rooms: {e}")
+        finally:
+            cursor.close()
+    return rooms
+
+@instrumented
+def get_occupied_room_ids(night):
+    """ Set of room ids booked for `night` (a stay's check-out day is not one of its nights). """
+    room_ids = set()
+    with pooled_connection() as conn:
+        if conn is None: return room_ids
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT room_id FROM RoomNights WHERE night = %s", (_to_date(night),))
+            room_ids = {row[0] for row in cursor.fetchall()}
+        except Error as e:
+            print(f"Error fetching occupied rooms: {e}")
+        finally:
+            cursor.close()
+    return room_ids
+
+@instrumented
+def get_occupancy_by_date(start, end):
+    """ Booked room count per night for [start, end): {date: rooms}, zero-filled. None on error. """
+    start, end = _to_date(start), _to_date(end)
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT night, COUNT(*) FROM RoomNights
+                WHERE night >= %s AND night < %s
+                GROUP BY night
+            """, (start, end))
+            counts = {_to_date(night): occupied for night, occupied in cursor.fetchall()}
+        except Error as e:
+            print(f"Error fetching occupancy: {e}")
+            return None
+        finally:
+            cursor.close()
+    return {night: counts.get(night, 0) for night in stay_nights(start, end)}
+
+@instrumented
+def get_occupancy_calendar(start=None, days=365):
+    """ Occupancy for `days` nights from `start` (default today), from a single query.
+
+    Returns a list of dicts (night, occupied, total_rooms, occupancy) with
+    occupancy as a fraction of all rooms, or None on error.
+    """
+    start = _to_date(start) if start is not None else date.today()
+    end = start + timedelta(days=days)
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            # The room count rides along with the per-night counts (LEFT JOIN keeps it for an empty range)
+            cursor.execute("""
+                SELECT t.total_rooms, o.night, o.occupied
+                FROM (SELECT COUNT(*) AS total_rooms FROM Rooms) t
+                LEFT JOIN (
+                    SELECT night, COUNT(*) AS occupied FROM RoomNights
+                    WHERE night >= %s AND night < %s
+                    GROUP BY night
+                ) o ON 1 = 1
+            """, (start, end))
+            rows = cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching occupancy calendar: {e}")
+            return None
+        finally:
+            cursor.close()
+    total_rooms = int(rows[0][0]) if rows else 0
+    counts = {_to_date(night): int(occupied) for _, night, occupied in rows if night is not None}
+    return [{
+        'night': night,
+        'occupied': counts.get(night, 0),
+        'total_rooms': total_rooms,
+        'occupancy': round(counts.get(night, 0) / total_rooms, 4) if total_rooms else 0.0,
+    } for night in stay_nights(start, end)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the RoomNights inventory.")
+    parser.add_argument('command', choices=('check', 'rebuild'))
+    args = parser.parse_args(argv)
+
+    if args.command == 'rebuild':
+        written = rebuild_room_nights()
+        if written is None:
+            return 1
+        print(f"RoomNights rebuilt: {written} room-nights.")
+        return 0
+
+    report = check_room_nights()
+    if report is None:
+        return 1
+    for kind in ('missing', 'stale', 'double_booked'):
+        print(f"{kind}: {len(report[kind])}")
+        for room_id, night, reservation_id in report[kind][:10]:
+            print(f"  room {room_id} night {night} reservation {reservation_id}")
+    return 1 if any(report.values()) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,459 @@
+# db/migrations.py
+"""
+Versioned schema migrations for MySQL and SQLite.
+
+Each Migration has a version number and per-backend steps (SQL strings,
+Index or Column definitions or data functions called with the cursor). migrate() applies the ones newer than the version
+recorded in SchemaVersion, one at a time, and every step is safe to re-run
+(CREATE ... IF NOT EXISTS, indexes are only created if missing), so an
+interrupted upgrade can simply be started again.
+
+    python -m db.migrations status
+    python -m db.migrations upgrade [--to VERSION]
+
+The SQLite backend applies them automatically on first connect.
+"""
+import argparse
+
+from .connection import pooled_connection, get_backend, Error
+from .changes import CHANGE_LOG_DDL
+from .inventory import fill_room_nights
+from .payment_queries import fill_missing_tax, fill_folio_balances
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS SchemaVersion (
+        version INT NOT NULL PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Index:
+    """ A secondary index, created only if no index of that name exists on the table. """
+    def __init__(self, name, table, columns, unique=False, fulltext=False):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.fulltext = fulltext # MySQL only; skipped on backends without FULLTEXT
+
+    def exists(self, cursor, backend_name):
+        if backend_name == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = %s", (self.name,))
+        else:
+            cursor.execute("""
+                SELECT 1 FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+                LIMIT 1
+            """, (self.table, self.name))
+        return cursor.fetchone() is not None
+
+    def apply(self, cursor, backend_name):
+        if self.fulltext and backend_name != 'mysql':
+            return
+        if self.exists(cursor, backend_name):
+            return
+        kind = 'FULLTEXT INDEX' if self.fulltext else 'UNIQUE INDEX' if self.unique else 'INDEX'
+        cursor.execute(f"CREATE {kind} {self.name} ON {self.table} ({', '.join(self.columns)})")
+
+    def __repr__(self):
+        return f"Index({self.name} ON {self.table}({', '.join(self.columns)}))"
+
+
+class Column:
+    """ A column added to an existing table, only if the table doesn't have it yet. """
+    def __init__(self, table, name, definition):
+        self.table = table
+        self.name = name
+        self.definition = definition
+
+    def exists(self, cursor, backend_name):
+        if backend_name == 'sqlite':
+            cursor.execute(f"PRAGMA table_info({self.table})")
+            return any(row[1] == self.name for row in cursor.fetchall())
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+            LIMIT 1
+        """, (self.table, self.name))
+        return cursor.fetchone() is not None
+
+    def apply(self, cursor, backend_name):
+        if not self.exists(cursor, backend_name):
+            cursor.execute(f"ALTER TABLE {self.table} ADD COLUMN {self.name} {self.definition}")
+
+    def __repr__(self):
+        return f"Column({self.table}.{self.name} {self.definition})"
+
+
+class Migration:
+    """ One schema version: `steps` run on every backend, `mysql`/`sqlite` only on that one. """
+    def __init__(self, version, description, steps=(), mysql=(), sqlite=()):
+        self.version = version
+        self.description = description
+        self.steps = list(steps)
+        self.backend_steps = {'mysql': list(mysql), 'sqlite': list(sqlite)}
+
+    def steps_for(self, backend_name):
+        return self.backend_steps.get(backend_name, []) + self.steps
+
+    def apply(self, cursor, backend_name):
+        for step in self.steps_for(backend_name):
+            if isinstance(step, (Index, Column)):
+                step.apply(cursor, backend_name)
+            elif callable(step):
+                step(cursor, backend_name)
+            else:
+                cursor.execute(step)
+
+
+# --- Schema ---
+
+MYSQL_BASE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS RoomTypes (
+        room_type_id INT AUTO_INCREMENT PRIMARY KEY,
+        type_name VARCHAR(50) NOT NULL UNIQUE,
+        description TEXT,
+        base_price DECIMAL(10, 2) NOT NULL,
+        capacity INT NOT NULL DEFAULT 2
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Rooms (
+        room_id INT AUTO_INCREMENT PRIMARY KEY,
+        room_number VARCHAR(10) NOT NULL UNIQUE,
+        room_type_id INT NOT NULL,
+        floor_number INT,
+        availability BOOLEAN NOT NULL DEFAULT TRUE,
+        maintenance_status BOOLEAN NOT NULL DEFAULT FALSE,
+        FOREIGN KEY (room_type_id) REFERENCES RoomTypes(room_type_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Guests (
+        guest_id INT AUTO_INCREMENT PRIMARY KEY,
+        first_name VARCHAR(50) NOT NULL,
+        last_name VARCHAR(50) NOT NULL,
+        email VARCHAR(100),
+        phone VARCHAR(20),
+        address VARCHAR(255),
+        city VARCHAR(50),
+        country VARCHAR(50),
+        passport_number VARCHAR(50),
+        date_of_birth DATE
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Reservations (
+        reservation_id INT AUTO_INCREMENT PRIMARY KEY,
+        guest_id INT NOT NULL,
+        room_id INT NOT NULL,
+        check_in_date DATE NOT NULL,
+        check_out_date DATE NOT NULL,
+        adults INT NOT NULL DEFAULT 1,
+        children INT NOT NULL DEFAULT 0,
+        special_requests TEXT,
+        status VARCHAR(20) NOT NULL DEFAULT 'confirmed',
+        FOREIGN KEY (guest_id) REFERENCES Guests(guest_id),
+        FOREIGN KEY (room_id) REFERENCES Rooms(room_id)
+    ) ENGINE=InnoDB
+    """,
+]
+
+SQLITE_BASE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS RoomTypes (
+        room_type_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type_name VARCHAR(50) NOT NULL UNIQUE,
+        description TEXT,
+        base_price DECIMAL(10, 2) NOT NULL,
+        capacity INTEGER NOT NULL DEFAULT 2
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Rooms (
+        room_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_number VARCHAR(10) NOT NULL UNIQUE,
+        room_type_id INTEGER NOT NULL REFERENCES RoomTypes(room_type_id),
+        floor_number INTEGER,
+        availability BOOLEAN NOT NULL DEFAULT TRUE,
+        maintenance_status BOOLEAN NOT NULL DEFAULT FALSE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Guests (
+        guest_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name VARCHAR(50) NOT NULL,
+        last_name VARCHAR(50) NOT NULL,
+        email VARCHAR(100),
+        phone VARCHAR(20),
+        address VARCHAR(255),
+        city VARCHAR(50),
+        country VARCHAR(50),
+        passport_number VARCHAR(50),
+        date_of_birth DATE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Reservations (
+        reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guest_id INTEGER NOT NULL REFERENCES Guests(guest_id),
+        room_id INTEGER NOT NULL REFERENCES Rooms(room_id),
+        check_in_date DATE NOT NULL,
+        check_out_date DATE NOT NULL,
+        adults INTEGER NOT NULL DEFAULT 1,
+        children INTEGER NOT NULL DEFAULT 0,
+        special_requests TEXT,
+        status VARCHAR(20) NOT NULL DEFAULT 'confirmed'
+    )
+    """,
+]
+
+SQLITE_CHANGE_LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS ChangeLog (
+        change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name VARCHAR(64) NOT NULL,
+        row_id INTEGER,
+        action VARCHAR(16) NOT NULL,
+        origin VARCHAR(32) NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+    )
+"""
+
+# One row per booked room-night (db/inventory.py); the primary key is the availability lookup
+ROOM_NIGHTS_DDL = """
+    CREATE TABLE IF NOT EXISTS RoomNights (
+        room_id INT NOT NULL,
+        night DATE NOT NULL,
+        reservation_id INT NOT NULL,
+        PRIMARY KEY (room_id, night),
+        FOREIGN KEY (room_id) REFERENCES Rooms(room_id),
+        FOREIGN KEY (reservation_id) REFERENCES Reservations(reservation_id)
+    ) ENGINE=InnoDB
+"""
+
+SQLITE_ROOM_NIGHTS_DDL = """
+    CREATE TABLE IF NOT EXISTS RoomNights (
+        room_id INTEGER NOT NULL REFERENCES Rooms(room_id),
+        night DATE NOT NULL,
+        reservation_id INTEGER NOT NULL REFERENCES Reservations(reservation_id),
+        PRIMARY KEY (room_id, night)
+    ) WITHOUT ROWID
+"""
+
+# Folio ledger (db/payment_queries.py): charges and payments are append-only,
+# FolioBalances holds the running totals per reservation
+MYSQL_LEDGER_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS FolioCharges (
+        charge_id INT AUTO_INCREMENT PRIMARY KEY,
+        reservation_id INT NOT NULL,
+        kind VARCHAR(20) NOT NULL DEFAULT 'service',
+        description VARCHAR(255) NOT NULL,
+        amount DECIMAL(10, 2) NOT NULL,
+        night DATE NULL, -- Set for nightly room charges only; unique per reservation
+        charge_date DATE NOT NULL,
+        posted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY uq_charges_room_night (reservation_id, night),
+        FOREIGN KEY (reservation_id) REFERENCES Reservations(reservation_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Payments (
+        payment_id INT AUTO_INCREMENT PRIMARY KEY,
+        reservation_id INT NOT NULL,
+        amount DECIMAL(10, 2) NOT NULL,
+        method VARCHAR(20) NOT NULL,
+        reference VARCHAR(100),
+        paid_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (reservation_id) REFERENCES Reservations(reservation_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS FolioBalances (
+        reservation_id INT NOT NULL PRIMARY KEY,
+        charges DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        payments DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        balance DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        FOREIGN KEY (reservation_id) REFERENCES Reservations(reservation_id)
+    ) ENGINE=InnoDB
+    """,
+]
+
+SQLITE_LEDGER_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS FolioCharges (
+        charge_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reservation_id INTEGER NOT NULL REFERENCES Reservations(reservation_id),
+        kind VARCHAR(20) NOT NULL DEFAULT 'service',
+        description VARCHAR(255) NOT NULL,
+        amount DECIMAL(10, 2) NOT NULL,
+        night DATE NULL,
+        charge_date DATE NOT NULL,
+        posted_at TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+        UNIQUE (reservation_id, night)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Payments (
+        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reservation_id INTEGER NOT NULL REFERENCES Reservations(reservation_id),
+        amount DECIMAL(10, 2) NOT NULL,
+        method VARCHAR(20) NOT NULL,
+        reference VARCHAR(100),
+        paid_at TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS FolioBalances (
+        reservation_id INTEGER NOT NULL PRIMARY KEY REFERENCES Reservations(reservation_id),
+        charges DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        payments DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        balance DECIMAL(12, 2) NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+# Indexes for the queries in db/*_queries.py (leading columns = equality filters)
+QUERY_INDEXES = [
+    # find_reservation_for_checkin_db, arrivals_today in get_dashboard_stats
+    Index('idx_res_checkin_status', 'Reservations', ['check_in_date', 'status', 'room_id', 'guest_id']),
+    # departures_today in get_dashboard_stats
+    Index('idx_res_checkout_status', 'Reservations', ['check_out_date', 'status', 'room_id']),
+    # Per-room overlap tests: get_rooms_page, rooms_to_clean, find_reservation_for_checkout_db
+    Index('idx_res_room_status_dates', 'Reservations', ['room_id', 'status', 'check_in_date', 'check_out_date']),
+    # Active stays by status: availability SQL fallback, AvailabilityIndex.load, occupancy in
+    # get_all_rooms_with_details / get_dashboard_stats (covering, no table lookups)
+    Index('idx_res_status_dates', 'Reservations', ['status', 'check_in_date', 'check_out_date', 'room_id']),
+    Index('idx_res_guest', 'Reservations', ['guest_id']),
+    # Keyset paging of the guest list: get_guests_page, get_guest_key_at
+    Index('idx_guests_name', 'Guests', ['last_name', 'first_name', 'guest_id']),
+    Index('idx_rooms_type', 'Rooms', ['room_type_id']),
+    # prune_change_log
+    Index('idx_changelog_changed_at', 'ChangeLog', ['changed_at']),
+]
+
+MIGRATIONS = [
+    Migration(1, "Base schema: RoomTypes, Rooms, Guests, Reservations",
+              mysql=MYSQL_BASE_SCHEMA, sqlite=SQLITE_BASE_SCHEMA),
+    Migration(2, "ChangeLog for cross-terminal refresh",
+              mysql=[CHANGE_LOG_DDL], sqlite=[SQLITE_CHANGE_LOG_DDL]),
+    Migration(3, "Indexes for the query layer", steps=QUERY_INDEXES),
+    Migration(4, "FULLTEXT index for guest search (GUEST_SEARCH_CONFIG mode 'fulltext')",
+              mysql=[Index('ft_guests_search', 'Guests', ['first_name', 'last_name', 'email', 'phone'], fulltext=True)]),
+    Migration(5, "RoomNights inventory, filled from active reservations",
+              mysql=[ROOM_NIGHTS_DDL], sqlite=[SQLITE_ROOM_NIGHTS_DDL],
+              steps=[
+                  # Occupancy by date / calendar; release_nights
+                  Index('idx_roomnights_night', 'RoomNights', ['night', 'room_id']),
+                  Index('idx_roomnights_reservation', 'RoomNights', ['reservation_id']),
+                  fill_room_nights,
+              ]),
+    Migration(6, "Folio ledger: FolioCharges, Payments, FolioBalances",
+              mysql=MYSQL_LEDGER_SCHEMA, sqlite=SQLITE_LEDGER_SCHEMA,
+              steps=[Index('idx_payments_reservation', 'Payments', ['reservation_id'])]),
+    Migration(7, "Index for revenue reports over folio charges",
+              steps=[Index('idx_charges_date_kind', 'FolioCharges', ['charge_date', 'kind'])]), # db/billing.py
+    Migration(8, "Tax posted to folios; room and tax running totals in FolioBalances",
+              steps=[
+                  Column('FolioBalances', 'room_charges', 'DECIMAL(12, 2) NOT NULL DEFAULT 0'),
+                  Column('FolioBalances', 'tax_charges', 'DECIMAL(12, 2) NOT NULL DEFAULT 0'),
+                  fill_missing_tax,
+                  fill_folio_balances,
+              ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# --- Applying ---
+
+def current_version(cursor):
+    """ Highest applied version (0 for a database that has never been migrated). """
+    cursor.execute(SCHEMA_VERSION_DDL)
+    cursor.execute("SELECT MAX(version) FROM SchemaVersion")
+    row = cursor.fetchone()
+    return (row[0] if row else None) or 0
+
+def migrate_connection(conn, backend_name, target=None):
+    """ Applies pending migrations on an open (non-dictionary) connection.
+
+    Returns the list of versions applied. Raises on failure after rolling
+    back what the backend allows (MySQL commits DDL implicitly, which is why
+    every step is idempotent).
+    """
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    cursor = conn.cursor()
+    try:
+        version = current_version(cursor)
+        conn.commit()
+        for migration in MIGRATIONS:
+            if version < migration.version <= target:
+                migration.apply(cursor, backend_name)
+                cursor.execute("INSERT INTO SchemaVersion (version, description) VALUES (%s, %s)",
+                               (migration.version, migration.description))
+                conn.commit()
+                applied.append(migration.version)
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return applied
+
+def migrate(target=None):
+    """ Brings the configured database up to `target` (default: latest). Returns versions applied, or None on error. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        try:
+            return migrate_connection(conn, get_backend().name, target)
+        except Error as e:
+            print(f"Error applying migrations: {e}")
+            return None
+
+def schema_status():
+    """ (current version, [pending Migration]) for the configured database, or None on error. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            version = current_version(cursor)
+            conn.commit()
+            return version, [m for m in MIGRATIONS if m.version > version]
+        except Error as e:
+            print(f"Error reading schema version: {e}")
+            return None
+        finally:
+            cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations.")
+    parser.add_argument('command', choices=('status', 'upgrade'))
+    parser.add_argument('--to', type=int, dest='target', help="Stop at this version")
+    args = parser.parse_args(argv)
+
+    status = schema_status()
+    if status is None:
+        return 1
+    version, pending = status
+    if args.command == 'status':
+        print(f"Schema version {version} (latest {LATEST_VERSION})")
+        for migration in pending:
+            print(f"  pending {migration.version}: {migration.description}")
+        return 0
+
+    applied = migrate(args.target)
+    if applied is None:
+        return 1
+    for number in applied:
+        print(f"Applied {number}: {next(m.description for m in MIGRATIONS if m.version == number)}")
+    if not applied:
+        print(f"Already at version {version}.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
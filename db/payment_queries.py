@@ -1,3 +1,378 @@
 # db/payment_queries.py
-# Add functions for payments later if needed by the UI
-# e.g., record_payment, get_payments_for_reservation
+"""
+Folio ledger: charges and payments per reservation.
+
+FolioCharges and Payments are append-only. Every write also adjusts the
+reservation's row in FolioBalances in the same transaction, so the
+balance at check-out is one primary-key read however long the folio is.
+Besides charges, payments and balance, the row keeps the room and tax
+parts of the charges (room_charges, tax_charges) for the invoice.
+rebuild_folio_balances() recomputes the totals from the ledger if they
+are ever in doubt.
+
+Tax is posted to the ledger with the charge it applies to, as a 'tax'
+charge at BILLING_CONFIG's room or service rate, so the balance is what
+the guest owes.
+
+The night audit calls post_room_charges(), which posts one room charge
+(and its tax) per in-house reservation in a few batched statements. A
+night can be posted again safely: the unique (reservation_id, night) key
+skips stays that already have their charge. At check-out,
+post_stay_room_charges() catches up on any night the audit missed.
+
+    python -m db.payment_queries post [--night YYYY-MM-DD]
+    python -m db.payment_queries rebuild
+"""
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from .connection import pooled_connection, Error
+from .instrumentation import instrumented
+from .availability import _to_date
+from config import BILLING_CONFIG
+
+BATCH_SIZE = 500 # Reservations per batched statement in post_room_charges
+CENTS = Decimal('0.01')
+
+
+def _money(value):
+    """ DECIMAL column value (or running float sum on SQLite) as a 2-place Decimal. """
+    return Decimal(str(value or 0)).quantize(CENTS)
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+def _tax_rate(kind):
+    """ Tax rate for a charge of `kind` as a Decimal (room tax for 'room', VAT for services). """
+    rate = BILLING_CONFIG.get('room_tax_rate' if kind == 'room' else 'service_tax_rate', 0)
+    return Decimal(str(rate))
+
+def _tax(amount, kind):
+    # Rounded half up, like SQL ROUND() in post_room_charges
+    return (amount * _tax_rate(kind)).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+# FolioBalances column holding each charge kind's share of `charges` (services have none)
+KIND_COLUMNS = {'room': 'room_charges', 'tax': 'tax_charges'}
+BALANCE_COLUMNS = ('charges', 'room_charges', 'tax_charges', 'payments', 'balance')
+
+def _add_to_balances(cursor, deltas, column, kind=None):
+    """ Adds {reservation_id: amount} to FolioBalances.<column> and the balance. Charges raise it, payments lower it.
+
+    For charges, `kind` also adds the amount to that kind's running total.
+    """
+    rows = list(deltas.items())
+    if not rows:
+        return
+    # Every reservation gets its balance row on first use; IGNORE keeps concurrent writers safe
+    cursor.executemany("INSERT IGNORE INTO FolioBalances (reservation_id) VALUES (%s)",
+                       [(reservation_id,) for reservation_id, _ in rows])
+    sign = '+' if column == 'charges' else '-'
+    kind_column = KIND_COLUMNS.get(kind) if column == 'charges' else None
+    kind_set = f"{kind_column} = {kind_column} + %s, " if kind_column else ""
+    cursor.executemany(f"""
+        UPDATE FolioBalances
+        SET {kind_set}{column} = {column} + %s, balance = balance {sign} %s
+        WHERE reservation_id = %s
+    """, [((amount,) if kind_column else ()) + (amount, amount, reservation_id) for reservation_id, amount in rows])
+
+
+@instrumented
+def add_folio_charge(reservation_id, amount, description, kind='service', charge_date=None):
+    """ Posts a charge (minibar, restaurant, adjustment...) to a folio. Returns charge_id or None.
+
+    The tax on it is posted in the same transaction as a separate 'tax'
+    charge (none for kind='tax' itself).
+    """
+    amount = _money(amount)
+    charge_date = _to_date(charge_date or date.today())
+    tax = _tax(amount, kind) if kind != 'tax' else Decimal(0)
+    charge_id = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            insert = """
+                INSERT INTO FolioCharges (reservation_id, kind, description, amount, charge_date)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            cursor.execute(insert, (reservation_id, kind, description, amount, charge_date))
+            charge_id = cursor.lastrowid
+            _add_to_balances(cursor, {reservation_id: amount}, 'charges', kind)
+            if tax:
+                cursor.execute(insert, (reservation_id, 'tax', f"Tax on {description}", tax, charge_date))
+                _add_to_balances(cursor, {reservation_id: tax}, 'charges', 'tax')
+            conn.commit()
+        except Error as e:
+            print(f"Error adding folio charge: {e}")
+            conn.rollback()
+            charge_id = None
+        finally:
+            cursor.close()
+    return charge_id
+
+@instrumented
+def record_payment(reservation_id, amount, method='cash', reference=None):
+    """ Records a payment against a reservation's folio. Returns payment_id or None. """
+    amount = _money(amount)
+    payment_id = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO Payments (reservation_id, amount, method, reference)
+                VALUES (%s, %s, %s, %s)
+            """, (reservation_id, amount, method, reference))
+            payment_id = cursor.lastrowid
+            _add_to_balances(cursor, {reservation_id: amount}, 'payments')
+            conn.commit()
+        except Error as e:
+            print(f"Error recording payment: {e}")
+            conn.rollback()
+            payment_id = None
+        finally:
+            cursor.close()
+    return payment_id
+
+@instrumented
+def get_folio_balance(reservation_id):
+    """ Running totals for one folio: dict(charges, room_charges, tax_charges, payments, balance) as Decimals.
+
+    A single primary-key read. A reservation with nothing posted yet has
+    zero totals. Returns None on DB error.
+    """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT {', '.join(BALANCE_COLUMNS)} FROM FolioBalances WHERE reservation_id = %s",
+                           (reservation_id,))
+            row = cursor.fetchone() or {}
+        except Error as e:
+            print(f"Error fetching folio balance: {e}")
+            return None
+        finally:
+            cursor.close()
+    return {key: _money(row.get(key)) for key in BALANCE_COLUMNS}
+
+@instrumented
+def get_folio(reservation_id):
+    """ Itemized folio for display: dict(charges=[...], payments=[...]) in posting order, or None on error. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT charge_id, kind, description, amount, night, charge_date
+                FROM FolioCharges WHERE reservation_id = %s
+                ORDER BY charge_id
+            """, (reservation_id,))
+            charges = cursor.fetchall()
+            cursor.execute("""
+                SELECT payment_id, amount, method, reference, paid_at
+                FROM Payments WHERE reservation_id = %s
+                ORDER BY payment_id
+            """, (reservation_id,))
+            payments = cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching folio: {e}")
+            return None
+        finally:
+            cursor.close()
+    for row in charges + payments:
+        row['amount'] = _money(row['amount'])
+    return {'charges': charges, 'payments': payments}
+
+def _post_room_nights(cursor, night, reservation_ids=None):
+    """ Posts the room charge and room tax for `night` to in-house stays (all, or just `reservation_ids`).
+
+    In-house means checked-in with `night` in [check_in, check_out). The
+    rate is the room type's base price. Stays already charged for that
+    night are skipped. Runs inside the caller's transaction; returns the
+    number of room charges posted. Needs a dictionary cursor.
+    """
+    only = f"AND res.reservation_id IN ({_placeholders(reservation_ids)})" if reservation_ids else ""
+    cursor.execute(f"""
+        SELECT res.reservation_id, r.room_number, rt.base_price
+        FROM Reservations res
+        JOIN Rooms r ON res.room_id = r.room_id
+        JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
+        WHERE res.status = 'checked-in'
+          AND res.check_in_date <= %s AND res.check_out_date > %s
+          AND NOT EXISTS (
+              SELECT 1 FROM FolioCharges c
+              WHERE c.reservation_id = res.reservation_id AND c.night = %s
+          )
+          {only}
+    """, (night, night, night) + tuple(reservation_ids or ()))
+    stays = cursor.fetchall()
+    rate = _tax_rate('room')
+    posted = 0
+    for i in range(0, len(stays), BATCH_SIZE):
+        batch = stays[i:i + BATCH_SIZE]
+        cursor.executemany("""
+            INSERT INTO FolioCharges (reservation_id, kind, description, amount, night, charge_date)
+            VALUES (%s, 'room', %s, %s, %s, %s)
+        """, [(stay['reservation_id'], f"Room {stay['room_number']} - night of {night.isoformat()}",
+               _money(stay['base_price']), night, night) for stay in batch])
+        ids = tuple(stay['reservation_id'] for stay in batch)
+        # Room tax for the same nights, computed from the charges just posted (tax rows carry no night)
+        cursor.execute(f"""
+            INSERT INTO FolioCharges (reservation_id, kind, description, amount, charge_date)
+            SELECT reservation_id, 'tax', %s, ROUND(amount * %s, 2), charge_date
+            FROM FolioCharges
+            WHERE night = %s AND reservation_id IN ({_placeholders(ids)})
+        """, (f"Room tax - night of {night.isoformat()}", rate, night) + ids)
+        # One set-based update per batch: each folio gains the charge and tax just posted for this night
+        cursor.executemany("INSERT IGNORE INTO FolioBalances (reservation_id) VALUES (%s)",
+                           [(reservation_id,) for reservation_id in ids])
+        tonight = "(SELECT c.amount FROM FolioCharges c WHERE c.reservation_id = FolioBalances.reservation_id AND c.night = %s)"
+        tonight_tax = f"ROUND({tonight} * %s, 2)"
+        cursor.execute(f"""
+            UPDATE FolioBalances
+            SET room_charges = room_charges + {tonight},
+                tax_charges = tax_charges + {tonight_tax},
+                charges = charges + {tonight} + {tonight_tax},
+                balance = balance + {tonight} + {tonight_tax}
+            WHERE reservation_id IN ({_placeholders(ids)})
+        """, (night, night, rate) + (night, night, rate) * 2 + ids)
+        posted += len(batch)
+    return posted
+
+@instrumented
+def post_room_charges(night=None):
+    """ Night audit: posts one room charge (plus room tax) for `night` (default today) to every in-house stay.
+
+    Stays already charged for that night are skipped. Returns the number
+    of charges posted, or None on DB error.
+    """
+    night = _to_date(night or date.today())
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            conn.start_transaction()
+            posted = _post_room_nights(cursor, night)
+            conn.commit()
+        except Error as e:
+            # A concurrent audit of the same night hits the unique key and rolls back; re-running is safe
+            print(f"Error posting room charges: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+    return posted
+
+@instrumented
+def post_stay_room_charges(reservation_id, until=None):
+    """ Posts every room night of a checked-in stay that the night audit has not (before check-out).
+
+    Covers the nights from check-in up to the day before `until` (default
+    today) or check-out, whichever is earlier, so the folio holds the
+    whole stay when the guest leaves. Returns the number of nights
+    posted, or None on DB error.
+    """
+    until = _to_date(until or date.today())
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            conn.start_transaction()
+            cursor.execute("SELECT check_in_date, check_out_date FROM Reservations WHERE reservation_id = %s",
+                           (reservation_id,))
+            stay = cursor.fetchone()
+            posted = 0
+            if stay:
+                night, last = _to_date(stay['check_in_date']), min(_to_date(stay['check_out_date']), until)
+                while night < last:
+                    posted += _post_room_nights(cursor, night, [reservation_id])
+                    night += timedelta(days=1)
+            conn.commit()
+        except Error as e:
+            print(f"Error posting room charges for reservation {reservation_id}: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+    return posted
+
+def fill_folio_balances(cursor, backend_name=None):
+    """ Recomputes FolioBalances from the ledger tables. Returns the number of folios.
+
+    Also the data step of the migration that adds the per-kind totals.
+    Needs a plain (non-dictionary) cursor.
+    """
+    totals = {} # reservation_id -> [charges, room, tax, payments]
+    cursor.execute("SELECT reservation_id, kind, amount FROM FolioCharges")
+    for reservation_id, kind, amount in cursor.fetchall():
+        folio = totals.setdefault(reservation_id, [Decimal(0)] * 4)
+        folio[0] += _money(amount)
+        if kind in KIND_COLUMNS:
+            folio[1 if kind == 'room' else 2] += _money(amount)
+    cursor.execute("SELECT reservation_id, amount FROM Payments")
+    for reservation_id, amount in cursor.fetchall():
+        totals.setdefault(reservation_id, [Decimal(0)] * 4)[3] += _money(amount)
+    cursor.execute("DELETE FROM FolioBalances")
+    cursor.executemany("""
+        INSERT INTO FolioBalances (reservation_id, charges, room_charges, tax_charges, payments, balance)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [(reservation_id, charges, room, tax, payments, charges - payments)
+          for reservation_id, (charges, room, tax, payments) in totals.items()])
+    return len(totals)
+
+def fill_missing_tax(cursor, backend_name=None):
+    """ Posts the tax on charges of in-house stays whose folio has none yet (folios opened before tax was posted).
+
+    Data step of the migration that adds the per-kind totals; checked-out
+    folios are left as they were settled. Run fill_folio_balances() after.
+    """
+    cursor.execute("""
+        INSERT INTO FolioCharges (reservation_id, kind, description, amount, charge_date)
+        SELECT c.reservation_id, 'tax', CASE WHEN c.kind = 'room' THEN 'Room tax' ELSE 'Tax' END,
+               ROUND(c.amount * CASE WHEN c.kind = 'room' THEN %s ELSE %s END, 2), c.charge_date
+        FROM FolioCharges c
+        JOIN Reservations res ON res.reservation_id = c.reservation_id
+        WHERE res.status = 'checked-in' AND c.kind <> 'tax'
+          AND NOT EXISTS (SELECT 1 FROM FolioCharges t WHERE t.reservation_id = c.reservation_id AND t.kind = 'tax')
+    """, (_tax_rate('room'), _tax_rate('service')))
+
+def rebuild_folio_balances():
+    """ Recomputes FolioBalances from the ledger tables. Returns the number of folios, or None on error. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            folios = fill_folio_balances(cursor)
+            conn.commit()
+            return folios
+        except Error as e:
+            print(f"Error rebuilding folio balances: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Night audit and folio maintenance.")
+    parser.add_argument('command', choices=('post', 'rebuild'))
+    parser.add_argument('--night', type=date.fromisoformat, help="Night to post (default today)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'post':
+        posted = post_room_charges(args.night)
+        if posted is None:
+            return 1
+        print(f"Posted {posted} room charges.")
+        return 0
+
+    folios = rebuild_folio_balances()
+    if folios is None:
+        return 1
+    print(f"Rebuilt balances for {folios} folios.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+# db/query_plans.py
+"""
+EXPLAIN-based check that the shipped queries use indexes.
+
+Runs every read function of the query layer with representative
+arguments, captures the SQL each one sends, EXPLAINs it and fails if a
+statement scans a whole table that is not on the allow-list below.
+
+    python -m db.query_plans                    # configured database (run db.migrations first)
+    python -m db.query_plans --sqlite /tmp/plan_check.db
+
+MySQL picks full scans for tiny tables regardless of indexes, so run the
+MySQL check against a database with realistic data (e.g. one filled by
+benchmarks/run.py --backend mysql). SQLite plans don't depend on row counts
+until ANALYZE has been run, so an empty scratch file is enough there.
+"""
+import argparse
+import re
+from datetime import date, timedelta
+
+import config
+from .connection import pooled_connection, get_backend, use_backend, add_cursor_wrapper, remove_cursor_wrapper, Error
+from .cache import invalidate_caches
+
+TABLES = ('RoomTypes', 'Rooms', 'Guests', 'Reservations', 'RoomNights', 'FolioCharges', 'Payments', 'FolioBalances',
+          'ChangeLog', 'SchemaVersion')
+
+# (call label, table) -> why a full scan is expected there; '*' matches any call
+ALLOWED_SCANS = {
+    ('*', 'RoomTypes'): "a handful of rows, joined by primary key",
+    ('get_all_rooms_with_details', 'Rooms'): "returns every room",
+    ('iter_all_rooms_with_details', 'Rooms'): "streams every room",
+    ('get_dashboard_stats', 'Rooms'): "counts every room",
+    ('_get_available_rooms_sql', 'Rooms'): "every room is a candidate; reservations are index lookups",
+    ('availability_index_load', 'Rooms'): "loads every room once",
+    ('revenue_report', 'Rooms'): "counts every room",
+    ('get_rooms_free_for_nights', 'Rooms'): "every room is a candidate; room-nights are primary-key probes",
+    ('get_all_guests', 'Guests'): "returns every guest",
+    ('guest_search_index_load', 'Guests'): "loads every guest once",
+    ('find_guest_by_name_db[like]', 'Guests'): "leading-wildcard LIKE; use the memory or fulltext search modes",
+}
+
+_FROM_JOIN = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.I)
+_NOT_ALIASES = {'ON', 'WHERE', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'ORDER', 'GROUP',
+                'LIMIT', 'HAVING', 'UNION', 'USING', 'SET', 'FOR'}
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE)\b', re.I)
+
+
+def table_aliases(sql):
+    """ Maps each table name and alias in `sql` to its table. """
+    aliases = {}
+    for table, alias in _FROM_JOIN.findall(sql):
+        if table not in TABLES:
+            continue
+        aliases[table] = table
+        if alias and alias.upper() not in _NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+class CapturingCursor:
+    """ Cursor proxy that records every statement it executes. """
+    def __init__(self, cursor, sink):
+        self._cursor = cursor
+        self._sink = sink
+
+    def execute(self, operation, params=()):
+        self._sink.append((operation, tuple(params or ())))
+        return self._cursor.execute(operation, params)
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        if seq_params:
+            self._sink.append((operation, tuple(seq_params[0])))
+        return self._cursor.executemany(operation, seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+def shipped_calls():
+    """ (label, function, args) for every read path of the query layer. """
+    from . import room_queries, guest_queries, reservation_queries, availability, guest_search, changes, inventory, payment_queries, billing
+
+    today = date.today()
+
+    def availability_index_load():
+        availability.invalidate_availability_index()
+        availability.get_availability_index()
+
+    def guest_search_index_load():
+        guest_search.invalidate_guest_search_index()
+        guest_search.get_guest_search_index()
+
+    def search_in_mode(mode):
+        def search(term):
+            previous = config.GUEST_SEARCH_CONFIG.get('mode')
+            config.GUEST_SEARCH_CONFIG['mode'] = mode
+            try:
+                return guest_queries.find_guest_by_name_db(term)
+            finally:
+                config.GUEST_SEARCH_CONFIG['mode'] = previous
+        return search
+
+    calls = [
+        ('get_all_rooms_with_details', room_queries.get_all_rooms_with_details, ()),
+        ('iter_all_rooms_with_details', lambda: list(room_queries.iter_all_rooms_with_details()), ()),
+        ('get_rooms_page', room_queries.get_rooms_page, (None,)),
+        ('get_rooms_page[after]', room_queries.get_rooms_page, ('101',)),
+        ('get_room_key_at', room_queries.get_room_key_at, (0,)),
+        ('count_rooms', room_queries.count_rooms, ()),
+        ('_get_available_rooms_sql', room_queries._get_available_rooms_sql, (today, today + timedelta(days=2))),
+        ('get_dashboard_stats', room_queries.get_dashboard_stats, (0,)),
+        ('availability_index_load', availability_index_load, ()),
+        ('get_all_guests', guest_queries.get_all_guests, ()),
+        ('get_guests_page', guest_queries.get_guests_page, (None,)),
+        ('get_guests_page[after]', guest_queries.get_guests_page, (('Smith', 'Ann', 1),)),
+        ('get_guest_key_at', guest_queries.get_guest_key_at, (0,)),
+        ('count_guests', guest_queries.count_guests, ()),
+        ('get_guest_by_id_db', guest_queries.get_guest_by_id_db, (1,)),
+        ('find_guest_by_name_db[like]', search_in_mode('like'), ('smi',)),
+        ('guest_search_index_load', guest_search_index_load, ()),
+        ('find_reservation_for_checkin_db', reservation_queries.find_reservation_for_checkin_db, ('Smith',)),
+        ('find_reservation_for_checkout_db', reservation_queries.find_reservation_for_checkout_db, ('101',)),
+        ('get_rooms_free_for_nights', inventory.get_rooms_free_for_nights, (today, 3)),
+        ('get_occupied_room_ids', inventory.get_occupied_room_ids, (today,)),
+        ('get_occupancy_by_date', inventory.get_occupancy_by_date, (today, today + timedelta(days=30))),
+        ('get_occupancy_calendar', inventory.get_occupancy_calendar, (today,)),
+        ('get_folio_balance', payment_queries.get_folio_balance, (1,)),
+        ('get_folio', payment_queries.get_folio, (1,)),
+        ('bill_reservations', billing.bill_reservations, ([1, 2, 3],)),
+        ('revenue_report', billing.revenue_report, (today - timedelta(days=365), today)),
+        ('poll_changes', changes.poll_changes, ()),
+        ('poll_changes[after]', changes.poll_changes, ()),
+    ]
+    if get_backend().supports_fulltext:
+        calls.append(('find_guest_by_name_db[fulltext]', search_in_mode('fulltext'), ('smi',)))
+    return calls
+
+
+def capture_statements():
+    """ Runs shipped_calls() and returns [(label, sql, params)] for the statements worth EXPLAINing. """
+    captured = []
+    for label, func, args in shipped_calls():
+        sink = []
+        wrapper = lambda cursor: CapturingCursor(cursor, sink)
+        add_cursor_wrapper(wrapper)
+        try:
+            invalidate_caches() # Cached reference data would hide the statements that load it
+            func(*args)
+        finally:
+            remove_cursor_wrapper(wrapper)
+        captured.extend((label, sql, params) for sql, params in sink if _EXPLAINABLE.match(sql))
+    return captured
+
+
+def full_scans(cursor, backend_name, sql, params):
+    """ Tables the plan for `sql` reads in full (no index). """
+    aliases = table_aliases(sql)
+    scanned = []
+    if backend_name == 'sqlite':
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        for row in cursor.fetchall():
+            detail = row[3]
+            match = re.match(r'SCAN (\w+)(.*)', detail)
+            if match and 'USING' not in match.group(2) and match.group(1) in aliases:
+                scanned.append(aliases[match.group(1)])
+    else:
+        cursor.execute("EXPLAIN " + sql, params)
+        columns = [col[0] for col in cursor.description]
+        for row in cursor.fetchall():
+            row = dict(zip(columns, row))
+            if row.get('type') == 'ALL' and row.get('table') in aliases:
+                scanned.append(aliases[row['table']])
+    return scanned
+
+def check_query_plans():
+    """ Returns a list of (label, table, sql) full scans not covered by ALLOWED_SCANS. """
+    statements = capture_statements()
+    backend_name = get_backend().name
+    problems = []
+    seen = set()
+    with pooled_connection() as conn:
+        if conn is None:
+            raise RuntimeError("No database connection for the query plan check.")
+        cursor = conn.cursor()
+        try:
+            for label, sql, params in statements:
+                if (label, sql) in seen:
+                    continue
+                seen.add((label, sql))
+                base_label = label.split('[')[0] # 'get_rooms_page[after]' shares get_rooms_page's entries
+                for table in full_scans(cursor, backend_name, sql, params):
+                    if {('*', table), (label, table), (base_label, table)} & ALLOWED_SCANS.keys():
+                        continue
+                    problems.append((label, table, sql))
+        finally:
+            cursor.close()
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if a shipped query does a full table scan.")
+    parser.add_argument('--sqlite', metavar='PATH', help="Check against this SQLite file (migrated automatically)")
+    args = parser.parse_args(argv)
+    if args.sqlite:
+        use_backend('sqlite', dict(config.SQLITE_CONFIG, database=args.sqlite))
+
+    try:
+        problems = check_query_plans()
+    except (Error, RuntimeError) as e:
+        print(f"Error checking query plans: {e}")
+        return 1
+    for label, table, sql in problems:
+        print(f"FULL SCAN of {table} in {label}:\n    {' '.join(sql.split())}")
+    if problems:
+        print(f"{len(problems)} statement(s) scan whole tables; add an index or an ALLOWED_SCANS entry.")
+        return 1
+    print(f"OK: no unexpected full table scans ({get_backend().name}).")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
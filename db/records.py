@@ -0,0 +1,150 @@
+# db/records.py
+"""
+Compact row types for the query functions that return many rows.
+
+A dictionary cursor turns every row into its own dict (hash table, key
+pointers and all); a Record is a __slots__ object holding just the values,
+roughly a third of the size. Records read like the dicts they replace:
+
+    guest['last_name'], guest.get('email', ''), dict(guest), guest.keys()
+
+as well as guest.last_name. They are meant to be read-only: there is no
+item assignment, and rows kept by the in-memory indexes are handed out
+without copying. Use replace() to derive a changed row, or dict(record)
+for a mutable copy.
+
+Build them from a plain (tuple) cursor whose select list matches the
+record's fields, in order:
+
+    cursor.execute("SELECT guest_id, first_name, last_name, email, phone FROM Guests")
+    guests = GuestSummary.from_rows(cursor.fetchall())
+
+or stream them with stream_records() when the result may be large.
+"""
+from .connection import pooled_connection, DatabaseError, Error
+
+STREAM_BATCH_SIZE = 500 # Rows per fetchmany() round trip when streaming
+
+
+class Record:
+    """ Base class: subclasses list their columns in __slots__. """
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A generated __init__ with plain attribute stores, like namedtuple and
+        # dataclasses do; a setattr() loop would dominate the cost of bulk reads
+        fields = cls.__slots__
+        body = "\n".join(f"    self.{name} = {name}" for name in fields) or "    pass"
+        namespace = {}
+        exec(f"def __init__(self, {', '.join(fields)}):\n{body}", namespace)
+        cls.__init__ = namespace['__init__']
+
+    @classmethod
+    def from_rows(cls, rows):
+        """ Records from value tuples in field order (e.g. a plain cursor's fetchall()). """
+        return [cls(*row) for row in rows]
+
+    @classmethod
+    def from_dict(cls, row):
+        """ A record from a mapping with (at least) the record's fields; missing ones are None. """
+        return cls(*(row.get(name) for name in cls.__slots__))
+
+    # --- Read access like a row dict ---
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def items(self):
+        return tuple((name, getattr(self, name)) for name in self.__slots__)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def asdict(self):
+        return dict(self.items())
+
+    def replace(self, **changes):
+        """ A copy with some fields changed. """
+        return type(self)(*(changes.pop(name, getattr(self, name)) for name in self.__slots__))
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return self.asdict() == other
+        return NotImplemented
+
+    __hash__ = None # Compares like a dict, so unhashable like one
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{name}={value!r}' for name, value in self.items())})"
+
+    def __reduce__(self):
+        return type(self), self.values()
+
+
+class GuestSummary(Record):
+    """ A Guests row as listed and searched (get_all_guests, get_guests_page, find_guest_by_name_db). """
+    __slots__ = ('guest_id', 'first_name', 'last_name', 'email', 'phone')
+
+class RoomDetails(Record):
+    """ A room with its type and today's status (get_all_rooms_with_details, get_rooms_page). """
+    __slots__ = ('room_id', 'room_number', 'type_name', 'base_price', 'floor_number', 'status')
+
+class AvailableRoom(Record):
+    """ A bookable room (get_available_rooms_for_booking, get_rooms_free_for_nights). """
+    __slots__ = ('room_id', 'room_number', 'type_name', 'base_price')
+
+
+def stream_records(record_type, query, params=(), batch_size=None):
+    """ Yields `record_type` records for `query` as they arrive, never holding the whole result.
+
+    Uses an unbuffered cursor (MySQL streams the result set from the
+    server) read with fetchmany(batch_size). A pooled connection is held
+    until the generator is exhausted or closed, so close it (or use
+    contextlib.closing) when stopping early. Database errors are printed
+    and re-raised to the consumer.
+    """
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    with pooled_connection() as conn:
+        if conn is None:
+            raise DatabaseError(msg="No database connection available.")
+        cursor = conn.cursor(buffered=False)
+        exhausted = False
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    exhausted = True
+                    break
+                for row in rows:
+                    yield record_type(*row)
+        except Error as e:
+            print(f"Error streaming {record_type.__name__} rows: {e}")
+            raise
+        finally:
+            if not exhausted and hasattr(conn, 'consume_results'):
+                try:
+                    conn.consume_results() # Stopped early: drain MySQL's unread result before reuse
+                except Error:
+                    pass
+            cursor.close()
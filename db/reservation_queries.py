@@ -1,143 +1,318 @@
 # db/reservation_queries.py
-from .connection import get_db_connection
-from mysql.connector import Error
+import random
+import threading
+import time
+
+from .connection import pooled_connection, get_backend, Error
+from .instrumentation import instrumented
+from .availability import note_reservation_added, note_reservation_status, note_room_maintenance, ACTIVE_STATUSES, _to_date
+from .room_queries import invalidate_dashboard_stats
+from .changes import record_change
+from .inventory import claim_nights, release_nights
 from datetime import date
+from config import RESERVATION_CONFIG
+
+# Status changes update_reservation_status_db allows: current status -> new statuses
+STATUS_TRANSITIONS = {
+    'confirmed': ('checked-in', 'cancelled'),
+    'checked-in': ('checked-out',),
+}
+
+_retry_lock = threading.Lock()
+_retry_stats = {'transactions': 0, 'retries': 0, 'gave_up': 0}
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+def _normalize_booking(booking):
+    """ Accepts a dict or a (guest_id, room_id, check_in, check_out[, adults, children, requests]) tuple. """
+    if isinstance(booking, dict):
+        fields = booking
+    else:
+        fields = dict(zip(('guest_id', 'room_id', 'check_in', 'check_out', 'adults', 'children', 'requests'), booking))
+    return {
+        'guest_id': fields['guest_id'],
+        'room_id': fields['room_id'],
+        'check_in': _to_date(fields['check_in']),
+        'check_out': _to_date(fields['check_out']),
+        'adults': fields.get('adults', 1),
+        'children': fields.get('children', 0),
+        'requests': fields.get('requests'),
+    }
+
+def _batch_conflicts(bookings, existing):
+    """ (index, reason) for bookings that overlap an existing stay or another booking in the batch. """
+    conflicts = []
+    taken = {} # room_id -> [(check_in, check_out)] of existing stays plus earlier bookings in the batch
+    for row in existing:
+        taken.setdefault(row['room_id'], []).append((_to_date(row['check_in_date']), _to_date(row['check_out_date'])))
+    for i, b in enumerate(bookings):
+        if b['check_out'] <= b['check_in']:
+            conflicts.append((i, "check-out must be after check-in"))
+            continue
+        stays = taken.setdefault(b['room_id'], [])
+        if any(ci < b['check_out'] and co > b['check_in'] for ci, co in stays): # Half-open overlap
+            conflicts.append((i, "room is not available for these dates"))
+            continue
+        stays.append((b['check_in'], b['check_out']))
+    return conflicts
+
+def _claim_and_insert(conn, cursor, bookings):
+    """ One attempt at booking `bookings` inside a fresh transaction.
+
+    Every booking path claims its rooms with SELECT ... FOR UPDATE before
+    checking for overlaps, so two terminals booking the same room are
+    serialized: the second one waits, then sees the first one's stay.
+    (SQLite has no row locks; start_transaction() takes the database write
+    lock instead.) Returns (reservation_ids, conflicts) without committing.
+    """
+    room_ids = sorted({b['room_id'] for b in bookings})
+    conn.start_transaction()
+    # Lock the rooms in id order, so concurrent batches can't deadlock each other
+    cursor.execute(f"SELECT room_id FROM Rooms WHERE room_id IN ({_placeholders(room_ids)}) ORDER BY room_id FOR UPDATE",
+                   tuple(room_ids))
+    known_rooms = {row['room_id'] for row in cursor.fetchall()}
+    conflicts = [(i, "unknown room") for i, b in enumerate(bookings) if b['room_id'] not in known_rooms]
+
+    # One query for every active stay that could collide with any booking in the batch
+    cursor.execute(f"""
+        SELECT room_id, check_in_date, check_out_date
+        FROM Reservations
+        WHERE room_id IN ({_placeholders(room_ids)})
+          AND status IN ({_placeholders(ACTIVE_STATUSES)})
+          AND check_in_date < %s AND check_out_date > %s
+    """, tuple(room_ids) + ACTIVE_STATUSES + (max(b['check_out'] for b in bookings),
+                                               min(b['check_in'] for b in bookings)))
+    conflicts += _batch_conflicts(bookings, cursor.fetchall())
+    if conflicts:
+        return [], sorted(set(conflicts))
+
+    insert = """
+        INSERT INTO Reservations
+        (guest_id, room_id, check_in_date, check_out_date, adults, children, special_requests, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, 'confirmed')
+    """
+    rows = [(b['guest_id'], b['room_id'], b['check_in'], b['check_out'], b['adults'], b['children'], b['requests'])
+            for b in bookings]
+    # One INSERT per stay so each id comes from its own lastrowid; executemany
+    # only reports one id, and the order of a multi-row id range is backend-specific
+    reservation_ids = []
+    for row in rows:
+        cursor.execute(insert, row)
+        reservation_ids.append(cursor.lastrowid)
+    claim_nights(cursor, [(reservation_id, b['room_id'], b['check_in'], b['check_out'])
+                          for reservation_id, b in zip(reservation_ids, bookings)]) # Same transaction as the inserts
+    return reservation_ids, []
+
+def _book(bookings):
+    """ Runs _claim_and_insert, retrying deadlocks and lock timeouts with jittered exponential backoff.
+
+    Returns (reservation_ids, conflicts) like add_reservations_bulk_db.
+    """
+    bookings = [_normalize_booking(b) for b in bookings]
+    if not bookings:
+        return [], []
+    max_retries = RESERVATION_CONFIG.get('deadlock_retries', 5)
+    backoff = RESERVATION_CONFIG.get('retry_backoff', 0.02)
+    reservation_ids = None
+    with pooled_connection() as conn:
+        if conn is None: return None, []
+        backend = get_backend()
+        for attempt in range(max_retries + 1):
+            cursor = conn.cursor(dictionary=True)
+            try:
+                reservation_ids, conflicts = _claim_and_insert(conn, cursor, bookings)
+                if conflicts:
+                    conn.rollback()
+                    return [], conflicts
+                conn.commit()
+                break
+            except Error as e:
+                conn.rollback()
+                if attempt < max_retries and backend.is_retryable(e):
+                    with _retry_lock:
+                        _retry_stats['retries'] += 1
+                    time.sleep(backoff * (2 ** attempt) * (0.5 + random.random())) # Jitter spreads the retries out
+                    continue
+                if backend.is_retryable(e):
+                    with _retry_lock:
+                        _retry_stats['gave_up'] += 1
+                print(f"Error adding reservation: {e}")
+                return None, []
+            finally:
+                cursor.close()
+
+        with _retry_lock:
+            _retry_stats['transactions'] += 1
+        for reservation_id, b in zip(reservation_ids, bookings):
+            note_reservation_added(reservation_id, b['room_id'], b['check_in'], b['check_out']) # Keep the availability index in sync
+        invalidate_dashboard_stats()
+        record_change(conn, 'Reservations', 'insert', reservation_ids)
+    return reservation_ids, []
 
+def get_booking_retry_stats():
+    """ Counters for the booking engine: committed transactions, deadlock/lock-timeout retries, give-ups. """
+    with _retry_lock:
+        return dict(_retry_stats)
+
+@instrumented
+def book_room_db(guest_id, room_id, check_in, check_out, adults=1, children=0, requests=None):
+    """ Books one room if it is still free, claiming it under a row lock.
+
+    Returns (reservation_id, None) on success, (None, reason) if the room is
+    no longer available, or (None, None) on a database error.
+    """
+    reservation_ids, conflicts = _book([(guest_id, room_id, check_in, check_out, adults, children, requests)])
+    if reservation_ids:
+        return reservation_ids[0], None
+    return None, (conflicts[0][1] if conflicts else None)
+
+@instrumented
 def add_reservation_db(guest_id, room_id, check_in, check_out, adults=1, children=0, requests=None):
-    """ Adds a new reservation. Returns reservation_id or None. """
-    conn = get_db_connection()
-    if conn is None: return None
-    reservation_id = None
-    try:
-        cursor = conn.cursor()
-        query = """
-            INSERT INTO Reservations
-            (guest_id, room_id, check_in_date, check_out_date, adults, children, special_requests, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'confirmed')
-        """
-        params = (guest_id, room_id, check_in, check_out, adults, children, requests)
-        cursor.execute(query, params)
-
-        # --- IMPORTANT: Update room availability ---
-        # This is a simplified approach. A robust system might use triggers
-        # or check dates more carefully. We assume check-in makes it unavailable.
-        # However, the room should ONLY become unavailable on check-in.
-        # This logic is better handled during the check-in process itself.
-        # Let's skip direct availability update here, rely on check-in/out logic.
-        # query_update_room = "UPDATE Rooms SET availability = FALSE WHERE room_id = %s"
-        # cursor.execute(query_update_room, (room_id,))
-        # ---
-
-        conn.commit()
-        reservation_id = cursor.lastrowid
-    except Error as e:
-        print(f"Error adding reservation: {e}")
-        conn.rollback()
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
+    """ Adds a new reservation. Returns reservation_id or None (also if the room is already taken). """
+    # Room availability (Rooms.availability) is still only changed on check-in/out
+    reservation_id, reason = book_room_db(guest_id, room_id, check_in, check_out, adults, children, requests)
+    if reason:
+        print(f"Reservation not added: {reason}")
     return reservation_id
 
+@instrumented
+def add_reservations_bulk_db(bookings):
+    """ Books several rooms in one transaction, all or nothing (group and tour bookings).
+
+    `bookings` is a list of dicts (or tuples in add_reservation_db's argument
+    order) with guest_id, room_id, check_in, check_out and optionally
+    adults, children, requests. Availability of the whole batch is checked
+    at once, under a lock on the rooms involved, before anything is written.
+
+    Returns (reservation_ids, conflicts): the new ids in input order and an
+    empty list on success; otherwise no ids and a list of (index, reason)
+    for the bookings that could not be made. A database error returns
+    (None, []).
+    """
+    return _book(bookings)
+
+@instrumented
 def update_reservation_status_db(reservation_id, new_status):
-    """ Updates the status of a reservation ('cancelled', 'checked-in', 'checked-out'). """
-    conn = get_db_connection()
-    if conn is None: return False
+    """ Updates the status of a reservation ('cancelled', 'checked-in', 'checked-out').
+
+    Only the changes in STATUS_TRANSITIONS are made (a confirmed stay can be
+    checked in or cancelled, a checked-in one checked out). Returns True on
+    success, False if the reservation is missing, the change is not allowed
+    or on a DB error.
+    """
     success = False
     room_id = None # To potentially update room status
-    try:
+    with pooled_connection() as conn:
+        if conn is None: return False
         cursor = conn.cursor(dictionary=True) # Use dictionary cursor to get room_id
+        try:
+            # Get room_id associated with reservation first
+            cursor.execute("SELECT room_id, check_in_date, check_out_date, status FROM Reservations WHERE reservation_id = %s",
+                           (reservation_id,))
+            res_data = cursor.fetchone()
+            if not res_data:
+                print(f"Error: Reservation ID {reservation_id} not found.")
+                return False
+            room_id = res_data['room_id']
+            if new_status not in STATUS_TRANSITIONS.get(res_data['status'], ()):
+                print(f"Error: Reservation ID {reservation_id} cannot go from '{res_data['status']}' to '{new_status}'.")
+                return False
+
+            # Update reservation status; the status test makes a concurrent change lose instead of chaining
+            query = "UPDATE Reservations SET status = %s WHERE reservation_id = %s AND status = %s"
+            cursor.execute(query, (new_status, reservation_id, res_data['status']))
+            updated = cursor.rowcount
+
+            # Keep the room-night inventory in step with the stay's status
+            if new_status not in ACTIVE_STATUSES:
+                release_nights(cursor, [reservation_id])
+            elif res_data['status'] not in ACTIVE_STATUSES: # Reactivated: claim its nights again
+                claim_nights(cursor, [(reservation_id, room_id, res_data['check_in_date'], res_data['check_out_date'])])
+
+            # Update room availability based on the new status
+            if new_status == 'checked-in':
+                # Mark room as unavailable (occupied)
+                query_room = "UPDATE Rooms SET availability = FALSE WHERE room_id = %s"
+                cursor.execute(query_room, (room_id,))
+            elif new_status in ['checked-out', 'cancelled']:
+                 # Mark room as available (simplistic, might need cleaning status)
+                 # More accurately, check-out should perhaps mark it 'Maintenance' or trigger cleaning workflow.
+                 # For now, just make it available if not cancelled/checked-out.
+                 query_room = "UPDATE Rooms SET availability = TRUE, maintenance_status = FALSE WHERE room_id = %s" # Reset maintenance too for simplicity
+                 if new_status == 'checked-out':
+                     query_room = "UPDATE Rooms SET availability = FALSE, maintenance_status = TRUE WHERE room_id = %s" # Mark for cleaning
+                 cursor.execute(query_room, (room_id,))
+
 
-        # Get room_id associated with reservation first
-        cursor.execute("SELECT room_id FROM Reservations WHERE reservation_id = %s", (reservation_id,))
-        res_data = cursor.fetchone()
-        if not res_data:
-            print(f"Error: Reservation ID {reservation_id} not found.")
-            return False
-        room_id = res_data['room_id']
-
-        # Update reservation status
-        query = "UPDATE Reservations SET status = %s WHERE reservation_id = %s"
-        cursor.execute(query, (new_status, reservation_id))
-
-        # Update room availability based on the new status
-        if new_status == 'checked-in':
-            # Mark room as unavailable (occupied)
-            query_room = "UPDATE Rooms SET availability = FALSE WHERE room_id = %s"
-            cursor.execute(query_room, (room_id,))
-        elif new_status in ['checked-out', 'cancelled']:
-             # Mark room as available (simplistic, might need cleaning status)
-             # More accurately, check-out should perhaps mark it 'Maintenance' or trigger cleaning workflow.
-             # For now, just make it available if not cancelled/checked-out.
-             query_room = "UPDATE Rooms SET availability = TRUE, maintenance_status = FALSE WHERE room_id = %s" # Reset maintenance too for simplicity
-             if new_status == 'checked-out':
-                 query_room = "UPDATE Rooms SET availability = FALSE, maintenance_status = TRUE WHERE room_id = %s" # Mark for cleaning
-             cursor.execute(query_room, (room_id,))
-
-
-        conn.commit()
-        success = cursor.rowcount > 0 # Check if reservation status update was successful
-    except Error as e:
-        print(f"Error updating reservation status: {e}")
-        conn.rollback()
-    finally:
-        if conn.is_connected():
+            conn.commit()
+            success = updated > 0 # Check if reservation status update was successful
+            if success:
+                # Keep the availability index in sync
+                note_reservation_status(reservation_id, new_status, room_id,
+                                        res_data['check_in_date'], res_data['check_out_date'])
+                if new_status in ['checked-out', 'cancelled']:
+                    note_room_maintenance(room_id, new_status == 'checked-out')
+                invalidate_dashboard_stats()
+                record_change(conn, 'Reservations', 'update', [reservation_id])
+                record_change(conn, 'Rooms', 'update', [room_id])
+        except Error as e:
+            print(f"Error updating reservation status: {e}")
+            conn.rollback()
+        finally:
             cursor.close()
-            conn.close()
     return success
 
 
+@instrumented
 def find_reservation_for_checkin_db(search_key):
     """ Finds a 'confirmed' reservation matching guest name or room number for today's check-in. """
-    conn = get_db_connection()
-    if conn is None: return None
     reservation = None
-    try:
+    with pooled_connection() as conn:
+        if conn is None: return None
         cursor = conn.cursor(dictionary=True)
-        today = date.today().isoformat()
-        query = """
-            SELECT res.reservation_id, res.room_id, r.room_number, g.guest_id, g.first_name, g.last_name
-            FROM Reservations res
-            JOIN Guests g ON res.guest_id = g.guest_id
-            JOIN Rooms r ON res.room_id = r.room_id
-            WHERE res.check_in_date = %s AND res.status = 'confirmed'
-              AND (r.room_number = %s OR g.first_name LIKE %s OR g.last_name LIKE %s)
-            LIMIT 1
-        """
-        search_pattern = f"%{search_key}%"
-        cursor.execute(query, (today, search_key, search_pattern, search_pattern))
-        reservation = cursor.fetchone()
-    except Error as e:
-        print(f"Error finding reservation for check-in: {e}")
-    finally:
-        if conn.is_connected():
+        try:
+            today = date.today().isoformat()
+            query = """
+                SELECT res.reservation_id, res.room_id, r.room_number, g.guest_id, g.first_name, g.last_name
+                FROM Reservations res
+                JOIN Guests g ON res.guest_id = g.guest_id
+                JOIN Rooms r ON res.room_id = r.room_id
+                WHERE res.check_in_date = %s AND res.status = 'confirmed'
+                  AND (r.room_number = %s OR g.first_name LIKE %s OR g.last_name LIKE %s)
+                LIMIT 1
+            """
+            search_pattern = f"%{search_key}%"
+            cursor.execute(query, (today, search_key, search_pattern, search_pattern))
+            reservation = cursor.fetchone()
+        except Error as e:
+            print(f"Error finding reservation for check-in: {e}")
+        finally:
             cursor.close()
-            conn.close()
     return reservation
 
+@instrumented
 def find_reservation_for_checkout_db(room_number):
     """ Finds a 'checked-in' reservation matching the room number. """
-    conn = get_db_connection()
-    if conn is None: return None
     reservation = None
-    try:
+    with pooled_connection() as conn:
+        if conn is None: return None
         cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT res.reservation_id, res.room_id, r.room_number, g.guest_id, g.first_name, g.last_name
-            FROM Reservations res
-            JOIN Guests g ON res.guest_id = g.guest_id
-            JOIN Rooms r ON res.room_id = r.room_id
-            WHERE r.room_number = %s AND res.status = 'checked-in'
-            LIMIT 1
-        """
-        cursor.execute(query, (room_number,))
-        reservation = cursor.fetchone()
-    except Error as e:
-        print(f"Error finding reservation for check-out: {e}")
-    finally:
-        if conn.is_connected():
+        try:
+            query = """
+                SELECT res.reservation_id, res.room_id, r.room_number, g.guest_id, g.first_name, g.last_name
+                FROM Reservations res
+                JOIN Guests g ON res.guest_id = g.guest_id
+                JOIN Rooms r ON res.room_id = r.room_id
+                WHERE r.room_number = %s AND res.status = 'checked-in'
+                LIMIT 1
+            """
+            cursor.execute(query, (room_number,))
+            reservation = cursor.fetchone()
+        except Error as e:
+            print(f"Error finding reservation for check-out: {e}")
+        finally:
             cursor.close()
-            conn.close()
     return reservation
 
-# Add get_all_reservations, etc. as needed
\ No newline at end of file
+# Add get_all_reservations, etc. as needed
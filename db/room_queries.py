@@ -1,122 +1,359 @@
 # db/room_queries.py
-from .connection import get_db_connection
-from mysql.connector import Error
+import threading
+import time
+from datetime import date, timedelta
 
+from .connection import pooled_connection, Error
+from .instrumentation import instrumented
+from .availability import get_availability_index, note_room_maintenance
+from .changes import record_change, subscribe, TABLES
+from .cache import get_cache
+from .records import RoomDetails, AvailableRoom, stream_records
+
+DASHBOARD_STATS_TTL = 15 # Seconds a dashboard stats result is reused
+
+# Rooms with type and today's status, computed in SQL (RoomDetails columns);
+# parameters: last night, tonight, then whatever {where} adds
+ROOM_DETAILS_SQL = """
+    SELECT
+        r.room_id, r.room_number, rt.type_name, rt.base_price,
+        r.floor_number,
+        CASE
+            WHEN r.maintenance_status = TRUE THEN 'Maintenance'
+            WHEN EXISTS (
+                SELECT 1 FROM RoomNights rn -- Last night or tonight, as in get_all_rooms_with_details
+                WHERE rn.room_id = r.room_id AND rn.night IN (%s, %s)
+            ) THEN 'Occupied'
+            ELSE 'Available'
+        END AS status
+    FROM Rooms r
+    JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
+    {where}
+    ORDER BY r.room_number
+"""
+
+def _status_nights():
+    today = date.today()
+    return (today - timedelta(days=1), today)
+
+def _load_room_types():
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT room_type_id, type_name, description, base_price, capacity FROM RoomTypes")
+            return {row['room_type_id']: row for row in cursor.fetchall()}
+        except Error as e:
+            print(f"Error fetching room types: {e}")
+            return None
+        finally:
+            cursor.close()
+
+def _load_rooms():
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT room_id, room_number, room_type_id, floor_number, maintenance_status
+                FROM Rooms
+                ORDER BY room_number
+            """)
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching rooms: {e}")
+            return None
+        finally:
+            cursor.close()
+
+@instrumented
+def get_room_types():
+    """ All room types as {room_type_id: row}, from the reference-data cache. None on DB error. """
+    return get_cache('room_types').get('all', _load_room_types)
+
+def _room_details():
+    """ Every room joined to its type, in room-number order, from the caches. None on DB error.
+
+    Each row has room_id, room_number, type_name, base_price, floor_number
+    and maintenance_status, and is a fresh dict the caller may modify.
+    """
+    rooms = get_cache('rooms').get('all', _load_rooms)
+    types = get_room_types()
+    if rooms is None or types is None:
+        return None
+    if any(room['room_type_id'] not in types for room in rooms):
+        get_cache('room_types').invalidate() # A type added since the types were cached
+        types = get_room_types() or {}
+    return [{'room_id': room['room_id'], 'room_number': room['room_number'],
+             'type_name': types[room['room_type_id']]['type_name'],
+             'base_price': types[room['room_type_id']]['base_price'],
+             'floor_number': room['floor_number'], 'maintenance_status': bool(room['maintenance_status'])}
+            for room in rooms if room['room_type_id'] in types]
+
+@instrumented
 def get_all_rooms_with_details():
-    """ Fetches room number, type name, status, price, floor. """
-    conn = get_db_connection()
-    if conn is None: return []
+    """ Fetches room number, type name, status, price, floor (RoomDetails records).
+
+    Rooms and room types come from the reference-data cache; only today's
+    occupancy is read from the database on every call.
+    """
     rooms = []
-    try:
-        cursor = conn.cursor(dictionary=True) # Return rows as dictionaries
-        query = """
-            SELECT
-                r.room_id, r.room_number, rt.type_name, rt.base_price,
-                r.floor_number,
-                CASE
-                    WHEN r.maintenance_status = TRUE THEN 'Maintenance'
-                    WHEN r.availability = TRUE THEN 'Available'
-                    ELSE 'Occupied' -- We'll update this based on Reservations later
-                END AS status
-            FROM Rooms r
-            JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
-            ORDER BY r.room_number
-        """
-        cursor.execute(query)
-        rooms = cursor.fetchall()
-
-        # --- Refine Status based on Reservations ---
-        # This is more complex and might be better done with a more advanced query
-        # or separate logic, but here's a basic idea:
-        query_reservations = """
-            SELECT room_id FROM Reservations
-            WHERE CURDATE() BETWEEN check_in_date AND check_out_date
-            AND status IN ('checked-in', 'confirmed')
-        """
-        cursor.execute(query_reservations)
-        occupied_rooms = {row['room_id'] for row in cursor.fetchall()}
-
-        for room in rooms:
-            if room['room_id'] in occupied_rooms and room['status'] != 'Maintenance':
-                room['status'] = 'Occupied'
-            elif room['status'] != 'Maintenance' and room['room_id'] not in occupied_rooms :
-                 room['status'] = 'Available' # Ensure it's available if not maint/occupied
-
-    except Error as e:
-        print(f"Error fetching rooms: {e}")
-    finally:
-        if conn.is_connected():
+    details = _room_details()
+    if details is None: return rooms
+    with pooled_connection() as conn:
+        if conn is None: return rooms
+        cursor = conn.cursor()
+        try:
+            # --- Status from the room-night inventory ---
+            # A stay occupies its room from check-in day through check-out day, i.e. the
+            # room is occupied today if it holds last night or tonight (see db/inventory.py)
+            query_reservations = """
+                SELECT DISTINCT room_id FROM RoomNights
+                WHERE night IN (%s, %s)
+            """
+            today = date.today()
+            cursor.execute(query_reservations, (today - timedelta(days=1), today))
+            occupied_rooms = {row[0] for row in cursor.fetchall()}
+        except Error as e:
+            print(f"Error fetching rooms: {e}")
+            return rooms
+        finally:
+            cursor.close()
+
+    for room in details:
+        if room['maintenance_status']:
+            status = 'Maintenance'
+        elif room['room_id'] in occupied_rooms:
+            status = 'Occupied'
+        else:
+            status = 'Available'
+        rooms.append(RoomDetails(room['room_id'], room['room_number'], room['type_name'], room['base_price'],
+                                 room['floor_number'], status))
+    return rooms
+
+def iter_all_rooms_with_details(batch_size=None):
+    """ Streams the rows of get_all_rooms_with_details (RoomDetails records) in room-number order.
+
+    Reads the database directly rather than the room cache: rows are
+    fetched `batch_size` at a time from an unbuffered cursor, with the
+    status computed in SQL as in get_rooms_page. Holds a pooled connection
+    until exhausted or closed; raises on DB error (see
+    db.records.stream_records).
+    """
+    return stream_records(RoomDetails, ROOM_DETAILS_SQL.format(where=""), _status_nights(), batch_size)
+
+@instrumented
+def get_rooms_page(after_room_number=None, limit=100):
+    """ Returns up to `limit` rooms (RoomDetails, as get_all_rooms_with_details) after a room number.
+
+    Keyset pagination by room_number; pass None for the first page.
+    """
+    rooms = []
+    with pooled_connection() as conn:
+        if conn is None: return rooms
+        cursor = conn.cursor()
+        try:
+            query = ROOM_DETAILS_SQL + " LIMIT %s"
+            nights = _status_nights()
+            if after_room_number is None:
+                cursor.execute(query.format(where=""), nights + (limit,))
+            else:
+                cursor.execute(query.format(where="WHERE r.room_number > %s"), nights + (after_room_number, limit))
+            rooms = RoomDetails.from_rows(cursor.fetchall())
+        except Error as e:
+            print(f"Error fetching room page: {e}")
+        finally:
             cursor.close()
-            conn.close()
     return rooms
 
+@instrumented
+def get_room_key_at(offset):
+    """ Returns the room_number of the room at `offset` in room-number order, or None. """
+    room_number = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT room_number FROM Rooms ORDER BY room_number LIMIT 1 OFFSET %s", (offset,))
+            row = cursor.fetchone()
+            room_number = row[0] if row else None
+        except Error as e:
+            print(f"Error fetching room key: {e}")
+        finally:
+            cursor.close()
+    return room_number
+
+@instrumented
+def count_rooms():
+    """ Returns the number of rooms, or None on error. """
+    total = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM Rooms")
+            total = cursor.fetchone()[0]
+        except Error as e:
+            print(f"Error counting rooms: {e}")
+        finally:
+            cursor.close()
+    return total
+
+@instrumented
 def update_room_status_db(room_id, availability=None, maintenance=None):
     """ Updates room availability or maintenance status in DB. """
     if availability is None and maintenance is None:
         return False # Nothing to update
 
-    conn = get_db_connection()
-    if conn is None: return False
     success = False
-    try:
+    with pooled_connection() as conn:
+        if conn is None: return False
         cursor = conn.cursor()
-        updates = []
-        params = []
-        if availability is not None:
-            updates.append("availability = %s")
-            params.append(bool(availability))
-        if maintenance is not None:
-            updates.append("maintenance_status = %s")
-            params.append(bool(maintenance))
-
-        query = f"UPDATE Rooms SET {', '.join(updates)} WHERE room_id = %s"
-        params.append(room_id)
-
-        cursor.execute(query, tuple(params))
-        conn.commit()
-        success = cursor.rowcount > 0 # Check if any row was updated
-    except Error as e:
-        print(f"Error updating room status: {e}")
-        conn.rollback()
-    finally:
-        if conn.is_connected():
+        try:
+            updates = []
+            params = []
+            if availability is not None:
+                updates.append("availability = %s")
+                params.append(bool(availability))
+            if maintenance is not None:
+                updates.append("maintenance_status = %s")
+                params.append(bool(maintenance))
+
+            query = f"UPDATE Rooms SET {', '.join(updates)} WHERE room_id = %s"
+            params.append(room_id)
+
+            cursor.execute(query, tuple(params))
+            conn.commit()
+            success = cursor.rowcount > 0 # Check if any row was updated
+            if success:
+                note_room_maintenance(room_id, maintenance) # Keep the availability index in sync
+                invalidate_dashboard_stats()
+                get_cache('rooms').invalidate()
+                record_change(conn, 'Rooms', 'update', [room_id])
+        except Error as e:
+            print(f"Error updating room status: {e}")
+            conn.rollback()
+        finally:
             cursor.close()
-            conn.close()
     return success
 
+@instrumented
 def get_available_rooms_for_booking(check_in, check_out):
-     """ Finds rooms available between given dates. """
-     conn = get_db_connection()
-     if conn is None: return []
+     """ Finds rooms available for the stay [check_in, check_out), as AvailableRoom records.
+
+     Answered from the in-memory availability index; falls back to SQL if
+     the index cannot be loaded.
+     """
+     index = get_availability_index()
+     if index is not None:
+         return index.free_rooms(check_in, check_out)
+     return _get_available_rooms_sql(check_in, check_out)
+
+@instrumented
+def get_available_rooms_for_ranges(date_ranges):
+     """ Finds available rooms for several candidate (check_in, check_out) windows in one call.
+
+     Returns a dict mapping each (check_in, check_out) pair to its room list.
+     """
+     index = get_availability_index()
+     if index is not None:
+         return index.free_rooms_multi(date_ranges)
+     return {(check_in, check_out): _get_available_rooms_sql(check_in, check_out)
+             for check_in, check_out in date_ranges}
+
+@instrumented
+def _get_available_rooms_sql(check_in, check_out):
+     """ SQL version of the availability lookup, used when the index is unavailable.
+
+     Rooms and types come from the reference-data cache; the database is
+     only asked which rooms have a booked night in the window.
+     """
      available_rooms = []
-     try:
-         cursor = conn.cursor(dictionary=True)
-         # Find rooms that DO NOT have an overlapping reservation
-         query = """
-            SELECT r.room_id, r.room_number, rt.type_name, rt.base_price
-            FROM Rooms r
-            JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
-            WHERE r.maintenance_status = FALSE AND r.room_id NOT IN (
-                SELECT res.room_id
-                FROM Reservations res
-                WHERE res.status IN ('confirmed', 'checked-in')
-                  AND (
-                    (res.check_in_date <= %s AND res.check_out_date > %s) -- Overlaps start
-                    OR (res.check_in_date < %s AND res.check_out_date >= %s) -- Overlaps end
-                    OR (res.check_in_date >= %s AND res.check_out_date <= %s) -- Fully contained
-                  )
-            )
-            ORDER BY r.room_number;
-         """
-         # Parameters: check_out, check_in, check_out, check_in, check_in, check_out
-         cursor.execute(query, (check_out, check_in, check_out, check_in, check_in, check_out))
-         available_rooms = cursor.fetchall()
-     except Error as e:
-         print(f"Error fetching available rooms: {e}")
-     finally:
-         if conn.is_connected():
-            cursor.close()
-            conn.close()
+     details = _room_details()
+     if details is None: return available_rooms
+     with pooled_connection() as conn:
+         if conn is None: return available_rooms
+         cursor = conn.cursor()
+         try:
+             # Stays are half-open: a guest leaving on check_in day does not block the room.
+             query = """
+                SELECT DISTINCT room_id FROM RoomNights -- Booked nights in [check_in, check_out), an index range scan
+                WHERE night >= %s AND night < %s
+             """
+             cursor.execute(query, (check_in, check_out))
+             booked = {row[0] for row in cursor.fetchall()}
+         except Error as e:
+             print(f"Error fetching available rooms: {e}")
+             return available_rooms
+         finally:
+             cursor.close()
+     for room in details:
+         if not room['maintenance_status'] and room['room_id'] not in booked:
+             available_rooms.append(AvailableRoom(room['room_id'], room['room_number'], room['type_name'], room['base_price']))
      return available_rooms
 
-# Add functions for RoomTypes if needed (e.g., get_all_room_types)
\ No newline at end of file
+_stats_cache = {'value': None, 'expires': 0.0}
+_stats_lock = threading.Lock()
+
+@instrumented
+def get_dashboard_stats(max_age=DASHBOARD_STATS_TTL):
+    """ Returns occupancy counts and today's front-desk numbers in one round trip.
+
+    Keys: total_rooms, available, occupied, maintenance, arrivals_today,
+    departures_today, rooms_to_clean. Results are cached for `max_age`
+    seconds (pass 0 to force a fresh read). Returns None on DB error.
+    """
+    now = time.monotonic()
+    with _stats_lock:
+        if _stats_cache['value'] is not None and now < _stats_cache['expires']:
+            return dict(_stats_cache['value'])
+
+    stats = None
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            # Room status follows get_all_rooms_with_details: maintenance wins,
+            # then any active stay covering today means occupied.
+            query = """
+                SELECT
+                    COUNT(*) AS total_rooms,
+                    COALESCE(SUM(CASE WHEN r.maintenance_status = FALSE AND occ.room_id IS NULL THEN 1 ELSE 0 END), 0) AS available,
+                    COALESCE(SUM(CASE WHEN r.maintenance_status = FALSE AND occ.room_id IS NOT NULL THEN 1 ELSE 0 END), 0) AS occupied,
+                    COALESCE(SUM(CASE WHEN r.maintenance_status = TRUE THEN 1 ELSE 0 END), 0) AS maintenance,
+                    (SELECT COUNT(*) FROM Reservations
+                     WHERE check_in_date = %s AND status = 'confirmed') AS arrivals_today,
+                    (SELECT COUNT(*) FROM Reservations
+                     WHERE check_out_date = %s AND status = 'checked-in') AS departures_today,
+                    COALESCE(SUM(CASE WHEN r.maintenance_status = TRUE AND EXISTS (
+                        SELECT 1 FROM Reservations x
+                        WHERE x.room_id = r.room_id AND x.status = 'checked-out' AND x.check_out_date >= %s
+                    ) THEN 1 ELSE 0 END), 0) AS rooms_to_clean -- Vacated today, awaiting housekeeping
+                FROM Rooms r
+                LEFT JOIN (
+                    SELECT DISTINCT room_id FROM RoomNights
+                    WHERE night IN (%s, %s) -- Last night or tonight
+                ) occ ON occ.room_id = r.room_id
+            """
+            today = date.today()
+            cursor.execute(query, (today, today, today, today - timedelta(days=1), today))
+            row = cursor.fetchone()
+            stats = {key: int(value or 0) for key, value in row.items()}
+        except Error as e:
+            print(f"Error fetching dashboard stats: {e}")
+        finally:
+            cursor.close()
+
+    if stats is not None and max_age > 0:
+        with _stats_lock:
+            _stats_cache['value'] = dict(stats)
+            _stats_cache['expires'] = time.monotonic() + max_age
+    return stats
+
+def invalidate_dashboard_stats(*change):
+    """ Drops the cached dashboard stats (called by write functions and on remote changes). """
+    with _stats_lock:
+        _stats_cache['value'] = None
+
+for _table in TABLES:
+    subscribe(_table, invalidate_dashboard_stats)
@@ -0,0 +1,449 @@
+# db/transfer.py
+"""
+Streaming bulk import and export of guests and reservations.
+
+Files are CSV (header row with the column names below) or JSON Lines,
+picked by extension. Imports read the file row by row, validate each row
+and insert them in batches of TRANSFER_CONFIG['batch_size'], one
+transaction per batch. A row the database rejects only fails itself: the
+batch is replayed row by row under savepoints and the offender goes to
+the error file.
+
+    python -m db.transfer import guests guests.csv
+    python -m db.transfer import reservations stays.jsonl --batch-size 5000
+    python -m db.transfer export guests guests_backup.csv
+
+After every committed batch the position is saved to <file>.checkpoint,
+so an interrupted import picks up where it stopped (--restart ignores
+the checkpoint). Rejected rows are appended to <file>.errors.jsonl with
+their line number and reason.
+
+Exports stream through an unbuffered cursor with fetchmany(), so memory
+stays flat however big the table is, and produce files the importer reads
+back unchanged (ids included).
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import date
+
+from .connection import pooled_connection, get_backend_settings, Error
+from .availability import invalidate_availability_index, ACTIVE_STATUSES, _to_date
+from .guest_search import invalidate_guest_search_index
+from .room_queries import invalidate_dashboard_stats
+from .changes import record_change
+from .inventory import claim_nights
+from config import TRANSFER_CONFIG
+
+GUEST_COLUMNS = ('guest_id', 'first_name', 'last_name', 'email', 'phone', 'address', 'city', 'country',
+                 'passport_number', 'date_of_birth')
+RESERVATION_COLUMNS = ('reservation_id', 'guest_id', 'room_id', 'check_in_date', 'check_out_date',
+                       'adults', 'children', 'special_requests', 'status')
+RESERVATION_STATUSES = ('confirmed', 'checked-in', 'checked-out', 'cancelled')
+
+# Longest value each VARCHAR column of Guests takes (see db/migrations.py)
+GUEST_LENGTHS = {'first_name': 50, 'last_name': 50, 'email': 100, 'phone': 20, 'address': 255,
+                 'city': 50, 'country': 50, 'passport_number': 50}
+
+
+# --- Reading and writing files ---
+
+def _is_jsonl(path):
+    return path.lower().endswith(('.jsonl', '.ndjson', '.json'))
+
+def read_rows(path, skip=0):
+    """ Yields (line_number, row dict) from a CSV or JSON Lines file, skipping the first `skip` rows.
+
+    Empty strings become None.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if _is_jsonl(path):
+            rows = ((line_number, json.loads(line)) for line_number, line in enumerate(f, start=1) if line.strip())
+        else:
+            reader = csv.DictReader(f)
+            rows = ((reader.line_num, row) for row in reader)
+        for n, (line_number, row) in enumerate(rows):
+            if n < skip:
+                continue
+            yield line_number, {key: (None if value == '' else value) for key, value in row.items()}
+
+class RowWriter:
+    """ Writes dict rows to a CSV or JSON Lines file. """
+    def __init__(self, path, columns, append=False):
+        self.columns = columns
+        self._jsonl = _is_jsonl(path)
+        self._file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        if not self._jsonl:
+            self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction='ignore')
+            if not append or self._file.tell() == 0:
+                self._writer.writeheader()
+
+    def write(self, row):
+        if self._jsonl:
+            self._file.write(json.dumps(row, default=str) + '\n')
+        else:
+            self._writer.writerow(row)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# --- Validation: row dict -> insert parameters, or ValueError ---
+
+def _text(row, column, required=False):
+    value = row.get(column)
+    value = str(value).strip() if value is not None else None
+    if not value:
+        if required:
+            raise ValueError(f"{column} is required")
+        return None
+    limit = GUEST_LENGTHS.get(column)
+    if limit and len(value) > limit:
+        raise ValueError(f"{column} is longer than {limit} characters")
+    return value
+
+def _int(row, column, default=None, required=False):
+    value = row.get(column)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f"{column} is required")
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{column} is not a whole number: {value!r}")
+
+def _date(row, column, required=False):
+    value = row.get(column)
+    if value is None:
+        if required:
+            raise ValueError(f"{column} is required")
+        return None
+    try:
+        return _to_date(value)
+    except ValueError:
+        raise ValueError(f"{column} is not a YYYY-MM-DD date: {value!r}")
+
+def validate_guest(row):
+    """ Insert parameters for a guest row, in GUEST_COLUMNS order. """
+    return (
+        _int(row, 'guest_id'),
+        _text(row, 'first_name', required=True),
+        _text(row, 'last_name', required=True),
+        _text(row, 'email'), _text(row, 'phone'), _text(row, 'address'),
+        _text(row, 'city'), _text(row, 'country'), _text(row, 'passport_number'),
+        _date(row, 'date_of_birth'),
+    )
+
+def validate_reservation(row, room_ids):
+    """ Insert parameters for a reservation row, in RESERVATION_COLUMNS order.
+
+    The room may be given as room_id or room_number; `room_ids` maps room
+    numbers to ids.
+    """
+    room_id = _int(row, 'room_id')
+    if room_id is None:
+        room_number = row.get('room_number')
+        if room_number is None:
+            raise ValueError("room_id or room_number is required")
+        room_id = room_ids.get(str(room_number).strip())
+        if room_id is None:
+            raise ValueError(f"unknown room number {room_number!r}")
+    check_in = _date(row, 'check_in_date', required=True)
+    check_out = _date(row, 'check_out_date', required=True)
+    if check_out <= check_in:
+        raise ValueError("check_out_date must be after check_in_date")
+    status = (row.get('status') or 'confirmed').strip().lower()
+    if status not in RESERVATION_STATUSES:
+        raise ValueError(f"unknown status {status!r}")
+    adults, children = _int(row, 'adults', 1), _int(row, 'children', 0)
+    if adults < 1 or children < 0:
+        raise ValueError("adults must be at least 1 and children not negative")
+    return (_int(row, 'reservation_id'), _int(row, 'guest_id', required=True), room_id, check_in, check_out,
+            adults, children, row.get('special_requests'), status)
+
+
+# --- Inserting ---
+
+def _insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+def _insert_guests(cursor, rows):
+    # Rows that bring their own id keep it (round trips through export), the rest get a new one
+    with_id = [row for row in rows if row[0] is not None]
+    without_id = [row[1:] for row in rows if row[0] is None]
+    if with_id:
+        cursor.executemany(_insert_sql('Guests', GUEST_COLUMNS), with_id)
+    if without_id:
+        cursor.executemany(_insert_sql('Guests', GUEST_COLUMNS[1:]), without_id)
+
+def _insert_reservations(cursor, rows):
+    """ Inserts reservation rows and claims the nights of the active ones (same transaction). """
+    stays = []
+    with_id = [row for row in rows if row[0] is not None]
+    if with_id:
+        cursor.executemany(_insert_sql('Reservations', RESERVATION_COLUMNS), with_id)
+        stays += [(row[0], row[2], row[3], row[4]) for row in with_id if row[8] in ACTIVE_STATUSES]
+    # History (checked-out, cancelled) needs no ids back and goes in one executemany; active
+    # stays are inserted one by one for their lastrowid, which claim_nights needs
+    history = [row[1:] for row in rows if row[0] is None and row[8] not in ACTIVE_STATUSES]
+    if history:
+        cursor.executemany(_insert_sql('Reservations', RESERVATION_COLUMNS[1:]), history)
+    for row in rows:
+        if row[0] is None and row[8] in ACTIVE_STATUSES:
+            cursor.execute(_insert_sql('Reservations', RESERVATION_COLUMNS[1:]), row[1:])
+            stays.append((cursor.lastrowid, row[2], row[3], row[4]))
+    claim_nights(cursor, stays)
+
+def _write_batch(conn, insert, batch):
+    """ Inserts a batch of (line_number, row, params) in one transaction.
+
+    If the database rejects the batch it is replayed row by row, each
+    under a savepoint, so only the offending rows are lost. Returns
+    (inserted, [(line_number, row, reason)]).
+    """
+    cursor = conn.cursor()
+    try:
+        try:
+            conn.start_transaction()
+            insert(cursor, [params for _, _, params in batch])
+            conn.commit()
+            return len(batch), []
+        except Error:
+            conn.rollback()
+
+        failures = []
+        conn.start_transaction()
+        for line_number, row, params in batch:
+            cursor.execute("SAVEPOINT import_row")
+            try:
+                insert(cursor, [params])
+                cursor.execute("RELEASE SAVEPOINT import_row")
+            except Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT import_row")
+                failures.append((line_number, row, str(e)))
+        conn.commit()
+        return len(batch) - len(failures), failures
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# --- Checkpoints ---
+
+def checkpoint_path(path):
+    return path + '.checkpoint'
+
+def error_path(path):
+    return path + '.errors.jsonl'
+
+def _load_checkpoint(path, kind):
+    """ Saved progress for importing `path`, or a fresh one if there is none. """
+    fresh = {'kind': kind, 'source_size': os.path.getsize(path), 'rows_done': 0, 'imported': 0, 'rejected': 0}
+    try:
+        with open(checkpoint_path(path)) as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return fresh
+    if saved.get('kind') != kind or saved.get('source_size') != fresh['source_size']:
+        raise ValueError(f"{checkpoint_path(path)} belongs to a different import; use restart=True to start over")
+    return saved
+
+def _save_checkpoint(path, checkpoint):
+    # Write-then-rename, so a crash mid-write never leaves a truncated checkpoint
+    tmp = checkpoint_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, checkpoint_path(path))
+
+
+# --- Import ---
+
+def _room_ids_by_number(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT room_number, room_id FROM Rooms")
+        room_ids = {str(number): room_id for number, room_id in cursor.fetchall()}
+        conn.commit() # End the read's implicit transaction so the batches can start their own
+        return room_ids
+    finally:
+        cursor.close()
+
+def import_file(kind, path, batch_size=None, restart=False, progress=None):
+    """ Imports 'guests' or 'reservations' from a CSV/JSONL file.
+
+    Resumes from the file's checkpoint unless `restart`. progress(stats) is
+    called after every batch with the checkpoint counters plus run_rows and
+    seconds for this run. Returns stats: rows_done (source rows
+    consumed), imported, rejected, seconds, errors (the error file, or None
+    if no row was rejected). Returns None if the database is unreachable
+    or fails mid-import; the checkpoint then points after the last
+    committed batch.
+    """
+    if kind not in ('guests', 'reservations'):
+        raise ValueError(f"Unknown import kind {kind!r} (expected 'guests' or 'reservations')")
+    batch_size = batch_size or TRANSFER_CONFIG.get('batch_size', 1000)
+    if restart:
+        for leftover in (checkpoint_path(path), error_path(path)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    checkpoint = _load_checkpoint(path, kind)
+    started = time.perf_counter()
+    errors = None
+    consumed = 0 # Source rows handled by this run (the checkpoint also counts earlier runs)
+
+    with pooled_connection() as conn:
+        if conn is None: return None
+        try:
+            if kind == 'guests':
+                validate, insert = validate_guest, _insert_guests
+            else:
+                room_ids = _room_ids_by_number(conn)
+                validate, insert = (lambda row: validate_reservation(row, room_ids)), _insert_reservations
+
+            def flush(batch, rows_read, rejected):
+                nonlocal errors, consumed
+                inserted, failures = _write_batch(conn, insert, batch) if batch else (0, [])
+                rejected = rejected + failures
+                if rejected:
+                    if errors is None:
+                        errors = RowWriter(error_path(path), ('line', 'error', 'row'), append=True)
+                    for line_number, row, reason in rejected:
+                        errors.write({'line': line_number, 'error': reason, 'row': row})
+                    errors.flush()
+                checkpoint['rows_done'] += rows_read
+                consumed += rows_read
+                checkpoint['imported'] += inserted
+                checkpoint['rejected'] += len(rejected)
+                _save_checkpoint(path, checkpoint)
+                if progress:
+                    progress(dict(checkpoint, run_rows=consumed, seconds=time.perf_counter() - started))
+
+            batch, rejected, rows_read = [], [], 0
+            for line_number, row in read_rows(path, skip=checkpoint['rows_done']):
+                rows_read += 1
+                try:
+                    batch.append((line_number, row, validate(row)))
+                except ValueError as e:
+                    rejected.append((line_number, row, str(e)))
+                if len(batch) >= batch_size:
+                    flush(batch, rows_read, rejected)
+                    batch, rejected, rows_read = [], [], 0
+            if rows_read:
+                flush(batch, rows_read, rejected)
+        except Error as e:
+            print(f"Error importing {kind}: {e}")
+            return None
+        finally:
+            if errors is not None:
+                errors.close()
+            # The caches know nothing about rows written behind their back
+            if kind == 'guests':
+                invalidate_guest_search_index()
+            else:
+                invalidate_availability_index()
+            invalidate_dashboard_stats()
+
+        record_change(conn, 'Guests' if kind == 'guests' else 'Reservations', 'insert') # No ids: terminals reload
+    return {
+        'rows_done': checkpoint['rows_done'],
+        'imported': checkpoint['imported'],
+        'rejected': checkpoint['rejected'],
+        'seconds': round(time.perf_counter() - started, 3),
+        'errors': error_path(path) if checkpoint['rejected'] else None,
+    }
+
+
+# --- Export ---
+
+EXPORTS = {
+    'guests': (GUEST_COLUMNS, f"SELECT {', '.join(GUEST_COLUMNS)} FROM Guests ORDER BY guest_id"),
+    'reservations': (RESERVATION_COLUMNS,
+                     f"SELECT {', '.join(RESERVATION_COLUMNS)} FROM Reservations ORDER BY reservation_id"),
+}
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+def export_file(kind, path, batch_size=None, progress=None):
+    """ Writes every guest or reservation to a CSV/JSONL file. Returns rows written, or None on error.
+
+    Rows are pulled through an unbuffered cursor `batch_size` at a time
+    (TRANSFER_CONFIG['export_batch_size'] by default), so the result set
+    is never held in memory. progress(rows_written) is called per batch.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export kind {kind!r} (expected one of {', '.join(EXPORTS)})")
+    columns, query = EXPORTS[kind]
+    batch_size = batch_size or TRANSFER_CONFIG.get('export_batch_size', 5000)
+    written = 0
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor(buffered=False) # MySQL streams the result instead of reading it all first
+        writer = RowWriter(path, columns)
+        try:
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    writer.write({column: _plain(value) for column, value in zip(columns, row)})
+                written += len(rows)
+                if progress:
+                    progress(written)
+        except Error as e:
+            print(f"Error exporting {kind}: {e}")
+            return None
+        finally:
+            writer.close()
+            cursor.close()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export of guests and reservations (CSV or JSONL).")
+    parser.add_argument('direction', choices=('import', 'export'))
+    parser.add_argument('kind', choices=('guests', 'reservations'))
+    parser.add_argument('path', help="File to read or write (.csv, .jsonl)")
+    parser.add_argument('--batch-size', type=int, help="Rows per transaction (import) or fetch (export)")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and start over")
+    parser.add_argument('--sqlite', help="Use this SQLite file instead of the configured database")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        import config
+        from .connection import use_backend
+        use_backend('sqlite', dict(config.SQLITE_CONFIG, database=args.sqlite))
+    print(f"{args.direction.capitalize()}ing {args.kind} ({get_backend_settings()[0]} database)...")
+
+    if args.direction == 'export':
+        written = export_file(args.kind, args.path, args.batch_size,
+                              progress=lambda n: print(f"  {n} rows", end='\r'))
+        if written is None:
+            return 1
+        print(f"\n{written} {args.kind} written to {args.path}")
+        return 0
+
+    def report(stats):
+        rate = stats['run_rows'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"  {stats['imported']} imported, {stats['rejected']} rejected ({rate:.0f} rows/s)", end='\r')
+
+    stats = import_file(args.kind, args.path, args.batch_size, args.restart, progress=report)
+    if stats is None:
+        print(f"\nImport stopped; run the same command again to resume from {checkpoint_path(args.path)}")
+        return 1
+    print(f"\n{stats['imported']} imported, {stats['rejected']} rejected in {stats['seconds']:.1f}s")
+    if stats['errors']:
+        print(f"Rejected rows: {stats['errors']}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,9 +5,10 @@ from tkcalendar import DateEntry # Use the calendar widget
 from datetime import date, timedelta, datetime
 
 # Use relative imports for DB functions
-from ..db.guest_queries import find_guest_by_name_db, get_guest_by_id_db, add_guest_db
+from ..db.guest_queries import get_guest_by_id_db, add_guest_db
 from ..db.room_queries import get_available_rooms_for_booking
-from ..db.reservation_queries import add_reservation_db
+from ..db.reservation_queries import book_room_db, add_reservations_bulk_db
+from .type_ahead import GuestTypeAhead
 
 class BookingFrame(ttk.Frame):
     """Frame for creating a new booking."""
@@ -15,7 +16,9 @@ class BookingFrame(ttk.Frame):
         super().__init__(parent)
         self.controller = controller
         self.selected_guest_id = None
+        self.selected_guest_name = None # Filled in once the selected guest's details have loaded
         self.available_rooms_cache = [] # Cache for available rooms list
+        self._select_guest_id = None # Guest to pick once the next search results arrive
 
         # --- Main Layout ---
         self.grid_columnconfigure(0, weight=1)
@@ -39,7 +42,11 @@ class BookingFrame(ttk.Frame):
         self.guest_search_var = tk.StringVar()
         self.guest_search_entry = ttk.Entry(guest_lf, textvariable=self.guest_search_var, width=25)
         self.guest_search_entry.grid(row=0, column=1, sticky='ew', pady=2, padx=5)
-        self.guest_search_entry.bind("<KeyRelease>", self.search_guests_for_booking) # Search as user types
+        # Search as the user types: debounced, refined locally while the term grows
+        self.guest_type_ahead = GuestTypeAhead(self, controller.db_worker, key="booking-guest-search",
+                                               on_results=self._show_guest_results)
+        self.guest_search_entry.bind("<KeyRelease>", self.search_guests_for_booking)
+        self.guest_search_entry.bind("<Return>", lambda event: self.guest_type_ahead.search_now(self.guest_search_var.get()))
 
         self.guest_combobox = ttk.Combobox(guest_lf, state="readonly", width=35)
         self.guest_combobox.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(5, 10), padx=5)
@@ -105,14 +112,25 @@ class BookingFrame(ttk.Frame):
         # --- Right Column: Available Rooms ---
         right_frame = ttk.LabelFrame(self, text="Select Available Room", padding=10)
         right_frame.grid(row=1, column=1, rowspan=3, sticky='nsew', padx=(5, 10), pady=(0, 10)) # Extend across rows
-        right_frame.grid_rowconfigure(0, weight=1) # Allow listbox to expand
+        right_frame.grid_rowconfigure(1, weight=1) # Allow listbox to expand
         right_frame.grid_columnconfigure(0, weight=1)
 
+        # Group mode: several rooms can be selected and are booked together in one transaction
+        self.group_mode_var = tk.BooleanVar(value=False)
+        group_check = ttk.Checkbutton(right_frame, text="Group booking (select several rooms)",
+                                      variable=self.group_mode_var, command=self.toggle_group_mode)
+        group_check.grid(row=0, column=0, columnspan=2, sticky='w')
+
         self.rooms_listbox = tk.Listbox(right_frame, height=15, exportselection=False)
-        self.rooms_listbox.grid(row=0, column=0, sticky='nsew', pady=5)
+        self.rooms_listbox.grid(row=1, column=0, sticky='nsew', pady=5)
         rooms_scrollbar = ttk.Scrollbar(right_frame, orient=tk.VERTICAL, command=self.rooms_listbox.yview)
-        rooms_scrollbar.grid(row=0, column=1, sticky='ns', pady=5)
+        rooms_scrollbar.grid(row=1, column=1, sticky='ns', pady=5)
         self.rooms_listbox.config(yscrollcommand=rooms_scrollbar.set)
+        self.rooms_listbox.bind("<<ListboxSelect>>", self.update_selection_summary)
+
+        self.selection_summary_var = tk.StringVar(value="")
+        ttk.Label(right_frame, textvariable=self.selection_summary_var, font=('Helvetica', 9, 'italic')).grid(
+            row=2, column=0, columnspan=2, sticky='w')
 
 
         # --- Bottom Row: Create Booking Button ---
@@ -122,6 +140,22 @@ class BookingFrame(ttk.Frame):
         submit_button.pack()
 
 
+    def toggle_group_mode(self):
+        """Switches the room list between single and multiple selection."""
+        if self.group_mode_var.get():
+            self.rooms_listbox.config(selectmode=tk.EXTENDED)
+        else:
+            self.rooms_listbox.config(selectmode=tk.BROWSE)
+            selected = self.rooms_listbox.curselection()
+            if len(selected) > 1: # Keep only the first room
+                self.rooms_listbox.selection_clear(selected[1], tk.END)
+        self.update_selection_summary()
+
+    def update_selection_summary(self, event=None):
+        """Shows how many rooms are selected in group mode."""
+        count = len(self.rooms_listbox.curselection())
+        self.selection_summary_var.set(f"{count} room(s) selected" if self.group_mode_var.get() and count else "")
+
     def update_checkout_mindate(self, event=None):
         """Ensure check-out date is after check-in date."""
         try:
@@ -135,15 +169,25 @@ class BookingFrame(ttk.Frame):
             print(f"Error updating checkout mindate: {e}") # Handle potential date parsing errors
 
 
-    def search_guests_for_booking(self, event=None):
-        """Search guests based on entry and update combobox."""
-        search_term = self.guest_search_var.get().strip()
-        if len(search_term) < 2: # Don't search for very short strings
-            self.guest_combobox['values'] = []
-            self.guest_combobox.set('')
-            return
+    def search_guests_for_booking(self, event=None, select_guest_id=None):
+        """Search guests based on entry and update combobox.
 
-        guests = find_guest_by_name_db(search_term)
+        Keystrokes go through the type-ahead, which waits for a pause in
+        typing and cancels superseded searches. If select_guest_id is given,
+        the search runs at once and that guest is selected when the results
+        arrive.
+        """
+        search_term = self.guest_search_var.get()
+        if select_guest_id is not None:
+            self._select_guest_id = select_guest_id
+            self.guest_type_ahead.reset() # The new guest is not in any cached result
+            self.guest_type_ahead.search_now(search_term)
+        else:
+            self.guest_type_ahead.on_key(search_term)
+
+    def _show_guest_results(self, guests, term=None):
+        """Fills the guest combobox with search results (runs on the Tk thread)."""
+        select_guest_id, self._select_guest_id = self._select_guest_id, None
         if guests:
             guest_display_list = [f"{g['guest_id']}: {g['first_name']} {g['last_name']} ({g.get('email', 'No Email')})" for g in guests]
             self.guest_combobox['values'] = guest_display_list
@@ -151,6 +195,14 @@ class BookingFrame(ttk.Frame):
             self.guest_combobox['values'] = []
             self.guest_combobox.set('')
 
+        if select_guest_id is not None:
+            # Try to find the exact match in the combobox and set it
+            for item in self.guest_combobox['values']:
+                if item.startswith(f"{select_guest_id}:"):
+                    self.guest_combobox.set(item)
+                    self.on_guest_selected()
+                    break
+
     def on_guest_selected(self, event=None):
         """Update selected guest ID and label when combobox selection changes."""
         selection = self.guest_combobox.get()
@@ -158,20 +210,33 @@ class BookingFrame(ttk.Frame):
             try:
                 # Extract guest ID from the display string (assuming format "ID: Name (Email)")
                 self.selected_guest_id = int(selection.split(':')[0])
-                guest_info = get_guest_by_id_db(self.selected_guest_id) # Fetch details to confirm
-                if guest_info:
-                    display_name = f"{guest_info['first_name']} {guest_info['last_name']}"
-                    self.selected_guest_label.config(text=f"Selected Guest: {display_name} (ID: {self.selected_guest_id})")
-                else:
-                     raise ValueError("Guest not found in DB")
             except (IndexError, ValueError, TypeError) as e:
                 print(f"Error parsing guest selection: {e}")
                 self.selected_guest_id = None
                 self.selected_guest_label.config(text="Selected Guest: Error parsing selection")
+                return
+            self.selected_guest_name = None
+            self.selected_guest_label.config(text=f"Selected Guest: loading... (ID: {self.selected_guest_id})")
+            # Fetch details to confirm, without blocking the UI
+            self.controller.db_worker.submit(get_guest_by_id_db, self.selected_guest_id, key="booking-guest-details",
+                                             on_success=self._show_selected_guest,
+                                             on_error=lambda e: self._show_selected_guest(None))
         else:
+            self.controller.db_worker.cancel("booking-guest-details")
             self.selected_guest_id = None
+            self.selected_guest_name = None
             self.selected_guest_label.config(text="Selected Guest: None")
 
+    def _show_selected_guest(self, guest_info):
+        if guest_info and guest_info['guest_id'] == self.selected_guest_id:
+            display_name = f"{guest_info['first_name']} {guest_info['last_name']}"
+            self.selected_guest_name = display_name
+            self.selected_guest_label.config(text=f"Selected Guest: {display_name} (ID: {self.selected_guest_id})")
+        else:
+            print("Error parsing guest selection: Guest not found in DB")
+            self.selected_guest_id = None
+            self.selected_guest_label.config(text="Selected Guest: Error parsing selection")
+
     def add_new_guest(self):
         """Simplified guest addition directly from booking form."""
         # This could open a more detailed dialog, but for now use simpledialog
@@ -185,24 +250,25 @@ class BookingFrame(ttk.Frame):
              messagebox.showwarning("Input Required", "Phone number is required.")
              return
 
-        guest_id = add_guest_db(
+        self.controller.update_status(f"Adding guest {fname} {lname}...")
+        self.controller.db_worker.submit(
+            add_guest_db,
             first_name=fname.strip(), last_name=lname.strip(),
-            email=email.strip() if email else None, phone=phone.strip()
-        )
+            email=email.strip() if email else None, phone=phone.strip(),
+            on_success=lambda guest_id: self._on_guest_added(fname, lname, guest_id),
+            on_error=lambda e: self._on_guest_added(fname, lname, None))
 
+    def _on_guest_added(self, fname, lname, guest_id):
+        """Reports the result of add_new_guest (runs on the Tk thread)."""
         if guest_id:
+            self.controller.update_status(f"Guest {fname} {lname} added.")
             messagebox.showinfo("Guest Added", f"Guest '{fname} {lname}' added (ID: {guest_id}). You can now search for them.")
-            # Optionally auto-select the newly added guest:
+            # Auto-select the newly added guest once the search comes back
             self.guest_search_var.set(f"{fname} {lname}")
-            self.search_guests_for_booking()
-            # Try to find the exact match in the combobox and set it
-            for item in self.guest_combobox['values']:
-                if item.startswith(f"{guest_id}:"):
-                    self.guest_combobox.set(item)
-                    self.on_guest_selected()
-                    break
+            self.search_guests_for_booking(select_guest_id=guest_id)
         else:
             messagebox.showerror("Error", "Failed to add guest.")
+            self.controller.update_status("Failed to add guest.")
 
 
     def find_available_rooms(self):
@@ -217,9 +283,15 @@ class BookingFrame(ttk.Frame):
         self.controller.update_status(f"Finding rooms available from {check_in_str} to {check_out_str}...")
         self.rooms_listbox.delete(0, tk.END) # Clear previous list
         self.available_rooms_cache.clear() # Clear cache
+        self.update_selection_summary()
 
-        rooms = get_available_rooms_for_booking(check_in_str, check_out_str)
+        self.controller.db_worker.submit(get_available_rooms_for_booking, check_in_str, check_out_str,
+                                         key="booking-available-rooms",
+                                         on_success=self._show_available_rooms,
+                                         on_error=lambda e: self._show_available_rooms(None))
 
+    def _show_available_rooms(self, rooms):
+        """Lists the available rooms once the query returns (runs on the Tk thread)."""
         if rooms is None:
             messagebox.showerror("Database Error", "Could not fetch available rooms.")
             self.controller.update_status("Error finding available rooms.")
@@ -262,6 +334,9 @@ class BookingFrame(ttk.Frame):
         if not selected_indices:
             messagebox.showerror("Input Error", "Please select an available room from the list.")
             return
+        if self.group_mode_var.get() and len(selected_indices) > 1:
+            self.create_group_booking(selected_indices, check_in_date, check_out_date)
+            return
         selected_room_index = selected_indices[0]
         # Get the actual room_id from the cached data
         if selected_room_index >= len(self.available_rooms_cache):
@@ -276,9 +351,8 @@ class BookingFrame(ttk.Frame):
         children = self.children_var.get()
         requests = self.requests_text.get("1.0", tk.END).strip() or None # Get text, strip whitespace, use None if empty
 
-        # 5. Confirm and Add to DB
-        guest_info = get_guest_by_id_db(self.selected_guest_id) # Get name for confirmation
-        guest_name = f"{guest_info['first_name']} {guest_info['last_name']}" if guest_info else f"ID: {self.selected_guest_id}"
+        # 5. Confirm and Add to DB (the name was loaded when the guest was selected)
+        guest_name = self.selected_guest_name or f"ID: {self.selected_guest_id}"
 
         confirm_msg = (
             f"Confirm Booking:\n\n"
@@ -293,34 +367,94 @@ class BookingFrame(ttk.Frame):
             return # User cancelled
 
         self.controller.update_status("Creating reservation...")
-        reservation_id = add_reservation_db(
-            guest_id=self.selected_guest_id,
-            room_id=selected_room_id,
-            check_in=check_in_date.isoformat(),
-            check_out=check_out_date.isoformat(),
-            adults=adults,
-            children=children,
-            requests=requests
-        )
-
+        self.controller.db_worker.submit(book_room_db, self.selected_guest_id, selected_room_id,
+                                         check_in_date.isoformat(), check_out_date.isoformat(),
+                                         adults=adults, children=children, requests=requests,
+                                         key="booking-create",
+                                         on_success=lambda result: self._on_booked(selected_room_number, result),
+                                         on_error=lambda e: self._on_booked(selected_room_number, (None, None)))
+
+    def _on_booked(self, room_number, result):
+        """Reports the outcome of a single-room booking (runs on the Tk thread)."""
+        reservation_id, reason = result
         if reservation_id:
             messagebox.showinfo("Booking Confirmed", f"Reservation created successfully!\nBooking ID: {reservation_id}")
-            self.controller.update_status(f"Reservation {reservation_id} created for room {selected_room_number}.")
+            self.controller.update_status(f"Reservation {reservation_id} created for room {room_number}.")
             # Clear the form for next booking
             self.clear_form()
             # Optionally switch view
             # self.controller.show_frame("DashboardFrame")
+        elif reason:
+            # Another terminal booked the room since the list was loaded
+            messagebox.showerror("Room No Longer Available", f"Room {room_number} could not be booked: {reason}.")
+            self.controller.update_status(f"Room {room_number} is no longer available.")
+            self.find_available_rooms() # Show the current availability
         else:
             messagebox.showerror("Database Error", "Failed to create reservation in the database.")
             self.controller.update_status("Failed to create reservation.")
 
 
+    def create_group_booking(self, selected_indices, check_in_date, check_out_date):
+        """Books all selected rooms for the selected guest in one all-or-nothing transaction."""
+        if max(selected_indices) >= len(self.available_rooms_cache):
+            messagebox.showerror("Error", "Selected rooms are out of sync. Please find rooms again.")
+            return
+        rooms = [self.available_rooms_cache[i] for i in selected_indices]
+        adults = self.adults_var.get()
+        children = self.children_var.get()
+        requests = self.requests_text.get("1.0", tk.END).strip() or None
+
+        room_numbers = ", ".join(room['room_number'] for room in rooms)
+        confirm_msg = (
+            f"Confirm Group Booking:\n\n"
+            f"Guest (group lead): ID {self.selected_guest_id}\n"
+            f"Rooms ({len(rooms)}): {room_numbers}\n"
+            f"Check-in: {check_in_date.isoformat()}\n"
+            f"Check-out: {check_out_date.isoformat()}\n"
+            f"Per room - Adults: {adults}, Children: {children}\n"
+            f"Requests: {requests if requests else 'None'}\n"
+        )
+        if not messagebox.askyesno("Confirm Group Booking", confirm_msg):
+            return
+
+        bookings = [{
+            'guest_id': self.selected_guest_id, 'room_id': room['room_id'],
+            'check_in': check_in_date, 'check_out': check_out_date,
+            'adults': adults, 'children': children, 'requests': requests,
+        } for room in rooms]
+        self.controller.update_status(f"Creating {len(bookings)} reservations...")
+        self.controller.db_worker.submit(add_reservations_bulk_db, bookings, key="booking-group-create",
+                                         on_success=lambda result: self._on_group_booked(rooms, result),
+                                         on_error=lambda e: self._on_group_booked(rooms, (None, [])))
+
+    def _on_group_booked(self, rooms, result):
+        """Reports the outcome of a group booking (runs on the Tk thread)."""
+        reservation_ids, conflicts = result
+        if reservation_ids:
+            messagebox.showinfo("Group Booking Confirmed",
+                                f"{len(reservation_ids)} reservations created.\n"
+                                f"Booking IDs: {', '.join(str(i) for i in reservation_ids)}")
+            self.controller.update_status(f"Group booking created: {len(reservation_ids)} rooms.")
+            self.clear_form()
+        elif conflicts:
+            details = "\n".join(f"Room {rooms[i]['room_number']}: {reason}" for i, reason in conflicts)
+            messagebox.showerror("Rooms No Longer Available",
+                                 f"Nothing was booked. These rooms could not be reserved:\n\n{details}")
+            self.controller.update_status("Group booking failed: some rooms are no longer available.")
+            self.find_available_rooms() # Show the current availability
+        else:
+            messagebox.showerror("Database Error", "Failed to create the group booking in the database.")
+            self.controller.update_status("Failed to create group booking.")
+
     def clear_form(self):
         """Resets the booking form fields."""
         self.guest_search_var.set("")
+        self.guest_type_ahead.cancel()
+        self.guest_type_ahead.reset()
         self.guest_combobox['values'] = []
         self.guest_combobox.set("")
         self.selected_guest_id = None
+        self.selected_guest_name = None
         self.selected_guest_label.config(text="Selected Guest: None")
 
         self.checkin_entry.set_date(date.today())
@@ -329,6 +463,7 @@ class BookingFrame(ttk.Frame):
 
         self.rooms_listbox.delete(0, tk.END)
         self.available_rooms_cache.clear()
+        self.update_selection_summary()
 
         self.adults_var.set(1)
         self.children_var.set(0)
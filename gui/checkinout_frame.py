@@ -1,11 +1,27 @@
 # gui/checkinout_frame.py
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
 from datetime import date
 
 # Use relative imports for DB functions
-from ..db.reservation_queries import find_reservation_for_checkin_db, find_reservation_for_checkout_db, update_reservation_status_db
+from ..db.reservation_queries import update_reservation_status_db
 from ..db.room_queries import update_room_status_db # Needed if checkout marks for maintenance
+from ..db.payment_queries import record_payment
+from ..db.billing import bill_reservation, checkout_bill
+from ..db.front_desk import lookup_front_desk, get_front_desk_index
+
+
+def _candidate_label(reservation):
+    action = "Check-in" if reservation['action'] == "checkin" else "Check-out"
+    return (f"{action}: Room {reservation['room_number']} - {reservation['first_name']} {reservation['last_name']} "
+            f"(#{reservation['reservation_id']})")
+
+
+def _pay_and_rebill(reservation_id, amount, method):
+    """ Records a payment on the DB worker. Returns (paid, updated bill or None). """
+    if not record_payment(reservation_id, amount, method):
+        return False, None
+    return True, bill_reservation(reservation_id)
 
 
 class CheckInOutFrame(ttk.Frame):
@@ -61,6 +77,12 @@ class CheckInOutFrame(ttk.Frame):
         self.result_status_var = tk.StringVar(value="Status: -")
         ttk.Label(result_frame, textvariable=self.result_status_var, font=('Helvetica', 10, 'bold')).grid(row=2, column=0, columnspan=2, sticky='w', pady=5)
 
+        # Shown when a search matches more than one reservation
+        self.candidates_label = ttk.Label(result_frame, text="Matches:")
+        self.candidates_combobox = ttk.Combobox(result_frame, state="readonly", width=60)
+        self.candidates_combobox.bind("<<ComboboxSelected>>", self.on_candidate_selected)
+        self.candidates = [] # Reservations found by the last search, check-ins first
+
         self.current_reservation_id = None # Store ID of found reservation
 
 
@@ -80,32 +102,55 @@ class CheckInOutFrame(ttk.Frame):
 
 
     def auto_find_action(self, event=None):
-        """Tries to find reservation for check-in or check-out based on input."""
+        """Finds reservations to check in today or check out that match the input."""
         search_key = self.search_var.get().strip()
         if not search_key:
+            self.controller.db_worker.cancel("checkinout-lookup")
             self.clear_results()
             return
 
         self.controller.update_status(f"Searching for '{search_key}'...")
         self.clear_results() # Clear previous results
 
-        # Try finding for check-in first (more common search includes names)
-        reservation_ci = find_reservation_for_checkin_db(search_key)
-        if reservation_ci:
-            self.display_reservation_details(reservation_ci, action="checkin")
-            self.controller.update_status(f"Found reservation for check-in: Room {reservation_ci['room_number']}")
-            return # Found for check-in, stop searching
-
-        # If not found for check-in, try finding for check-out (usually by room number)
-        reservation_co = find_reservation_for_checkout_db(search_key) # Assume search_key might be room num
-        if reservation_co:
-            self.display_reservation_details(reservation_co, action="checkout")
-            self.controller.update_status(f"Found reservation for check-out: Room {reservation_co['room_number']}")
-            return # Found for check-out
+        # One lookup answers both check-in and check-out (from memory, or a single query);
+        # a newer search supersedes this one
+        self.controller.db_worker.submit(
+            lookup_front_desk, search_key, key="checkinout-lookup",
+            on_success=lambda found: self._show_lookup_result(search_key, found),
+            on_error=lambda e: self.controller.update_status(f"Error searching for '{search_key}': {e}"))
+
+    def _show_lookup_result(self, search_key, found):
+        """Displays the lookup result (runs on the Tk thread)."""
+        if found is None:
+            messagebox.showerror("Database Error", f"Could not search reservations for '{search_key}'.")
+            self.controller.update_status(f"Error searching for '{search_key}'.")
+            return
+        self.candidates = found['checkin'] + found['checkout']
+        if not self.candidates:
+            messagebox.showinfo("Not Found", f"No matching reservation found for check-in today or current check-out for '{search_key}'.")
+            self.controller.update_status(f"No matching reservation found for '{search_key}'.")
+            return
 
-        # If not found for either
-        messagebox.showinfo("Not Found", f"No matching reservation found for check-in today or current check-out for '{search_key}'.")
-        self.controller.update_status(f"No matching reservation found for '{search_key}'.")
+        if len(self.candidates) > 1:
+            self.candidates_combobox['values'] = [_candidate_label(r) for r in self.candidates]
+            self.candidates_combobox.current(0)
+            self.candidates_label.grid(row=3, column=0, sticky='w', pady=(5, 0))
+            self.candidates_combobox.grid(row=3, column=1, sticky='ew', pady=(5, 0))
+        reservation = self.candidates[0]
+        self.display_reservation_details(reservation, action=reservation['action'])
+        noun = "check-in" if reservation['action'] == "checkin" else "check-out"
+        if len(self.candidates) > 1:
+            self.controller.update_status(f"{len(self.candidates)} reservations match '{search_key}' "
+                                          f"({len(found['checkin'])} to check in, {len(found['checkout'])} to check out).")
+        else:
+            self.controller.update_status(f"Found reservation for {noun}: Room {reservation['room_number']}")
+
+    def on_candidate_selected(self, event=None):
+        """Shows the reservation picked from the list of matches."""
+        index = self.candidates_combobox.current()
+        if 0 <= index < len(self.candidates):
+            reservation = self.candidates[index]
+            self.display_reservation_details(reservation, action=reservation['action'])
 
 
     def display_reservation_details(self, reservation_data, action):
@@ -116,9 +161,7 @@ class CheckInOutFrame(ttk.Frame):
 
         self.result_guest_var.set(f"Guest: {guest_name} (ID: {reservation_data['guest_id']})")
         self.result_room_var.set(f"Room: {room_num}")
-        # Fetch full reservation details if needed for dates (find_... functions only return limited info)
-        # self.result_dates_var.set(f"Dates: {reservation_data['check_in_date']} to {reservation_data['check_out_date']}")
-        self.result_dates_var.set("Dates: Check DB for full details") # Placeholder
+        self.result_dates_var.set(f"Dates: {reservation_data['check_in_date']} to {reservation_data['check_out_date']}")
 
         if action == "checkin":
             self.result_status_var.set("Status: Confirmed (Ready for Check-in)")
@@ -139,6 +182,10 @@ class CheckInOutFrame(ttk.Frame):
         self.current_reservation_id = None
         self.checkin_btn.config(state=tk.DISABLED)
         self.checkout_btn.config(state=tk.DISABLED)
+        self.candidates = []
+        self.candidates_combobox.set('')
+        self.candidates_label.grid_remove()
+        self.candidates_combobox.grid_remove()
 
     def clear_search(self):
         """Clears search input and results."""
@@ -153,57 +200,116 @@ class CheckInOutFrame(ttk.Frame):
             messagebox.showerror("Error", "No reservation selected for check-in.")
             return
 
+        reservation_id = self.current_reservation_id
         guest_name = self.result_guest_var.get().split(' (ID:')[0] # Get guest name for confirm message
-        if messagebox.askyesno("Confirm Check-in", f"Check in {guest_name} for Reservation ID {self.current_reservation_id}?"):
-            self.controller.update_status(f"Processing check-in for ID {self.current_reservation_id}...")
-            success = update_reservation_status_db(self.current_reservation_id, 'checked-in')
-
-            if success:
-                messagebox.showinfo("Check-in Complete", f"Reservation {self.current_reservation_id} checked in successfully.")
-                self.controller.update_status(f"Reservation {self.current_reservation_id} checked in.")
-                self.clear_results() # Clear the details after action
-                self.search_var.set("") # Clear search bar too
-                # Optionally refresh other views
-                self.controller.show_frame("RoomManagementFrame") # Go to rooms view to see change
-            else:
-                messagebox.showerror("Database Error", "Failed to update reservation status for check-in.")
-                self.controller.update_status(f"Failed check-in for ID {self.current_reservation_id}.")
+        if messagebox.askyesno("Confirm Check-in", f"Check in {guest_name} for Reservation ID {reservation_id}?"):
+            self.controller.update_status(f"Processing check-in for ID {reservation_id}...")
+            self.controller.db_worker.submit(update_reservation_status_db, reservation_id, 'checked-in',
+                                             on_success=lambda success: self._on_checked_in(reservation_id, success),
+                                             on_error=lambda e: self._on_checked_in(reservation_id, False))
+
+    def _on_checked_in(self, reservation_id, success):
+        """Reports the check-in result (runs on the Tk thread)."""
+        if success:
+            messagebox.showinfo("Check-in Complete", f"Reservation {reservation_id} checked in successfully.")
+            self.controller.update_status(f"Reservation {reservation_id} checked in.")
+            self.clear_results() # Clear the details after action
+            self.search_var.set("") # Clear search bar too
+            # Optionally refresh other views
+            self.controller.show_frame("RoomManagementFrame") # Go to rooms view to see change
+        else:
+            messagebox.showerror("Database Error", "Failed to update reservation status for check-in.")
+            self.controller.update_status(f"Failed check-in for ID {reservation_id}.")
 
 
     def perform_checkout(self):
-        """Performs check-out for the displayed reservation."""
+        """Performs check-out for the displayed reservation.
+
+        Billing, payment and the status change each run on the DB worker;
+        the dialogs in between are shown from their callbacks.
+        """
         if self.current_reservation_id is None:
             messagebox.showerror("Error", "No reservation selected for check-out.")
             return
 
+        reservation_id = self.current_reservation_id
         guest_name = self.result_guest_var.get().split(' (ID:')[0]
         room_num = self.result_room_var.get().replace("Room: ", "")
 
-        # --- Billing Placeholder ---
-        # In a real app, calculate the bill here based on room price, services, payments etc.
-        # bill_amount = calculate_bill(self.current_reservation_id)
-        # confirm_msg = f"Check out {guest_name} (Room {room_num})?\n\nFinal Bill: ${bill_amount:.2f}\n(Billing details not fully implemented)"
-        confirm_msg = f"Check out {guest_name} (Room {room_num}) for Reservation ID {self.current_reservation_id}?\n\n(Billing calculation not implemented)"
-        # --- End Placeholder ---
+        # --- Billing ---
+        # Invoice from the folio ledger: posted room nights (any the audit missed are posted now),
+        # services and their taxes, less payments; the balance due is the ledger balance
+        self.controller.update_status(f"Preparing the bill for ID {reservation_id}...")
+        self.controller.db_worker.submit(
+            checkout_bill, reservation_id, key="checkout-bill",
+            on_success=lambda bill: self._on_checkout_bill(reservation_id, guest_name, room_num, bill),
+            on_error=lambda e: self._on_checkout_bill(reservation_id, guest_name, room_num, None))
+
+    def _on_checkout_bill(self, reservation_id, guest_name, room_num, bill):
+        """Offers to settle the balance, then asks to confirm the check-out."""
+        if bill is None:
+            messagebox.showerror("Database Error", "Could not compute the bill for this reservation.")
+            self.controller.update_status(f"Failed check-out for ID {reservation_id}.")
+            return
+        if bill['due'] > 0 and messagebox.askyesno(
+                "Outstanding Balance",
+                f"{guest_name} owes ${bill['due']:.2f}.\n\nRecord a payment for the full amount now?"):
+            method = simpledialog.askstring("Payment", "Payment method (cash, card, transfer):",
+                                            initialvalue="card", parent=self)
+            if method:
+                self.controller.update_status(f"Recording payment for ID {reservation_id}...")
+                self.controller.db_worker.submit(
+                    _pay_and_rebill, reservation_id, bill['due'], method.strip().lower(), key="checkout-bill",
+                    on_success=lambda result: self._on_checkout_paid(reservation_id, guest_name, room_num, bill, result),
+                    on_error=lambda e: self._on_checkout_paid(reservation_id, guest_name, room_num, bill, (False, None)))
+                return
+        self._confirm_checkout(reservation_id, guest_name, room_num, bill)
+
+    def _on_checkout_paid(self, reservation_id, guest_name, room_num, bill, result):
+        paid, updated_bill = result
+        if not paid:
+            messagebox.showerror("Database Error", "Failed to record the payment.")
+            self.controller.update_status(f"Failed check-out for ID {reservation_id}.")
+            return
+        self._confirm_checkout(reservation_id, guest_name, room_num, updated_bill or bill)
+
+    def _confirm_checkout(self, reservation_id, guest_name, room_num, bill):
+        confirm_msg = (
+            f"Check out {guest_name} (Room {room_num}) for Reservation ID {reservation_id}?\n\n"
+            f"Room: {bill['nights']} nights x ${bill['rate']:.2f} = ${bill['room']:.2f}\n"
+            f"Services: ${bill['services']:.2f}\n"
+            f"Taxes: ${bill['tax']:.2f}\n"
+            f"Total: ${bill['total']:.2f}\n"
+            f"Paid: ${bill['paid']:.2f}\n"
+            f"Balance due: ${bill['due']:.2f}"
+        )
+        # --- End Billing ---
 
         if messagebox.askyesno("Confirm Check-out", confirm_msg):
-            self.controller.update_status(f"Processing check-out for ID {self.current_reservation_id}...")
-
-            # Update reservation status to checked-out
-            success_res = update_reservation_status_db(self.current_reservation_id, 'checked-out')
-
-            if success_res:
-                 # Room status update happens within update_reservation_status_db now
-                 messagebox.showinfo("Check-out Complete", f"Reservation {self.current_reservation_id} checked out successfully. Room marked for cleaning.")
-                 self.controller.update_status(f"Reservation {self.current_reservation_id} checked out.")
-                 self.clear_results()
-                 self.search_var.set("")
-                 # Optionally refresh other views
-                 self.controller.show_frame("RoomManagementFrame")
-            else:
-                messagebox.showerror("Database Error", "Failed to update reservation or room status for check-out.")
-                self.controller.update_status(f"Failed check-out for ID {self.current_reservation_id}.")
+            self.controller.update_status(f"Processing check-out for ID {reservation_id}...")
+            # Update reservation status to checked-out (room status is updated in the same call)
+            self.controller.db_worker.submit(update_reservation_status_db, reservation_id, 'checked-out',
+                                             on_success=lambda success: self._on_checked_out(reservation_id, success),
+                                             on_error=lambda e: self._on_checked_out(reservation_id, False))
+        else:
+            self.controller.update_status("Check-out cancelled.")
+
+    def _on_checked_out(self, reservation_id, success):
+        """Reports the check-out result (runs on the Tk thread)."""
+        if success:
+            messagebox.showinfo("Check-out Complete", f"Reservation {reservation_id} checked out successfully. Room marked for cleaning.")
+            self.controller.update_status(f"Reservation {reservation_id} checked out.")
+            self.clear_results()
+            self.search_var.set("")
+            # Optionally refresh other views
+            self.controller.show_frame("RoomManagementFrame")
+        else:
+            messagebox.showerror("Database Error", "Failed to update reservation or room status for check-out.")
+            self.controller.update_status(f"Failed check-out for ID {reservation_id}.")
 
     def refresh_data(self):
         """Called when the frame is shown. Clears previous search."""
-        self.clear_search()
\ No newline at end of file
+        self.controller.db_worker.cancel("checkinout-lookup")
+        self.clear_search()
+        # Load today's arrivals and in-house guests before the first search
+        self.controller.db_worker.submit(get_front_desk_index, key="front-desk-preload")
\ No newline at end of file
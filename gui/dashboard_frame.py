@@ -2,13 +2,15 @@
 import tkinter as tk
 from tkinter import ttk
 # Use relative imports for DB functions
-from ..db.room_queries import get_all_rooms_with_details
+from ..db.room_queries import get_dashboard_stats, DASHBOARD_STATS_TTL
 # Import other queries as needed (e.g., for guest count, upcoming check-ins)
 # from ..db.guest_queries import get_all_guests
 # from ..db.reservation_queries import get_upcoming_checkins # Example
 
 class DashboardFrame(ttk.Frame):
     """The initial view showing quick stats and actions."""
+    watched_tables = ('Rooms', 'Reservations') # Refreshed on show only when these tables changed
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -43,7 +45,22 @@ class DashboardFrame(ttk.Frame):
         ttk.Label(stats_frame, textvariable=self.maintenance_rooms_var, font=('Helvetica', 10, 'bold')).grid(row=row_idx, column=1, sticky="w", pady=3)
         row_idx += 1
 
-        # Add more stats as needed (Total Guests, Upcoming Check-ins/outs)
+        ttk.Label(stats_frame, text="Arrivals Today:", font=('Helvetica', 10)).grid(row=row_idx, column=0, sticky="w", pady=3)
+        self.arrivals_var = tk.StringVar(value="...")
+        ttk.Label(stats_frame, textvariable=self.arrivals_var, font=('Helvetica', 10, 'bold')).grid(row=row_idx, column=1, sticky="w", pady=3)
+        row_idx += 1
+
+        ttk.Label(stats_frame, text="Departures Today:", font=('Helvetica', 10)).grid(row=row_idx, column=0, sticky="w", pady=3)
+        self.departures_var = tk.StringVar(value="...")
+        ttk.Label(stats_frame, textvariable=self.departures_var, font=('Helvetica', 10, 'bold')).grid(row=row_idx, column=1, sticky="w", pady=3)
+        row_idx += 1
+
+        ttk.Label(stats_frame, text="Rooms to Clean:", font=('Helvetica', 10)).grid(row=row_idx, column=0, sticky="w", pady=3)
+        self.to_clean_var = tk.StringVar(value="...")
+        ttk.Label(stats_frame, textvariable=self.to_clean_var, font=('Helvetica', 10, 'bold')).grid(row=row_idx, column=1, sticky="w", pady=3)
+        row_idx += 1
+
+        # Add more stats as needed (Total Guests)
         # ttk.Label(stats_frame, text="Total Guests:").grid(row=row_idx, column=0, sticky="w", pady=2)
         # self.total_guests_var = tk.StringVar(value="...")
         # ttk.Label(stats_frame, textvariable=self.total_guests_var).grid(row=row_idx, column=1, sticky="w", pady=2)
@@ -72,35 +89,47 @@ class DashboardFrame(ttk.Frame):
         guests_btn.grid(row=3, column=0, pady=btn_pady, sticky="ew")
 
         # Optional: Add a refresh button for the dashboard itself
-        refresh_btn = ttk.Button(self, text="Refresh Dashboard", command=self.refresh_data)
+        refresh_btn = ttk.Button(self, text="Refresh Dashboard", command=lambda: self.refresh_data(force=True))
         refresh_btn.grid(row=2, column=0, columnspan=2, pady=(10, 5))
 
         # Add style for accent button if theme supports it
         controller.style.configure("Accent.TButton", font=('Helvetica', 11, 'bold'), foreground="white", background="#007bff") # Example blue
 
 
-    def refresh_data(self):
-        """Update dashboard stats by fetching data from the database."""
+    def refresh_data(self, force=False):
+        """Update dashboard stats by fetching data from the database (in the background).
+
+        Stats come from one aggregate query and are cached for a few seconds,
+        so switching back to the dashboard is free; force=True skips the cache.
+        """
         self.controller.update_status("Refreshing dashboard data...")
-        rooms_list = get_all_rooms_with_details() # Fetch current room details
-        # guests_list = get_all_guests() # Fetch guests if needed for stats
-
-        if rooms_list is None: # Handle DB error
-            self.available_rooms_var.set("Error")
-            self.occupied_rooms_var.set("Error")
-            self.maintenance_rooms_var.set("Error")
-            self.controller.update_status("Error fetching room data for dashboard.")
+        max_age = 0 if force else DASHBOARD_STATS_TTL
+        self.controller.db_worker.submit(get_dashboard_stats, max_age, key="dashboard-refresh",
+                                         on_success=self._show_stats, on_error=self._show_error)
+
+    def _stat_vars(self):
+        return {
+            'available': self.available_rooms_var,
+            'occupied': self.occupied_rooms_var,
+            'maintenance': self.maintenance_rooms_var,
+            'arrivals_today': self.arrivals_var,
+            'departures_today': self.departures_var,
+            'rooms_to_clean': self.to_clean_var,
+        }
+
+    def _show_error(self, error=None):
+        for var in self._stat_vars().values():
+            var.set("Error")
+        self.controller.update_status("Error fetching room data for dashboard.")
+
+    def _show_stats(self, stats):
+        """Fills in the stat labels once the stats have been fetched."""
+        if stats is None: # Handle DB error
+            self._show_error()
             return
 
-        # Calculate stats from the fetched list
-        available = sum(1 for room in rooms_list if room.get('status') == 'Available')
-        occupied = sum(1 for room in rooms_list if room.get('status') == 'Occupied')
-        maintenance = sum(1 for room in rooms_list if room.get('status') == 'Maintenance')
-        # total_guests = len(guests_list) if guests_list is not None else "Error"
-
-        self.available_rooms_var.set(str(available))
-        self.occupied_rooms_var.set(str(occupied))
-        self.maintenance_rooms_var.set(str(maintenance))
-        # self.total_guests_var.set(str(total_guests))
+        for key, var in self._stat_vars().items():
+            var.set(str(stats.get(key, 0)))
 
-        self.controller.update_status("Dashboard refreshed.")
\ No newline at end of file
+        self.controller.update_status("Dashboard refreshed.")
+        self.controller.frame_refreshed(self)
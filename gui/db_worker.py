@@ -0,0 +1,140 @@
+# gui/db_worker.py
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DBWorker:
+    """Runs DB query functions on background threads and hands results back to Tk.
+
+    Tk widgets may only be touched from the main thread, so worker threads never
+    call back directly: finished jobs are queued and drained by an `after()` poll
+    on the Tk thread, which then invokes the success/error callbacks.
+
+    Jobs submitted with the same `key` supersede each other: only the result of
+    the most recent submission for a key is delivered, so an older search can
+    never overwrite a newer one.
+    """
+    def __init__(self, root, max_workers=4, poll_ms=25, on_busy_change=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy_change = on_busy_change # Called with the in-flight count on the Tk thread
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._results = queue.Queue()
+        self._tickets = itertools.count(1)
+        self._lock = threading.Lock()
+        self._latest = {}   # key -> ticket of the newest submission
+        self._futures = {}  # ticket -> Future, for cancellation
+        self._in_flight = 0
+        self._polling = False
+        self._closed = False
+
+    def submit(self, func, *args, on_success=None, on_error=None, key=None, **kwargs):
+        """Schedules func(*args, **kwargs) on a worker thread. Returns a ticket number.
+
+        on_success(result) / on_error(exception) run on the Tk thread. Passing a
+        key cancels any earlier, still-pending job submitted with the same key.
+        """
+        if self._closed:
+            return None
+        ticket = next(self._tickets)
+        with self._lock:
+            if key is not None:
+                previous = self._latest.get(key)
+                self._latest[key] = ticket
+                if previous is not None:
+                    self._cancel_ticket(previous)
+            self._in_flight += 1
+
+        future = self._executor.submit(self._run, ticket, key, func, args, kwargs, on_success, on_error)
+        with self._lock:
+            if not future.done():
+                self._futures[ticket] = future
+        self._notify_busy()
+        self._ensure_polling()
+        return ticket
+
+    def cancel(self, key):
+        """Drops the pending job for `key`; its result, if any, is discarded."""
+        with self._lock:
+            ticket = self._latest.pop(key, None)
+            if ticket is not None:
+                self._cancel_ticket(ticket)
+        self._notify_busy()
+
+    def is_current(self, key, ticket):
+        """True if `ticket` is still the newest submission for `key`."""
+        with self._lock:
+            return self._latest.get(key) == ticket
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    def shutdown(self):
+        """Stops accepting work and abandons jobs that have not started yet."""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ---
+
+    def _cancel_ticket(self, ticket):
+        # Caller holds self._lock. A job that already started cannot be
+        # interrupted, but its result is dropped as stale on delivery.
+        future = self._futures.pop(ticket, None)
+        if future is not None and future.cancel():
+            self._in_flight -= 1
+
+    def _run(self, ticket, key, func, args, kwargs, on_success, on_error):
+        # Skip the query entirely if it was superseded while queued
+        if key is not None and not self.is_current(key, ticket):
+            self._results.put((ticket, key, None, None, None, None, True))
+            return
+        try:
+            result = func(*args, **kwargs)
+            self._results.put((ticket, key, result, None, on_success, on_error, False))
+        except Exception as e:
+            self._results.put((ticket, key, None, e, on_success, on_error, False))
+
+    def _ensure_polling(self):
+        if not self._polling and not self._closed:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Delivers finished jobs on the Tk thread; reschedules while work is in flight."""
+        while True:
+            try:
+                ticket, key, result, error, on_success, on_error, skipped = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._futures.pop(ticket, None)
+                self._in_flight -= 1
+                stale = skipped or (key is not None and self._latest.get(key) != ticket)
+                if not stale and key is not None:
+                    del self._latest[key]
+            if stale:
+                continue
+            try:
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        print(f"Background DB job failed: {error}")
+                elif on_success:
+                    on_success(result)
+            except Exception as e:
+                print(f"Error in DB result callback: {e}") # Never let a callback kill the poll loop
+
+        self._notify_busy()
+        self._polling = False
+        if self.in_flight > 0 and not self._closed:
+            self._ensure_polling()
+
+    def _notify_busy(self):
+        if self.on_busy_change and threading.current_thread() is threading.main_thread():
+            self.on_busy_change(self.in_flight)
@@ -0,0 +1,134 @@
+# gui/diagnostics_frame.py
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+# Use relative imports for DB functions
+from ..db.instrumentation import get_query_stats, get_slow_queries, reset_stats, dump_stats
+from ..db.connection import get_pool_stats
+from ..db.cache import get_cache_stats
+from config import INSTRUMENTATION_CONFIG
+
+AUTO_REFRESH_MS = 2000 # While the view is visible
+
+def _fmt_ms(value):
+    return "" if value is None else f"{value:.2f}"
+
+
+class DiagnosticsFrame(ttk.Frame):
+    """Per-query timings, the slow-query log and pool counters (from db/instrumentation.py)."""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+
+        label = ttk.Label(self, text="Diagnostics", font=('Helvetica', 16, 'bold'))
+        label.pack(pady=(10, 5))
+
+        # --- Query timings ---
+        stats_lf = ttk.LabelFrame(self, text="Query Timings (ms)", padding=5)
+        stats_lf.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        columns = (
+            ("function", "Function", 230, tk.W),
+            ("calls", "Calls", 60, tk.E),
+            ("errors", "Errors", 55, tk.E),
+            ("p50", "p50", 70, tk.E),
+            ("p95", "p95", 70, tk.E),
+            ("p99", "p99", 70, tk.E),
+            ("max", "Max", 70, tk.E),
+            ("connect", "Connect", 70, tk.E),
+            ("execute", "Execute", 70, tk.E),
+            ("fetch", "Fetch", 70, tk.E),
+            ("rows", "Rows/call", 70, tk.E),
+        )
+        self.stats_tree = ttk.Treeview(stats_lf, columns=[c[0] for c in columns], show="headings", height=10)
+        for col_id, heading, width, anchor in columns:
+            self.stats_tree.heading(col_id, text=heading)
+            self.stats_tree.column(col_id, width=width, anchor=anchor, stretch=(col_id == "function"))
+        stats_scroll = ttk.Scrollbar(stats_lf, orient=tk.VERTICAL, command=self.stats_tree.yview)
+        self.stats_tree.configure(yscrollcommand=stats_scroll.set)
+        self.stats_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        stats_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # --- Slow-query log ---
+        threshold = INSTRUMENTATION_CONFIG.get('slow_query_ms', 200)
+        slow_lf = ttk.LabelFrame(self, text=f"Slow Calls (over {threshold} ms)", padding=5)
+        slow_lf.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        slow_columns = (
+            ("at", "Time", 140, tk.W),
+            ("function", "Function", 200, tk.W),
+            ("total", "Total ms", 80, tk.E),
+            ("rows", "Rows", 60, tk.E),
+            ("sql", "Slowest Statement", 400, tk.W),
+        )
+        self.slow_tree = ttk.Treeview(slow_lf, columns=[c[0] for c in slow_columns], show="headings", height=6)
+        for col_id, heading, width, anchor in slow_columns:
+            self.slow_tree.heading(col_id, text=heading)
+            self.slow_tree.column(col_id, width=width, anchor=anchor, stretch=(col_id == "sql"))
+        self.slow_tree.pack(fill=tk.BOTH, expand=True)
+
+        # --- Pool counters and actions ---
+        bottom = ttk.Frame(self, padding=(10, 5))
+        bottom.pack(fill=tk.X)
+        self.pool_var = tk.StringVar(value="")
+        ttk.Label(bottom, textvariable=self.pool_var).pack(side=tk.LEFT)
+        self.cache_var = tk.StringVar(value="")
+        ttk.Label(bottom, textvariable=self.cache_var).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Button(bottom, text="Export JSON...", command=self.export_json).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(bottom, text="Reset", command=self.reset).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(bottom, text="Refresh", command=self.refresh_data).pack(side=tk.RIGHT, padx=5)
+
+        self._auto_refresh_id = None
+
+    def refresh_data(self):
+        """Redraws the tables from the in-memory registry (no database access)."""
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for stats in get_query_stats():
+            phases = stats['phases']
+            self.stats_tree.insert("", tk.END, values=(
+                stats['function'], stats['calls'], stats['errors'],
+                _fmt_ms(phases['total']['p50_ms']), _fmt_ms(phases['total']['p95_ms']),
+                _fmt_ms(phases['total']['p99_ms']), _fmt_ms(phases['total']['max_ms']),
+                _fmt_ms(phases['connect']['mean_ms']), _fmt_ms(phases['execute']['mean_ms']),
+                _fmt_ms(phases['fetch']['mean_ms']), stats['rows_per_call'],
+            ))
+
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        for entry in get_slow_queries():
+            self.slow_tree.insert("", tk.END, values=(
+                entry['at'], entry['function'], _fmt_ms(entry['total_ms']), entry['rows'],
+                entry['error'] or entry['slowest_sql'] or "",
+            ))
+
+        pool = get_pool_stats()
+        self.pool_var.set(f"Pool: {pool['in_use']}/{pool['size']} in use, {pool['idle']} idle, "
+                          f"{pool['waits']} waits, {pool['timeouts']} timeouts, {pool['connects']} connects")
+        self.cache_var.set("Cache: " + (", ".join(
+            f"{c['name']} {c['hits']}/{c['hits'] + c['misses']} hits ({c['entries']} held)"
+            for c in get_cache_stats()) or "unused"))
+        self._schedule_auto_refresh()
+
+    def _schedule_auto_refresh(self):
+        if self._auto_refresh_id is not None:
+            self.after_cancel(self._auto_refresh_id)
+        self._auto_refresh_id = self.after(AUTO_REFRESH_MS, self._auto_refresh)
+
+    def _auto_refresh(self):
+        self._auto_refresh_id = None
+        if self.controller.current_frame == "DiagnosticsFrame": # Stop once another view is shown
+            self.refresh_data()
+
+    def reset(self):
+        reset_stats()
+        self.refresh_data()
+        self.controller.update_status("Query statistics reset.")
+
+    def export_json(self):
+        path = filedialog.asksaveasfilename(title="Export Query Statistics", defaultextension=".json",
+                                            filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            dump_stats(path)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Could not write {path}:\n{e}")
+            return
+        self.controller.update_status(f"Query statistics written to {path}")
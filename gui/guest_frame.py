@@ -2,15 +2,33 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 # Use relative imports for DB functions
-from ..db.guest_queries import get_all_guests, add_guest_db, find_guest_by_name_db
+from ..db.guest_queries import add_guest_db, get_guests_page, get_guest_key_at, count_guests
+from .virtual_list import VirtualTreeview, KeysetSource, ListSource
+from .type_ahead import GuestTypeAhead
+from config import TYPE_AHEAD_CONFIG
 # Import update/delete later: from ..db.guest_queries import update_guest_db, delete_guest_db
 
+def _guest_sort_key(guest):
+    """ Keyset pagination key, matching the ORDER BY of get_guests_page. """
+    return (guest['last_name'], guest['first_name'], guest['guest_id'])
+
+def _guest_values(guest):
+    return (
+        guest.get('guest_id', 'N/A'),
+        guest.get('first_name', ''),
+        guest.get('last_name', ''),
+        guest.get('email', ''),
+        guest.get('phone', '')
+    )
+
+
 class GuestManagementFrame(ttk.Frame):
     """Frame for viewing and managing hotel guests."""
+    watched_tables = ('Guests',) # Refreshed on show only when these tables changed
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
-        self.guest_map = {} # Map treeview item ID to guest_id
 
         label = ttk.Label(self, text="Guest Management", font=('Helvetica', 16, 'bold'))
         label.pack(pady=(10,5))
@@ -22,6 +40,12 @@ class GuestManagementFrame(ttk.Frame):
         self.search_var = tk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        # Filters as the user types; the list shows every match fetched, not just a drop-down's worth
+        self.type_ahead = GuestTypeAhead(self, controller.db_worker, key="guest-search",
+                                         on_results=self._show_search_results, on_error=self._show_load_error,
+                                         limit=TYPE_AHEAD_CONFIG.get('fetch_limit', 200))
+        search_entry.bind("<KeyRelease>", lambda event: self.type_ahead.on_key(self.search_var.get()))
+        search_entry.bind("<Return>", lambda event: self.search_guests())
         search_btn = ttk.Button(search_frame, text="Search", command=self.search_guests)
         search_btn.pack(side=tk.LEFT, padx=5)
         clear_btn = ttk.Button(search_frame, text="Clear", command=self.clear_search)
@@ -29,29 +53,24 @@ class GuestManagementFrame(ttk.Frame):
 
 
         # --- Treeview for Guest Data ---
-        tree_frame = ttk.Frame(self)
-        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
-
-        columns = ("guest_id", "first_name", "last_name", "email", "phone")
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", selectmode="browse")
-
-        self.tree.heading("guest_id", text="ID")
-        self.tree.heading("first_name", text="First Name")
-        self.tree.heading("last_name", text="Last Name")
-        self.tree.heading("email", text="Email")
-        self.tree.heading("phone", text="Phone")
-
-        self.tree.column("guest_id", width=50, anchor=tk.CENTER, stretch=tk.NO)
-        self.tree.column("first_name", width=150, anchor=tk.W)
-        self.tree.column("last_name", width=150, anchor=tk.W)
-        self.tree.column("email", width=200, anchor=tk.W)
-        self.tree.column("phone", width=120, anchor=tk.W)
-
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Virtualized: only the visible rows exist as Treeview items, pages are fetched on scroll
+        columns = (
+            ("guest_id", "ID", dict(width=50, anchor=tk.CENTER, stretch=tk.NO)),
+            ("first_name", "First Name", dict(width=150, anchor=tk.W)),
+            ("last_name", "Last Name", dict(width=150, anchor=tk.W)),
+            ("email", "Email", dict(width=200, anchor=tk.W)),
+            ("phone", "Phone", dict(width=120, anchor=tk.W)),
+        )
+        self.guest_list = VirtualTreeview(self, controller, name="guest-list", columns=columns,
+                                          row_values=_guest_values, on_loaded=self._on_guests_loaded)
+        self.guest_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
+        self.tree = self.guest_list.tree
+        self._loaded_message = lambda count: f"Guest list refreshed ({count} guests)."
 
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Keyset pages over the whole Guests table, ordered like the original list
+        self.all_guests_source = KeysetSource(
+            fetch_page=get_guests_page, key_at=get_guest_key_at, count=count_guests,
+            row_key=_guest_sort_key, page_size=100)
 
         # --- Buttons for Guest Actions ---
         button_frame = ttk.Frame(self)
@@ -68,38 +87,32 @@ class GuestManagementFrame(ttk.Frame):
         # edit_btn.pack(side=tk.LEFT, padx=5)
         # delete_btn = ttk.Button(button_frame, text="Delete Selected", command=self.delete_guest)
         # delete_btn.pack(side=tk.LEFT, padx=5)
+        # Initial data is loaded by show_frame() when the frame is first shown
 
-        self.refresh_data() # Load initial data
-
-    def _populate_tree(self, guests_list):
-        """Helper to populate treeview, clearing first."""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        self.guest_map.clear()
-
-        if guests_list is None:
+    def _on_guests_loaded(self, count):
+        """Reports the row count once the list source has been counted."""
+        if count is None:
             messagebox.showerror("Database Error", "Could not fetch guest data.")
+            self.controller.update_status("Error fetching guests.")
             return
-
-        for guest in guests_list:
-            values = (
-                guest.get('guest_id', 'N/A'),
-                guest.get('first_name', ''),
-                guest.get('last_name', ''),
-                guest.get('email', ''),
-                guest.get('phone', '')
-            )
-            item_id = self.tree.insert("", tk.END, values=values)
-            self.guest_map[item_id] = guest.get('guest_id') # Map tree item ID to DB guest_id
+        self.controller.update_status(self._loaded_message(count))
+        self.controller.frame_refreshed(self)
 
     def refresh_data(self):
         """Clears search and reloads all guest data from the database."""
         self.search_var.set("") # Clear search field
         self.controller.update_status("Fetching all guests...")
-        guests = get_all_guests()
-        self._populate_tree(guests)
-        self.controller.update_status(f"Guest list refreshed ({len(guests or [])} guests).")
+        self.type_ahead.cancel()
+        self.type_ahead.reset()
+        self._loaded_message = lambda count: f"Guest list refreshed ({count} guests)."
+        if self.guest_list.source is self.all_guests_source:
+            self.guest_list.refresh() # Only the visible rows are re-read and diffed
+        else:
+            self.guest_list.set_source(self.all_guests_source)
+
+    def _show_load_error(self, error=None):
+        messagebox.showerror("Database Error", "Could not fetch guest data.")
+        self.controller.update_status("Error fetching guests.")
 
     def search_guests(self):
         """Filters the guest list based on the search term."""
@@ -108,9 +121,17 @@ class GuestManagementFrame(ttk.Frame):
             messagebox.showwarning("Search", "Please enter a name to search for.")
             return
         self.controller.update_status(f"Searching guests for '{search_term}'...")
-        guests = find_guest_by_name_db(search_term)
-        self._populate_tree(guests)
-        self.controller.update_status(f"Found {len(guests or [])} guests matching '{search_term}'.")
+        self.type_ahead.search_now(search_term)
+
+    def _show_search_results(self, guests, search_term):
+        """Shows type-ahead results; an emptied search box brings back the full list."""
+        if not search_term:
+            self.refresh_data()
+            return
+        if len(search_term) < self.type_ahead.min_chars:
+            return # Too short to search; keep what is shown
+        self._loaded_message = lambda count: f"Found {count} guests matching '{search_term}'."
+        self.guest_list.set_source(ListSource(guests, row_key=_guest_sort_key))
 
     def clear_search(self):
         """Clears the search results and shows all guests."""
@@ -138,19 +159,24 @@ class GuestManagementFrame(ttk.Frame):
         # Add more dialogs for passport, DOB if needed
 
         self.controller.update_status(f"Adding guest {fname} {lname}...")
-        guest_id = add_guest_db(
+        self.controller.db_worker.submit(
+            add_guest_db,
             first_name=fname.strip(),
             last_name=lname.strip(),
             email=email.strip() if email else None, # Handle empty optional email
             phone=phone.strip(),
             address=address.strip() if address else None,
             city=city.strip() if city else None,
-            country=country.strip() if country else None
-        )
+            country=country.strip() if country else None,
+            on_success=lambda guest_id: self._on_guest_added(fname, lname, guest_id),
+            on_error=lambda e: self._on_guest_added(fname, lname, None))
 
+    def _on_guest_added(self, fname, lname, guest_id):
+        """Reports the result of add_guest (runs on the Tk thread)."""
         if guest_id:
             messagebox.showinfo("Guest Added", f"Guest '{fname} {lname}' added successfully (ID: {guest_id}).")
             self.controller.update_status(f"Guest {fname} {lname} added.")
+            self.type_ahead.reset() # Cached search results don't include the new guest
             self.refresh_data() # Update the view
         else:
             messagebox.showerror("Database Error", "Failed to add guest to the database.")
@@ -158,11 +184,11 @@ class GuestManagementFrame(ttk.Frame):
 
     def get_selected_guest_id(self):
          """Gets the database guest_id of the currently selected item."""
-         selected_item_id = self.tree.focus()
-         if not selected_item_id:
+         guest = self.guest_list.selected_row()
+         if guest is None:
              messagebox.showwarning("No Selection", "Please select a guest from the list first.")
              return None
-         db_guest_id = self.guest_map.get(selected_item_id)
+         db_guest_id = guest.get('guest_id')
          if db_guest_id is None:
               messagebox.showerror("Error", "Could not find database ID for selected guest.")
               return None
@@ -1,21 +1,36 @@
 # gui/main_window.py
 
+import importlib
+import time
 import tkinter as tk
+from datetime import date
 from tkinter import ttk, messagebox
 
-# Import the frame classes using relative imports
-from .dashboard_frame import DashboardFrame
-from .room_frame import RoomManagementFrame
-from .guest_frame import GuestManagementFrame
-from .booking_frame import BookingFrame
-from .checkinout_frame import CheckInOutFrame
-# Add imports for other frames as you create them (e.g., services, payments)
+from .db_worker import DBWorker
+from ..db.changes import table_versions, poll_changes
+from ..db.connection import warm_up_pool
+from ..db.payment_queries import post_room_charges
+from config import CHANGE_FEED_CONFIG, STARTUP_CONFIG
+
+# Views by page name -> (module, class). Modules are imported and frames built on first
+# show_frame(), so their imports (e.g. tkcalendar for bookings) don't slow down startup.
+# Register other frames here as you create them (e.g., services, payments)
+FRAME_REGISTRY = {
+    "DashboardFrame": (".dashboard_frame", "DashboardFrame"),
+    "RoomManagementFrame": (".room_frame", "RoomManagementFrame"),
+    "GuestManagementFrame": (".guest_frame", "GuestManagementFrame"),
+    "BookingFrame": (".booking_frame", "BookingFrame"),
+    "CheckInOutFrame": (".checkinout_frame", "CheckInOutFrame"),
+    "DiagnosticsFrame": (".diagnostics_frame", "DiagnosticsFrame"),
+}
 
 class HotelApp(tk.Tk):
     """Main Application Window for the Hotel Management System."""
 
-    def __init__(self):
+    def __init__(self, startup=None):
         super().__init__()  # Initialize the tk.Tk parent class
+        self.startup = startup # StartupProfile from main.py (optional)
+        self._mark_startup("Tk root created")
 
         self.title("Hotel Management System - DB Connected")
         self.geometry("1000x700") # Increased size slightly
@@ -49,27 +64,42 @@ class HotelApp(tk.Tk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
-        # Dictionary to store frames (views)
-        self.frames = {}
-
-        # Create and store frames for each major section
-        # Add other frames to this tuple as you create them
-        for F in (DashboardFrame, RoomManagementFrame, GuestManagementFrame, BookingFrame, CheckInOutFrame):
-            page_name = F.__name__
-            # Pass the container as parent and self (HotelApp instance) as controller
-            frame = F(parent=self.container, controller=self)
-            self.frames[page_name] = frame
-            # Place each frame in the same grid cell; only the top one will be visible
-            frame.grid(row=0, column=0, sticky="nsew")
-
         # --- Status Bar ---
+        # Created before the frames so they can report status while loading
+        status_frame = ttk.Frame(self)
+        status_frame.grid(row=2, column=0, sticky="ew") # Span across the bottom
+        status_frame.grid_columnconfigure(0, weight=1)
+
         self.status_var = tk.StringVar()
         self.status_var.set("Welcome to the Hotel Management System!")
-        status_bar = ttk.Label(self, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padding=5)
-        status_bar.grid(row=2, column=0, sticky="ew") # Span across the bottom
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padding=5)
+        status_bar.grid(row=0, column=0, sticky="ew")
+
+        # In-flight indicator for background DB work
+        self.busy_var = tk.StringVar(value="DB: idle")
+        busy_label = ttk.Label(status_frame, textvariable=self.busy_var, relief=tk.SUNKEN, anchor=tk.E, padding=5, width=16)
+        busy_label.grid(row=0, column=1, sticky="e")
+
+        # --- Background DB worker (keeps queries off the Tk mainloop) ---
+        self.db_worker = DBWorker(self, on_busy_change=self.update_busy_indicator)
+        # Connect in the background while the window is being built
+        self.db_worker.submit(warm_up_pool, key="pool-warm-up", on_success=self._on_database_ready,
+                              on_error=lambda e: self._on_database_ready(False))
+        self._mark_startup("Main window built")
+
+        # Frames (views) are created on first use, see FRAME_REGISTRY
+        self.frames = {}
+        self.current_frame = None
+        self._frame_versions = {} # page_name -> versions its last completed refresh showed
+        self._refreshing_versions = {} # page_name -> versions of the refresh in flight
 
         # Show the initial frame (Dashboard)
         self.show_frame("DashboardFrame")
+        self._mark_startup("Dashboard shown")
+        self.after_idle(self._on_first_idle)
+
+        # Watch for changes made by other desk terminals
+        self.after(CHANGE_FEED_CONFIG.get('poll_interval_ms', 0) or 0, self.poll_remote_changes)
 
     def create_menu(self):
         """Creates the main application menu bar."""
@@ -91,6 +121,7 @@ class HotelApp(tk.Tk):
         view_menu.add_command(label="Guests", command=lambda: self.show_frame("GuestManagementFrame"))
         # Add Reservations List view later?
         view_menu.add_separator()
+        view_menu.add_command(label="Diagnostics", command=lambda: self.show_frame("DiagnosticsFrame"))
 
 
         # --- Actions Menu ---
@@ -98,6 +129,8 @@ class HotelApp(tk.Tk):
         menu_bar.add_cascade(label="Actions", menu=actions_menu)
         actions_menu.add_command(label="New Booking", command=lambda: self.show_frame("BookingFrame"))
         actions_menu.add_command(label="Check-in / Check-out", command=lambda: self.show_frame("CheckInOutFrame"))
+        actions_menu.add_separator()
+        actions_menu.add_command(label="Post Tonight's Room Charges...", command=self.run_night_audit)
         # Add Manage Services, Maintenance Request later?
 
         # --- Help Menu ---
@@ -105,13 +138,46 @@ class HotelApp(tk.Tk):
         menu_bar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="About", command=self.show_about)
 
-    def show_frame(self, page_name):
-        """Raises the requested frame to the top and refreshes its data if applicable."""
-        if page_name not in self.frames:
+    def get_frame(self, page_name):
+        """Returns the frame for page_name, importing and building it on first use (None if unknown)."""
+        frame = self.frames.get(page_name)
+        if frame is not None:
+            return frame
+        if page_name not in FRAME_REGISTRY:
+            return None
+        started = time.perf_counter()
+        module_name, class_name = FRAME_REGISTRY[page_name]
+        frame_class = getattr(importlib.import_module(module_name, __package__), class_name)
+        # Pass the container as parent and self (HotelApp instance) as controller
+        frame = frame_class(parent=self.container, controller=self)
+        self.frames[page_name] = frame
+        # Place each frame in the same grid cell; only the top one will be visible
+        frame.grid(row=0, column=0, sticky="nsew")
+        if self.startup is not None:
+            self.startup.record_frame_build(page_name, time.perf_counter() - started)
+            if self.startup.reported and STARTUP_CONFIG.get('report'):
+                self.startup.report_frame_build(page_name)
+        return frame
+
+    def show_frame(self, page_name, force_refresh=False):
+        """Raises the requested frame to the top and refreshes its data if applicable.
+
+        Frames that declare `watched_tables` are only refreshed when one of
+        those tables (or the date) changed since their last completed refresh, or
+        force_refresh is set; such frames call frame_refreshed() when their data lands.
+        A frame that has never been shown is built first and always refreshed.
+        """
+        try:
+            frame = self.get_frame(page_name)
+        except Exception as e:
+            messagebox.showerror("View Error", f"Could not open {page_name}:\n{e}")
+            print(f"Error building {page_name}: {e}")
+            return
+        if frame is None:
             print(f"Error: Frame '{page_name}' not found.")
             return
 
-        frame = self.frames[page_name]
+        self.current_frame = page_name
         # Update status bar
         status_msg = page_name.replace('Frame', '') # Get a nicer name
         self.update_status(f"Viewing {status_msg}")
@@ -119,12 +185,81 @@ class HotelApp(tk.Tk):
 
         # Refresh frame data if the frame has a 'refresh_data' method
         if hasattr(frame, 'refresh_data') and callable(getattr(frame, 'refresh_data')):
+            watched = getattr(frame, 'watched_tables', None)
+            if watched is not None:
+                # The date is part of the key: arrivals, departures and room statuses are per day
+                versions = (date.today(), table_versions(watched))
+                if not force_refresh and self._frame_versions.get(page_name) == versions:
+                    return # Nothing it shows has changed; skip the query entirely
+                # Recorded by frame_refreshed() once the data has loaded, so a failed
+                # or superseded refresh is retried on the next show
+                self._refreshing_versions[page_name] = versions
             try:
                 frame.refresh_data()
             except Exception as e:
                 messagebox.showerror("Refresh Error", f"Failed to refresh data for {status_msg}:\n{e}")
                 print(f"Error refreshing {page_name}: {e}") # Log detailed error
 
+    def frame_refreshed(self, frame):
+        """Called by a frame with watched_tables when its background refresh has loaded."""
+        for page_name, built in self.frames.items():
+            if built is frame:
+                versions = self._refreshing_versions.pop(page_name, None)
+                if versions is not None:
+                    self._frame_versions[page_name] = versions
+                return
+
+    def poll_remote_changes(self):
+        """Periodically picks up other terminals' writes from the change log."""
+        interval = CHANGE_FEED_CONFIG.get('poll_interval_ms', 0)
+        if not interval:
+            return
+        self.db_worker.submit(poll_changes, key="change-poll", on_success=self._on_remote_changes,
+                              on_error=lambda e: print(f"Error polling changes: {e}"))
+        self.after(interval, self.poll_remote_changes)
+
+    def _on_remote_changes(self, changed_tables):
+        """Refreshes the visible frame if another terminal changed what it shows."""
+        if not changed_tables or self.current_frame is None:
+            return
+        frame = self.frames[self.current_frame]
+        watched = getattr(frame, 'watched_tables', None)
+        if watched is not None and changed_tables.intersection(watched):
+            self.show_frame(self.current_frame)
+
+    def _mark_startup(self, label):
+        if self.startup is not None:
+            self.startup.mark(label)
+
+    def _on_first_idle(self):
+        """Runs once the mainloop is idle for the first time, i.e. right after the first paint."""
+        self.update_idletasks() # Flush any geometry/redraw still pending
+        self._mark_startup("First paint")
+        if self.startup is not None and STARTUP_CONFIG.get('report'):
+            self.startup.report(STARTUP_CONFIG.get('budget_ms'))
+
+    def _on_database_ready(self, connected):
+        """Reports the result of the background connection warm-up."""
+        if connected:
+            print("Successfully connected to the database.")
+        else:
+            print("CRITICAL: Failed to connect to the database. Application might not work correctly.")
+            self.update_status("Cannot connect to the database - check config.py and the server.")
+
+    def run_night_audit(self):
+        """Posts tonight's room charge to every in-house folio (safe to repeat)."""
+        if not messagebox.askyesno("Night Audit", "Post tonight's room charges to all in-house reservations?"):
+            return
+        self.update_status("Posting room charges...")
+
+        def done(posted):
+            if posted is None:
+                messagebox.showerror("Database Error", "Failed to post room charges.")
+                self.update_status("Night audit failed.")
+            else:
+                self.update_status(f"Night audit: {posted} room charges posted.")
+
+        self.db_worker.submit(post_room_charges, key="night-audit", on_success=done, on_error=lambda e: done(None))
 
     def show_about(self):
         """Displays a simple About dialog."""
@@ -134,6 +269,10 @@ class HotelApp(tk.Tk):
         """Updates the text in the status bar."""
         self.status_var.set(message)
 
+    def update_busy_indicator(self, in_flight):
+        """Shows how many background DB requests are still running."""
+        self.busy_var.set(f"DB: {in_flight} running..." if in_flight else "DB: idle")
+
     # You might add other controller methods here later, e.g.,
     # def get_current_user(self): -> To manage user logins
     # def confirm_action(self, title, message): -> Standard confirmation dialog
\ No newline at end of file
@@ -0,0 +1,48 @@
+# gui/startup.py
+import time
+
+
+class StartupProfile:
+    """Records named checkpoints from process start to first paint.
+
+    main.py creates it before the heavy imports; HotelApp marks its own
+    phases and calls report() once the first frame has been drawn. Lazily
+    built frames are recorded too, so their cost shows up when first opened.
+    """
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []        # (label, seconds since start)
+        self.frame_builds = {} # page_name -> seconds to import + construct
+        self.reported = False
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter() - self.started))
+
+    def record_frame_build(self, page_name, seconds):
+        self.frame_builds[page_name] = seconds
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self):
+        """Checkpoints as (label, total ms, ms since the previous checkpoint)."""
+        rows, previous = [], 0.0
+        for label, at in self.marks:
+            rows.append((label, at * 1000, (at - previous) * 1000))
+            previous = at
+        return rows
+
+    def report(self, budget_ms=None):
+        """Prints the startup timeline; warns if first paint took longer than budget_ms."""
+        self.reported = True
+        print("Startup timeline:")
+        for label, total_ms, step_ms in self.summary():
+            print(f"  {total_ms:8.1f} ms  (+{step_ms:7.1f})  {label}")
+        first_paint = self.summary()[-1][1] if self.marks else self.elapsed_ms()
+        if budget_ms and first_paint > budget_ms:
+            print(f"  Warning: first paint took {first_paint:.0f} ms (budget {budget_ms} ms)")
+
+    def report_frame_build(self, page_name):
+        seconds = self.frame_builds.get(page_name)
+        if seconds is not None:
+            print(f"Built {page_name} on first use in {seconds * 1000:.1f} ms")
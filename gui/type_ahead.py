@@ -0,0 +1,127 @@
+# gui/type_ahead.py
+from ..db.connection import DatabaseError
+from ..db.guest_queries import find_guest_by_name_db
+from ..db.guest_search import match_rank, refines
+from config import TYPE_AHEAD_CONFIG
+
+
+class GuestTypeAhead:
+    """Search-as-you-type for guest entry fields.
+
+    Keystrokes are debounced: the search runs once the user pauses for
+    `delay_ms`. A new term that only extends the previous one (see
+    db.guest_search.refines) is answered by filtering the previous result
+    set locally, as long as that set was complete (fewer rows than
+    `fetch_limit`). Otherwise the query goes to the DB worker under `key`,
+    which cancels a superseded search that is still queued and drops the
+    result of one already running.
+
+    on_results(guests, term) runs on the Tk thread with at most `limit`
+    guests, best match first; on_error(exception) if the query failed
+    (raised, or `search` returned None). A failed search is never cached.
+    """
+    def __init__(self, widget, db_worker, key, on_results, on_error=None, limit=None,
+                 delay_ms=None, min_chars=None, fetch_limit=None, search=find_guest_by_name_db):
+        self.widget = widget # Any widget, for after()
+        self.db_worker = db_worker
+        self.key = key
+        self.on_results = on_results
+        self.on_error = on_error
+        self.limit = limit or TYPE_AHEAD_CONFIG.get('show', 20)
+        self.delay_ms = TYPE_AHEAD_CONFIG.get('delay_ms', 250) if delay_ms is None else delay_ms
+        self.min_chars = TYPE_AHEAD_CONFIG.get('min_chars', 2) if min_chars is None else min_chars
+        self.fetch_limit = max(self.limit, fetch_limit or TYPE_AHEAD_CONFIG.get('fetch_limit', 200))
+        self.search = search
+
+        self._after_id = None
+        self._term = None          # Term of the last delivered results
+        self._cache_term = None    # Term the cached rows were fetched for
+        self._cache_rows = None    # Its complete result set, or None
+        self._pending = False      # A query is queued or running
+        self.stats = {'keystrokes': 0, 'queries': 0, 'refined': 0, 'superseded': 0}
+
+    def on_key(self, term):
+        """Schedules a search for `term` after the debounce delay (call from <KeyRelease>)."""
+        self.stats['keystrokes'] += 1
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+        self._after_id = self.widget.after(self.delay_ms, self._fire, term)
+
+    def search_now(self, term):
+        """Searches immediately (e.g. a Search button or Enter), even if `term` is already shown."""
+        self._term = None
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self._fire(term)
+
+    def reset(self):
+        """Forgets cached results, e.g. after a guest was added."""
+        self._cache_term = self._cache_rows = self._term = None
+
+    def cancel(self):
+        """Drops a pending keystroke and any search in flight."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self.db_worker.cancel(self.key)
+        self._pending = False
+
+    # --- Internals ---
+
+    def _fire(self, term):
+        self._after_id = None
+        term = term.strip()
+        if term == self._term:
+            return # Only non-text keys were pressed
+        if len(term) < self.min_chars:
+            self.cancel()
+            self._term = term
+            self.on_results([], term)
+            return
+        if self._cache_rows is not None and refines(self._cache_term, term):
+            self.cancel() # A query for an older term may still be running
+            self.stats['refined'] += 1
+            self._deliver(self._refine(self._cache_rows, term), term)
+            return
+
+        if self._pending:
+            self.stats['superseded'] += 1
+        self._pending = True
+        self.stats['queries'] += 1
+        self.db_worker.submit(self.search, term, self.fetch_limit, key=self.key,
+                              on_success=lambda guests: self._on_fetched(term, guests),
+                              on_error=self._on_failed)
+
+    @staticmethod
+    def _refine(rows, term):
+        ranked = []
+        for position, guest in enumerate(rows):
+            rank = match_rank(guest, term)
+            if rank is not None:
+                ranked.append((rank, position, guest)) # position keeps the server's order among equals
+        ranked.sort(key=lambda item: item[:2])
+        return [guest for _, _, guest in ranked]
+
+    def _on_fetched(self, term, guests):
+        if guests is None: # The search reported a DB error
+            self._on_failed(DatabaseError(msg=f"Guest search for '{term}' failed."))
+            return
+        self._pending = False
+        if len(guests) < self.fetch_limit: # Complete: longer terms can be refined from it
+            self._cache_term, self._cache_rows = term, guests
+        else:
+            self._cache_term = self._cache_rows = None
+        self._deliver(guests, term)
+
+    def _on_failed(self, error):
+        self._pending = False
+        self._cache_term = self._cache_rows = None # Ask the database again next time
+        if self.on_error:
+            self.on_error(error)
+        else:
+            print(f"Error searching guests: {error}")
+
+    def _deliver(self, guests, term):
+        self._term = term
+        self.on_results(guests[:self.limit], term)
@@ -0,0 +1,271 @@
+# gui/virtual_list.py
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+
+class KeysetSource:
+    """Rows of an ordered DB table, read one keyset page at a time.
+
+    fetch_page(after_key, limit) returns the rows following after_key (None
+    for the first page), key_at(offset) returns the sort key of the row at an
+    absolute offset (used to jump when the previous page is not cached),
+    count() returns the total, and row_key(row) extracts a row's sort key.
+    Methods are called on DB worker threads.
+    """
+    def __init__(self, fetch_page, key_at, count, row_key, page_size=100):
+        self.fetch_page = fetch_page
+        self.key_at = key_at
+        self.count = count
+        self.row_key = row_key
+        self.page_size = page_size
+
+    def load_page(self, page_no, anchor_key=None):
+        """Loads page `page_no`; anchor_key is the last key of the previous page if known."""
+        if page_no == 0:
+            return self.fetch_page(None, self.page_size)
+        if anchor_key is None:
+            anchor_key = self.key_at(page_no * self.page_size - 1)
+            if anchor_key is None:
+                return []
+        return self.fetch_page(anchor_key, self.page_size)
+
+
+class ListSource:
+    """Adapter that lets an already-fetched list (e.g. search results) feed a VirtualTreeview."""
+    def __init__(self, rows, row_key, page_size=100):
+        self.rows = list(rows or [])
+        self.row_key = row_key
+        self.page_size = page_size
+
+    def count(self):
+        return len(self.rows)
+
+    def load_page(self, page_no, anchor_key=None):
+        start = page_no * self.page_size
+        return self.rows[start:start + self.page_size]
+
+
+class VirtualTreeview(ttk.Frame):
+    """Treeview that only materializes the rows currently on screen.
+
+    A fixed set of Treeview items (one per visible line) is reused while
+    scrolling; rows are fetched in pages from a source on the controller's
+    DB worker and kept in a small LRU page cache, so memory stays flat no
+    matter how large the table is. Refreshing re-reads only the visible
+    pages and rewrites only the items whose values changed.
+    """
+    def __init__(self, parent, controller, name, columns, row_values, max_cached_pages=10, on_loaded=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.name = name                 # Prefix for DB worker job keys
+        self.row_values = row_values     # row -> tuple of display values
+        self.max_cached_pages = max_cached_pages
+        self.on_loaded = on_loaded       # Called with the row count after each (re)count
+
+        self.source = None
+        self.total = 0
+        self.offset = 0                  # Index of the first visible row
+        self._generation = 0             # Bumped on refresh; stale page loads are dropped
+        self._pages = OrderedDict()      # page_no -> rows (LRU)
+        self._last_keys = {}             # page_no -> sort key of its last row (keyset anchors)
+        self._pending = set()            # page numbers being fetched
+        self._slots = []                 # Treeview item ids, one per visible line
+        self._slot_values = []           # values currently shown in each slot
+        self._slot_rows = []             # row shown in each slot (None for placeholders)
+        self._selected_key = None
+        self._selected_row = None
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in columns], show="headings", selectmode="browse")
+        for col_id, heading, options in columns:
+            self.tree.heading(col_id, text=heading)
+            self.tree.column(col_id, **options)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_rows(-1 * (e.delta // 120 or (1 if e.delta > 0 else -1)) * 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3)) # Linux wheel up
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))  # Linux wheel down
+
+    # --- Public API ---
+
+    def set_source(self, source):
+        """Shows rows from a new source, starting at the top."""
+        self.source = source
+        self.offset = 0
+        self._selected_key = None
+        self._selected_row = None
+        self.refresh()
+
+    def refresh(self):
+        """Re-counts and re-reads the visible window; unchanged rows are left untouched."""
+        if self.source is None:
+            return
+        self._generation += 1
+        self._pages.clear()
+        self._last_keys.clear()
+        self._pending.clear()
+        generation = self._generation
+        self.controller.db_worker.submit(self.source.count, key=f"{self.name}-count",
+                                         on_success=lambda total: self._on_count(generation, total),
+                                         on_error=lambda e: self._on_count(generation, None))
+
+    def selected_row(self):
+        """The row (a record or dict) for the current selection, or None."""
+        return self._selected_row
+
+    def scroll_rows(self, delta):
+        self._scroll_to(self.offset + delta)
+
+    # --- Layout and scrolling ---
+
+    def _visible_count(self):
+        row_height = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+        heading_height = 25
+        return max(1, (self.tree.winfo_height() - heading_height) // row_height)
+
+    def _ensure_slots(self):
+        wanted = self._visible_count()
+        while len(self._slots) < wanted:
+            self._slots.append(self.tree.insert("", tk.END, values=()))
+            self._slot_values.append(())
+            self._slot_rows.append(None)
+        while len(self._slots) > wanted:
+            self.tree.delete(self._slots.pop())
+            self._slot_values.pop()
+            self._slot_rows.pop()
+
+    def _on_resize(self, event=None):
+        self._ensure_slots()
+        self._scroll_to(self.offset)
+
+    def _on_scrollbar(self, *args):
+        visible = len(self._slots) or 1
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            step = visible if args[2] == "pages" else 1
+            self._scroll_to(self.offset + int(args[1]) * step)
+
+    def _scroll_to(self, offset):
+        visible = len(self._slots) or 1
+        self.offset = max(0, min(offset, max(0, self.total - visible)))
+        self._render(keep_stale=False)
+
+    def _update_scrollbar(self):
+        if self.total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self.offset / self.total
+        last = min(1.0, (self.offset + len(self._slots)) / self.total)
+        self.scrollbar.set(first, last)
+
+    # --- Data loading ---
+
+    def _on_count(self, generation, total):
+        if generation != self._generation:
+            return
+        self.total = total or 0
+        self._ensure_slots()
+        visible = len(self._slots) or 1
+        self.offset = max(0, min(self.offset, max(0, self.total - visible)))
+        self._render(keep_stale=True)
+        if self.on_loaded:
+            self.on_loaded(total)
+
+    def _request_page(self, page_no):
+        if page_no in self._pending:
+            return
+        self._pending.add(page_no)
+        generation = self._generation
+        anchor = self._last_keys.get(page_no - 1)
+        self.controller.db_worker.submit(
+            self.source.load_page, page_no, anchor, key=f"{self.name}-page-{page_no}",
+            on_success=lambda rows: self._on_page_loaded(generation, page_no, rows),
+            on_error=lambda e: self._pending.discard(page_no))
+
+    def _on_page_loaded(self, generation, page_no, rows):
+        if generation != self._generation:
+            return
+        self._pending.discard(page_no)
+        rows = rows or []
+        self._pages[page_no] = rows
+        self._pages.move_to_end(page_no)
+        if rows:
+            self._last_keys[page_no] = self.source.row_key(rows[-1])
+        while len(self._pages) > self.max_cached_pages:
+            evicted, _ = self._pages.popitem(last=False)
+            self._last_keys.pop(evicted, None)
+        self._render(keep_stale=True)
+
+    def _row_at(self, index):
+        page_size = self.source.page_size
+        page = self._pages.get(index // page_size)
+        if page is None:
+            return False # Not loaded yet
+        pos = index % page_size
+        return page[pos] if pos < len(page) else None
+
+    # --- Rendering ---
+
+    def _render(self, keep_stale):
+        """Fills the visible slots, fetching missing pages.
+
+        keep_stale leaves a slot's old values in place until its page
+        arrives (used on refresh to avoid flicker); scrolling shows a
+        placeholder instead.
+        """
+        if self.source is None:
+            return
+        page_size = self.source.page_size
+        first_page = self.offset // page_size
+        last_page = (self.offset + max(len(self._slots), 1) - 1) // page_size
+        for page_no in range(first_page, last_page + 1):
+            if page_no in self._pages:
+                self._pages.move_to_end(page_no)
+            elif page_no * page_size < self.total:
+                self._request_page(page_no)
+
+        selected_slot = None
+        for i, item in enumerate(self._slots):
+            index = self.offset + i
+            if index >= self.total:
+                row, values = None, ()
+            else:
+                row = self._row_at(index)
+                if row is False:
+                    if keep_stale:
+                        continue
+                    row, values = None, ("…",)
+                else:
+                    values = tuple(self.row_values(row)) if row is not None else ()
+            if values != self._slot_values[i]: # Only touch items whose content changed
+                self.tree.item(item, values=values)
+                self._slot_values[i] = values
+            self._slot_rows[i] = row
+            if row is not None and self._selected_key is not None and self.source.row_key(row) == self._selected_key:
+                selected_slot = item
+                self._selected_row = row # Pick up refreshed values for the selected row
+
+        # Keep the highlight on the selected row, not on the slot it used to occupy
+        current = self.tree.selection()
+        if selected_slot is not None:
+            if current != (selected_slot,):
+                self.tree.selection_set(selected_slot)
+                self.tree.focus(selected_slot)
+        elif current:
+            self.tree.selection_remove(*current)
+        self._update_scrollbar()
+
+    def _on_select(self, event=None):
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self._slots:
+            return
+        row = self._slot_rows[self._slots.index(selection[0])]
+        if row is not None:
+            self._selected_key = self.source.row_key(row)
+            self._selected_row = row
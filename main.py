@@ -1,23 +1,23 @@
 # main.py
+import time
+_STARTED = time.perf_counter() # Taken before the heavy imports so the startup report includes them
+
 import tkinter as tk
+from gui.startup import StartupProfile
 from gui.main_window import HotelApp # Import the main app window class
-from db.connection import get_db_connection # Import to test connection early
+from db.connection import close_pool
 
 def main():
-    # Optional: Test DB connection on startup
-    conn = get_db_connection()
-    if conn and conn.is_connected():
-        print("Successfully connected to the database.")
-        conn.close()
-    else:
-        print("CRITICAL: Failed to connect to the database. Application might not work correctly.")
-        # You might want to show an error message and exit if connection fails critically
-        # messagebox.showerror("Database Error", "Cannot connect to database. Exiting.")
-        # return # Exit if connection is mandatory
+    startup = StartupProfile(_STARTED)
+    startup.mark("Modules imported")
 
-    # Create and run the Tkinter application
-    app = HotelApp()
+    # Create and run the Tkinter application.
+    # The database connection is opened in the background by HotelApp (see warm_up_pool),
+    # so a slow or unreachable server no longer delays the window.
+    app = HotelApp(startup=startup)
     app.mainloop()
+    app.db_worker.shutdown() # Abandon queued background queries
+    close_pool() # Release pooled connections on exit
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,281 @@
+# reports/occupancy.py
+"""
+Occupancy and revenue reports by room type and floor.
+
+The report period is cut into calendar months. Each month is computed in
+a worker process (its own pooled connection, same backend as the caller),
+streaming the stays that touch it in fetchmany() batches, and comes back
+as a handful of aggregate rows that are appended to the output files as
+soon as they arrive. Neither the parent nor a worker ever holds more than
+one batch of reservations, so a multi-year report runs in constant memory.
+
+    python -m reports.occupancy 2024-01-01 2026-01-01 --out report_output --format parquet
+
+Files written (CSV, or Parquet with pyarrow):
+
+    occupancy   one row per month x room type x floor: available, rooms_sold,
+                occupancy, room_revenue, adr, revpar, arrivals, departures
+    los         length-of-stay distribution of the month's arrivals
+    summary     the whole period per room type x floor (months merged)
+
+Revenue is rooms sold x RoomTypes.base_price, as in db/billing.py.
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from db.connection import pooled_connection, get_backend_settings, use_backend, reset_after_fork, Error
+from db.availability import _to_date
+from db.billing import REVENUE_STATUSES, _dates
+from .writers import open_writer
+from config import REPORTS_CONFIG
+
+CENTS = Decimal('0.01')
+
+OCCUPANCY_COLUMNS = ('period_start', 'period_end', 'type_name', 'floor_number', 'rooms', 'available',
+                     'rooms_sold', 'occupancy', 'room_revenue', 'adr', 'revpar', 'arrivals', 'departures')
+LOS_COLUMNS = ('period_start', 'type_name', 'floor_number', 'nights', 'stays')
+SUMMARY_COLUMNS = ('start', 'end', 'type_name', 'floor_number', 'rooms', 'available', 'rooms_sold',
+                   'occupancy', 'room_revenue', 'adr', 'revpar', 'arrivals', 'departures', 'average_stay')
+
+
+def month_chunks(start, end):
+    """ [start, end) split at month boundaries: list of (chunk_start, chunk_end). """
+    chunks = []
+    chunk_start = start
+    while chunk_start < end:
+        next_month = (chunk_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(next_month, end)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end
+    return chunks
+
+
+def fetch_room_groups():
+    """ Rooms per (room type, floor): list of (room_type_id, type_name, base_price, floor_number, rooms). None on error. """
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT rt.room_type_id, rt.type_name, rt.base_price, r.floor_number, COUNT(*)
+                FROM Rooms r
+                JOIN RoomTypes rt ON r.room_type_id = rt.room_type_id
+                GROUP BY rt.room_type_id, rt.type_name, rt.base_price, r.floor_number
+                ORDER BY rt.type_name, r.floor_number
+            """)
+            return [tuple(row) for row in cursor.fetchall()]
+        except Error as e:
+            print(f"Error fetching room groups: {e}")
+            return None
+        finally:
+            cursor.close()
+
+
+class ChunkTotals:
+    """ Per-group counters for one month (or, merged, for the whole period). """
+    def __init__(self, n_groups):
+        self.sold = np.zeros(n_groups, dtype=np.int64)
+        self.arrivals = np.zeros(n_groups, dtype=np.int64)
+        self.departures = np.zeros(n_groups, dtype=np.int64)
+        self.stay_lengths = [Counter() for _ in range(n_groups)] # nights -> arrivals
+
+    def merge(self, other):
+        self.sold += other.sold
+        self.arrivals += other.arrivals
+        self.departures += other.departures
+        for mine, theirs in zip(self.stay_lengths, other.stay_lengths):
+            mine.update(theirs)
+
+
+def _add_batch(totals, rows, group_index, origin, days):
+    """ Folds a batch of (check_in, check_out, room_type_id, floor_number) stays into `totals`. """
+    groups = np.fromiter((group_index.get((row[2], row[3]), -1) for row in rows), dtype=np.int64, count=len(rows))
+    check_in = (_dates(row[0] for row in rows) - origin).astype(np.int64)
+    check_out = (_dates(row[1] for row in rows) - origin).astype(np.int64)
+    known = groups >= 0
+    groups, check_in, check_out = groups[known], check_in[known], check_out[known]
+    n_groups = len(totals.sold)
+
+    sold = np.clip(check_out, 0, days) - np.clip(check_in, 0, days)
+    totals.sold += np.bincount(groups, weights=sold, minlength=n_groups).astype(np.int64)
+    arriving = (check_in >= 0) & (check_in < days)
+    totals.arrivals += np.bincount(groups[arriving], minlength=n_groups)
+    leaving = (check_out >= 0) & (check_out < days)
+    totals.departures += np.bincount(groups[leaving], minlength=n_groups)
+    for group, nights in zip(groups[arriving].tolist(), (check_out - check_in)[arriving].tolist()):
+        totals.stay_lengths[group][nights] += 1
+
+def compute_chunk(chunk_start, chunk_end, room_groups, statuses=REVENUE_STATUSES, batch_size=None):
+    """ ChunkTotals for [chunk_start, chunk_end), streaming the stays that touch it. None on DB error. """
+    batch_size = batch_size or REPORTS_CONFIG.get('batch_size', 5000)
+    group_index = {(group[0], group[3]): i for i, group in enumerate(room_groups)}
+    origin = np.datetime64(chunk_start, 'D')
+    days = (chunk_end - chunk_start).days
+    totals = ChunkTotals(len(room_groups))
+    with pooled_connection() as conn:
+        if conn is None: return None
+        cursor = conn.cursor() # Unbuffered: rows come off the wire one batch at a time
+        try:
+            # check_out >= start (not >) so stays leaving on the first day count as departures
+            cursor.execute(f"""
+                SELECT res.check_in_date, res.check_out_date, r.room_type_id, r.floor_number
+                FROM Reservations res
+                JOIN Rooms r ON res.room_id = r.room_id
+                WHERE res.status IN ({', '.join(['%s'] * len(statuses))})
+                  AND res.check_in_date < %s AND res.check_out_date >= %s
+            """, tuple(statuses) + (chunk_end, chunk_start))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                _add_batch(totals, rows, group_index, origin, days)
+        except Error as e:
+            print(f"Error computing report for {chunk_start}..{chunk_end}: {e}")
+            return None
+        finally:
+            cursor.close()
+    return totals
+
+def _compute_chunk_task(task):
+    chunk_start, chunk_end, room_groups, statuses, batch_size = task
+    return chunk_start, chunk_end, compute_chunk(chunk_start, chunk_end, room_groups, statuses, batch_size)
+
+def _init_worker(backend_name, settings):
+    # Each process gets its own small pool on the parent's backend. A forked
+    # worker first drops the pool it inherited: closing those connections
+    # would close the parent's sessions, whose sockets it shares
+    reset_after_fork()
+    use_backend(backend_name, dict(settings, pool_size=1))
+
+
+def _decimal(cents):
+    return (Decimal(int(cents)) / 100).quantize(CENTS)
+
+def _kpi_rows(totals, room_groups, days):
+    """ One dict per group with available, rooms_sold, occupancy, room_revenue, adr, revpar, arrivals, departures. """
+    rows = []
+    for i, (_, type_name, base_price, floor_number, rooms) in enumerate(room_groups):
+        available = rooms * days
+        sold = int(totals.sold[i])
+        revenue = sold * int(round(Decimal(base_price) * 100))
+        rows.append({
+            'type_name': type_name,
+            'floor_number': floor_number,
+            'rooms': rooms,
+            'available': available,
+            'rooms_sold': sold,
+            'occupancy': round(sold / available, 4) if available else 0.0,
+            'room_revenue': _decimal(revenue),
+            'adr': _decimal(round(revenue / sold)) if sold else Decimal('0.00'),
+            'revpar': _decimal(round(revenue / available)) if available else Decimal('0.00'),
+            'arrivals': int(totals.arrivals[i]),
+            'departures': int(totals.departures[i]),
+        })
+    return rows
+
+def _los_rows(totals, room_groups, period_start):
+    return [{'period_start': period_start, 'type_name': group[1], 'floor_number': group[3],
+             'nights': nights, 'stays': count}
+            for group, lengths in zip(room_groups, totals.stay_lengths)
+            for nights, count in sorted(lengths.items())]
+
+
+def generate_report(start, end, directory=None, fmt=None, workers=None, statuses=REVENUE_STATUSES, progress=None):
+    """ Writes the occupancy, los and summary files for [start, end) into `directory`.
+
+    `workers` processes compute the months in parallel (0 or 1 computes them
+    in this process); results are written in month order as they complete.
+    progress(done, total), if given, is called after each month. Returns
+    {'occupancy': path, 'los': path, 'summary': path, 'months': n}, or None
+    on a DB error.
+    """
+    start, end = _to_date(start), _to_date(end)
+    directory = directory or REPORTS_CONFIG.get('directory', 'report_output')
+    fmt = fmt or REPORTS_CONFIG.get('format', 'csv')
+    workers = REPORTS_CONFIG.get('workers') if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    batch_size = REPORTS_CONFIG.get('batch_size', 5000)
+
+    room_groups = fetch_room_groups()
+    if room_groups is None:
+        return None
+    chunks = month_chunks(start, end)
+    tasks = [(chunk_start, chunk_end, room_groups, tuple(statuses), batch_size) for chunk_start, chunk_end in chunks]
+
+    occupancy = open_writer(directory, 'occupancy', OCCUPANCY_COLUMNS, fmt)
+    los = open_writer(directory, 'los', LOS_COLUMNS, fmt)
+    merged = ChunkTotals(len(room_groups))
+    executor = None
+    try:
+        if workers > 1 and len(tasks) > 1:
+            backend_name, settings = get_backend_settings()
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                                           initargs=(backend_name, settings))
+            results = executor.map(_compute_chunk_task, tasks) # Yields in month order
+        else:
+            results = map(_compute_chunk_task, tasks)
+
+        for done, (chunk_start, chunk_end, totals) in enumerate(results, start=1):
+            if totals is None:
+                return None
+            days = (chunk_end - chunk_start).days
+            occupancy.write_rows(dict(row, period_start=chunk_start, period_end=chunk_end)
+                                 for row in _kpi_rows(totals, room_groups, days))
+            los.write_rows(_los_rows(totals, room_groups, chunk_start))
+            merged.merge(totals)
+            if progress:
+                progress(done, len(tasks))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        occupancy.close()
+        los.close()
+
+    summary = open_writer(directory, 'summary', SUMMARY_COLUMNS, fmt)
+    try:
+        summary_rows = _kpi_rows(merged, room_groups, (end - start).days if end > start else 0)
+        for row, lengths in zip(summary_rows, merged.stay_lengths):
+            stays = sum(lengths.values())
+            row.update(start=start, end=end,
+                       average_stay=round(sum(n * c for n, c in lengths.items()) / stays, 2) if stays else 0.0)
+        summary.write_rows(summary_rows)
+    finally:
+        summary.close()
+    return {'occupancy': occupancy.path, 'los': los.path, 'summary': summary.path, 'months': len(tasks)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Occupancy, ADR and RevPAR report by room type and floor.")
+    parser.add_argument('start', type=date.fromisoformat, help="First night (YYYY-MM-DD)")
+    parser.add_argument('end', type=date.fromisoformat, help="Night after the last one (YYYY-MM-DD)")
+    parser.add_argument('--out', help="Output directory (default from REPORTS_CONFIG)")
+    parser.add_argument('--format', choices=('csv', 'parquet'))
+    parser.add_argument('--workers', type=int, help="Worker processes (0 = one per CPU)")
+    parser.add_argument('--sqlite', help="Report on this SQLite file instead of the configured database")
+    args = parser.parse_args(argv)
+
+    if args.end <= args.start:
+        parser.error("end must be after start")
+    if args.sqlite:
+        import config
+        use_backend('sqlite', dict(config.SQLITE_CONFIG, database=args.sqlite))
+
+    started = time.perf_counter()
+    result = generate_report(args.start, args.end, args.out, args.format, args.workers,
+                             progress=lambda done, total: print(f"  {done}/{total} months", end='\r'))
+    if result is None:
+        return 1
+    print(f"{result['months']} months reported in {time.perf_counter() - started:.1f}s:")
+    for name in ('occupancy', 'los', 'summary'):
+        print(f"  {result[name]}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
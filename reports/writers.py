@@ -0,0 +1,79 @@
+# reports/writers.py
+"""
+Streaming columnar output for reports: rows are appended chunk by chunk,
+so a report never has to be held in memory as a whole.
+
+CSV needs nothing extra; Parquet needs pyarrow (optional, not in
+requirements.txt).
+"""
+import csv
+import os
+from decimal import Decimal
+
+FORMATS = ('csv', 'parquet')
+
+
+class CsvReportWriter:
+    """ Appends dict rows to a CSV file with a fixed column order. """
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._writer.writerow(row)
+            self.rows_written += 1
+        self._file.flush() # Each chunk is on disk before the next one is computed
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetReportWriter:
+    """ Appends dict rows to a Parquet file, one row group per write_rows() call. """
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use the csv format instead.")
+        self._pa = pyarrow
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        self._writer = None # Created on the first batch, once the column types are known
+        self._parquet = pyarrow.parquet
+
+    @staticmethod
+    def _plain(value):
+        # Decimals as floats keep the schema simple for pandas/spreadsheet consumers
+        return float(value) if isinstance(value, Decimal) else value
+
+    def write_rows(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        table = self._pa.table({column: [self._plain(row.get(column)) for row in rows] for column in self.columns})
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.rows_written += len(rows)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_writer(directory, name, columns, fmt='csv'):
+    """ Opens `directory`/`name`.<fmt> for streaming rows. """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.{fmt}")
+    if fmt == 'parquet':
+        return ParquetReportWriter(path, columns)
+    return CsvReportWriter(path, columns)